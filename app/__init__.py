@@ -1,8 +1,11 @@
 # app/__init__.py
+from .infra import startup
+startup.install_import_profiler()  # antes dos demais imports, para medi-los
+
 import re
 from flask import Flask
 from flask_cors import CORS
-from .infra.db.bq_client import ensure_assets_tables
+from .infra.db.migrations import ensure_schema
 
 ALLOWED_ORIGINS = [
     r"https://.*\.lovableproject\.com",
@@ -10,6 +13,7 @@ ALLOWED_ORIGINS = [
 ]
 
 def create_app():
+    startup.mark("imports")
     app = Flask(
         __name__,
         template_folder="templates",
@@ -21,13 +25,19 @@ def create_app():
         resources={r"/*": {
             "origins": ALLOWED_ORIGINS,
             "supports_credentials": True,
-            "allow_headers": ["Content-Type", "Authorization"],
-            "methods": ["GET", "POST", "OPTIONS"],
-            "expose_headers": ["Content-Length", "Content-Type"],
+            "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "If-Modified-Since",
+                              "Range", "If-Range"],
+            "methods": ["GET", "POST", "PUT", "OPTIONS"],
+            "expose_headers": ["Content-Length", "Content-Type", "ETag", "Last-Modified",
+                               "Content-Range", "Accept-Ranges", "X-Object-Generation"],
         }},
     )
 
-    ensure_assets_tables()
+    startup.mark("flask")
+
+    # uma leitura de schema_migrations; DDL só quando há migração pendente
+    ensure_schema()
+    startup.mark("schema")
 
     from .controllers.ui_controller import ui_bp
     from .controllers.ingestion_controller import ingestion_bp
@@ -36,5 +46,9 @@ def create_app():
     app.register_blueprint(ui_bp)
     app.register_blueprint(ingestion_bp, url_prefix="/ingest")
     app.register_blueprint(delivery_bp)
+    startup.mark("controllers")
+
+    startup.init_app(app)
+    startup.start_background_warmup()
 
     return app
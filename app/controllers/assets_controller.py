@@ -1,22 +1,76 @@
 # app/controllers/asset_delivery_controller.py
-import io, re, os, zipfile, mimetypes
-from typing import Optional, List
-from flask import Blueprint, request, jsonify, send_file, abort, Response
+import re, os, mimetypes, hashlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from flask import Blueprint, request, jsonify, abort, redirect, Response
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
+from ..services.archive_service import ArchiveService
 from ..services.assets_service import AssetsService
+from ..services.assets_cache import cache_stats
+from ..services.readmodel_service import ReadModelService, doc_etag, serialize
+from ..services.object_cache import object_cache, object_cache_key, object_cache_stats
+from ..services.object_manifest import object_manifest
+from ..services.signed_urls import make_signed_url_pool
+from ..utils.disk_cache import iter_file
 from ..infra.bucket.gcs_client import GCSClient
 
 delivery_bp = Blueprint("assets", __name__)
 _service = AssetsService()
+_readmodel = ReadModelService(assets=_service)
 _gcs = GCSClient()
+_signed = make_signed_url_pool()  # None: bytes passam pelo proxy
 _BUCKET = os.getenv("GCS_BUCKET", "brand-guides")
+_archive = ArchiveService(gcs=_gcs, bucket=_BUCKET)
 SAFE_PATH_RE = re.compile(r"^[a-z0-9/_\-.@ ]+$", re.IGNORECASE)
+# no-cache: navegador/proxy guardam, mas revalidam (If-None-Match -> 304) a cada uso
+_JSON_CACHE_CONTROL = os.getenv("ASSETS_JSON_CACHE_CONTROL", "no-cache")
+_STREAM_CACHE_CONTROL = "private, max-age=60"
+
+def _attachment(fname: str) -> str:
+    """Content-Disposition com fallback ASCII e filename* (RFC 5987) para nomes acentuados."""
+    ascii_name = fname.encode("ascii", "ignore").decode() or "download.zip"
+    if ascii_name == fname:
+        return f"attachment; filename=\"{fname}\""
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(fname)}"
+
+def _with_validators(resp: Response, etag: str, last_modified: Optional[datetime],
+                     cache_control: str = _JSON_CACHE_CONTROL) -> Response:
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+def _json_doc(kind: str, brand: str, fallback: Callable[[], Any],
+              category_key: Optional[str] = None, subcategory_seq: Optional[int] = None) -> Response:
+    """
+    Entrega com GET condicional. O 304 sai só do manifesto da marca (sem carregar o
+    documento); senão servimos os bytes pré-computados ou, sem eles, o payload do BigQuery.
+    O ETag enviado é sempre o do corpo enviado.
+    """
+    etag, last_modified = _readmodel.validators(kind, brand, category_key, subcategory_seq)
+    if etag and not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return _with_validators(Response(status=304), etag, last_modified)
+
+    doc = _readmodel.document(kind, brand, category_key, subcategory_seq)
+    if doc is not None:
+        data, doc_tag = doc
+        # manifesto e documento em cache podem divergir por até um TTL entre workers
+        last_modified = last_modified if doc_tag == etag else None
+    else:
+        data = serialize(fallback())
+        doc_tag, last_modified = doc_etag(hashlib.sha256(data).hexdigest()), None
+    resp = Response(data, mimetype="application/json")
+    return _with_validators(resp, doc_tag, last_modified).make_conditional(request)
 
 @delivery_bp.get("/assets/sidebar")
 def assets_sidebar():
     brand = (request.args.get("brand_name") or "").strip()
     if not brand:
         return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
-    return jsonify(_service.sidebar(brand))
+    return _json_doc("sidebar", brand, lambda: _service.sidebar(brand))
 
 @delivery_bp.get("/assets/gallery")
 def assets_gallery():
@@ -39,7 +93,11 @@ def assets_gallery():
         return jsonify({"ok": False, "error": "category_key é obrigatório quando subcategory_seq é usado"}), 400
 
     try:
-        return jsonify(_service.gallery(brand, category_key, subcategory_seq))
+        resp = _json_doc("gallery", brand, lambda: _service.gallery(brand, category_key, subcategory_seq),
+                         category_key, subcategory_seq)
+        if _signed is not None and resp.status_code == 200:
+            _signed.prefetch_from_doc(resp.get_data())
+        return resp
     except Exception as e:
         return jsonify({"ok": False, "error": f"falha em /assets/gallery: {e}"}), 500
 
@@ -48,7 +106,68 @@ def assets_colors():
     brand = (request.args.get("brand_name") or "").strip()
     if not brand:
         return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
-    return jsonify(_service.colors(brand))
+    return _json_doc("colors", brand, lambda: _service.colors(brand))
+
+# payloads do /assets/bundle (chaves em ordem alfabética, como o serialize)
+_BUNDLE_KINDS = ("colors", "gallery", "sidebar")
+_BUNDLE_LOADERS: Dict[str, Callable[[str], Callable[[], Any]]] = {
+    "colors": _service.start_colors,
+    "gallery": _service.start_gallery,
+    "sidebar": _service.start_sidebar,
+}
+
+def _bundle_etag(tags: List[str]) -> str:
+    return doc_etag(hashlib.sha256("|".join(tags).encode("ascii")).hexdigest())
+
+@delivery_bp.get("/assets/bundle")
+def assets_bundle():
+    """
+    sidebar + gallery + colors numa resposta. Documentos prontos saem como estão; os que
+    faltam disparam todas as consultas antes de esperar qualquer uma (latência da mais lenta).
+    """
+    brand = (request.args.get("brand_name") or "").strip()
+    if not brand:
+        return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
+
+    validators = {k: _readmodel.validators(k, brand) for k in _BUNDLE_KINDS}
+    manifest_tags = [validators[k][0] for k in _BUNDLE_KINDS]
+    last_modified = validators["sidebar"][1]
+    if all(manifest_tags):
+        etag = _bundle_etag(manifest_tags)
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            return _with_validators(Response(status=304), etag, last_modified)
+
+    try:
+        docs = {k: _readmodel.document(k, brand) for k in _BUNDLE_KINDS}
+        pending = {k: _BUNDLE_LOADERS[k](brand) for k in _BUNDLE_KINDS if docs[k] is None}
+        parts: Dict[str, Tuple[bytes, str]] = {}
+        for k in _BUNDLE_KINDS:
+            if docs[k] is not None:
+                parts[k] = docs[k]
+            else:
+                data = serialize(pending[k]())
+                parts[k] = (data, doc_etag(hashlib.sha256(data).hexdigest()))
+    except Exception as e:
+        return jsonify({"ok": False, "error": f"falha em /assets/bundle: {e}"}), 500
+
+    tags = [parts[k][1] for k in _BUNDLE_KINDS]
+    if tags != manifest_tags:
+        last_modified = None  # algum corpo não é o publicado no manifesto
+    body = b"{" + b",".join(b'"%s":%s' % (k.encode("ascii"), parts[k][0]) for k in _BUNDLE_KINDS) + b"}"
+    if _signed is not None:
+        _signed.prefetch_from_doc(parts["gallery"][0])
+    resp = Response(body, mimetype="application/json")
+    return _with_validators(resp, _bundle_etag(tags), last_modified).make_conditional(request)
+
+@delivery_bp.get("/assets/cache/stats")
+def assets_cache_stats():
+    return jsonify({
+        "ok": True,
+        "cache": cache_stats(),
+        "objects": object_cache_stats(),
+        "manifests": object_manifest.stats(),
+        "signed_urls": _signed.stats() if _signed is not None else {"enabled": False},
+    })
 
 @delivery_bp.get("/assets/originais.zip")
 def download_originais_zip():
@@ -57,22 +176,19 @@ def download_originais_zip():
     if not brand or not category_key:
         return jsonify({"ok": False, "error": "brand_name e category_key são obrigatórios"}), 400
 
-    prefix = f"{brand.lower()}/{category_key}/originais/"
-    paths: List[str] = _gcs.list_paths(_BUCKET, prefix)
-
-    mem = io.BytesIO()
-    with zipfile.ZipFile(mem, mode="w", compression=zipfile.ZIP_DEFLATED) as z:
-        for p in paths:
-            try:
-                data = _gcs.read_bytes(_BUCKET, p)
-                arcname = p[len(prefix):] if p.startswith(prefix) else os.path.basename(p)
-                z.writestr(arcname, data)
-            except Exception:
-                continue
+    try:
+        fname, chunks, length = _archive.originais_zip(brand, category_key)
+    except Exception as e:
+        return jsonify({"ok": False, "error": f"falha ao listar originais: {e}"}), 500
 
-    mem.seek(0)
-    fname = f"{brand.lower()}-{category_key}-originais.zip"
-    return send_file(mem, mimetype="application/zip", as_attachment=True, download_name=fname)
+    # ZIP sai em fluxo; montado na hora vai sem Content-Length (o primeiro byte não
+    # espera o último objeto), o já guardado no bucket vai com o tamanho
+    resp = Response(chunks, mimetype="application/zip", direct_passthrough=True)
+    if length is not None:
+        resp.headers["Content-Length"] = str(length)
+    resp.headers["Content-Disposition"] = _attachment(fname)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
 
 @delivery_bp.get("/assets/stream")
 def assets_stream():
@@ -85,22 +201,72 @@ def assets_stream():
     if ".." in path or not path.lower().startswith(brand.lower() + "/") or not SAFE_PATH_RE.match(path):
         return abort(403)
 
+    if _signed is not None:
+        # bytes direto do Storage; sem URL (falha ao assinar) segue pelo proxy
+        url = _signed.url(path)
+        if url:
+            resp = redirect(url, 302)
+            resp.headers["Cache-Control"] = f"private, max-age={_signed.redirect_max_age}"
+            return resp
+
     try:
-        data = _gcs.read_bytes(_BUCKET, path)
+        info = _gcs.object_info(_BUCKET, path)
     except Exception:
+        info = None
+    if info is None:
         return abort(404)
 
-    ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
-    resp: Response = send_file(
-        io.BytesIO(data),
-        mimetype=ctype,
-        as_attachment=False,
-        download_name=os.path.basename(path),
-        max_age=60,
-        conditional=True,
-    )
-    resp.headers["Cache-Control"] = "private, max-age=60"
-    return resp
+    size, generation = info["size"], info["generation"]
+    # geração do objeto = ETag forte (muda a cada regravação)
+    etag, last_modified = str(generation), info["updated"]
+    headers = {"Accept-Ranges": "bytes", "X-Object-Generation": str(generation)}
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return _with_validators(Response(status=304, headers=headers), etag, last_modified,
+                                _STREAM_CACHE_CONTROL)
+
+    start, end, status = 0, size - 1, 200
+    rng = request.range
+    if (size > 0 and rng is not None and rng.units == "bytes" and len(rng.ranges) == 1
+            and _if_range_matches(etag, last_modified)):
+        span = rng.range_for_length(size)
+        if span is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, end, status = span[0], span[1] - 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    # (objeto vazio, múltiplos intervalos ou If-Range desatualizado: objeto inteiro, 200)
+
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Disposition"] = f"inline; filename=\"{os.path.basename(path)}\""
+    ctype = info.get("content_type") or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    key = object_cache_key(_BUCKET, path)
+    # HEAD: só cabeçalhos (nem Storage nem disco; não conta como acerto)
+    head = request.method == "HEAD"
+    cached = object_cache.open(key, generation) if size and not head else None
+    if not size or head:
+        body = iter(())
+    elif cached is not None:
+        # acerto no disco local: inteiro via file_wrapper do servidor (sendfile), intervalo via pread
+        object_cache.record_served(end - start + 1)
+        body = wrap_file(request.environ, cached) if status == 200 else iter_file(cached, start, end)
+    elif status == 206:
+        # só o intervalo pedido sai do Storage, em blocos, sem o objeto inteiro em memória
+        body = _gcs.iter_range(_BUCKET, path, start, end, generation)
+    else:
+        # inteiro, com checksum; gravado no cache enquanto é repassado
+        body = object_cache.read_through(key, generation, size,
+                                         _gcs.iter_range(_BUCKET, path, generation=generation))
+    resp = Response(body, status=status, headers=headers, mimetype=ctype, direct_passthrough=True)
+    return _with_validators(resp, etag, last_modified, _STREAM_CACHE_CONTROL)
+
+def _if_range_matches(etag: str, last_modified: Optional[datetime]) -> bool:
+    """Sem If-Range o Range vale sempre; com ele, só se o validador ainda for o atual."""
+    if_range = request.if_range
+    if if_range.etag is None and if_range.date is None:
+        return True
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    return last_modified is not None and if_range.date == last_modified.replace(microsecond=0)
 
 @delivery_bp.get("/assets/originais/exists")
 def exists_originais():
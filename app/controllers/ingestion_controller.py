@@ -1,12 +1,49 @@
 # app/controllers/ingestion_controller.py
 from io import BytesIO
+from typing import Optional
 from flask import Blueprint, request, jsonify, send_file
 from werkzeug.datastructures import FileStorage
 from ..services.ingestion_service import IngestionService
+from ..services.ingestion_jobs_service import IngestionJobsService, JobLimitReached
+from ..services.upload_sessions_service import UploadSessionsService, UploadSessionError
+from ..services.versions_service import VersionsService
 from ..utils.zip_utils import build_template_zip_bytes
 
 ingestion_bp = Blueprint("ingestion", __name__)
 _service = IngestionService()
+_jobs = IngestionJobsService(_service)
+_uploads = UploadSessionsService(_service, _jobs)
+_versions = VersionsService()
+
+
+def _flag(name: str) -> bool:
+    raw = request.args.get(name) or request.form.get(name) or ""
+    return raw.strip().lower() in ("1", "true", "yes")
+
+
+def _wants_job() -> bool:
+    return _flag("async")
+
+
+def _wants_dry_run() -> bool:
+    return _flag("dry_run")
+
+
+def _submit_job(brand_name: str, file: FileStorage):
+    try:
+        job = _jobs.submit(brand_name, file.stream, filename=file.filename)
+    except JobLimitReached as e:
+        return jsonify({"ok": False, "error": str(e)}), 429
+    return _job_accepted(job)
+
+
+def _job_accepted(job):
+    return jsonify({
+        "ok": True,
+        "job_id": job["job_id"],
+        "state": job["state"],
+        "status_url": f"{request.script_root}/ingest/jobs/{job['job_id']}",
+    }), 202
 
 @ingestion_bp.post("/ingest")
 def ingest_zip():
@@ -16,7 +53,12 @@ def ingest_zip():
         return jsonify({"ok": False, "error": "Campo 'file' obrigatório"}), 400
     if not brand_name:
         return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
-    res = _service.ingest_zip(brand_name, file.stream, filename=file.filename)
+    if _wants_dry_run():
+        res = _service.validate_zip(brand_name, file.stream, filename=file.filename)
+    elif _wants_job():
+        return _submit_job(brand_name, file)
+    else:
+        res = _service.ingest_zip(brand_name, file.stream, filename=file.filename)
     return jsonify(res), (200 if res.get("ok") else 400)
 
 @ingestion_bp.post("/upload")
@@ -27,7 +69,109 @@ def upload_zip():
         return jsonify({"ok": False, "error": "brand_name é obrigatório"}), 400
     if not file:
         return jsonify({"ok": False, "error": "zip_file é obrigatório"}), 400
-    res = _service.ingest_zip(brand, file.stream, filename=file.filename)
+    if _wants_dry_run():
+        res = _service.validate_zip(brand, file.stream, filename=file.filename)
+    elif _wants_job():
+        return _submit_job(brand, file)
+    else:
+        res = _service.ingest_zip(brand, file.stream, filename=file.filename)
+    return jsonify(res), (200 if res.get("ok") else 400)
+
+@ingestion_bp.post("/validate")
+def validate_zip():
+    """Pré-validação do pacote: lê só o diretório central do ZIP, não grava nada."""
+    file: FileStorage = request.files.get("file") or request.files.get("zip_file")
+    brand_name = (request.form.get("brand_name") or "").strip()
+    if not file:
+        return jsonify({"ok": False, "error": "Campo 'file' obrigatório"}), 400
+    if not brand_name:
+        return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
+    res = _service.validate_zip(brand_name, file.stream, filename=file.filename)
+    return jsonify(res), (200 if res.get("ok") else 400)
+
+@ingestion_bp.get("/jobs/<job_id>")
+def ingest_job_status(job_id: str):
+    job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "job não encontrado"}), 404
+    return jsonify({"ok": True, **job})
+
+# -------- Upload resumable em chunks --------
+def _int_arg(raw) -> Optional[int]:
+    raw = (str(raw) if raw is not None else "").strip()
+    return int(raw) if raw.isdigit() else None
+
+@ingestion_bp.post("/uploads")
+def upload_initiate():
+    body = request.get_json(silent=True) or request.form
+    total_size = _int_arg(body.get("total_size"))
+    if total_size is None:
+        return jsonify({"ok": False, "error": "total_size obrigatório"}), 400
+    try:
+        res = _uploads.initiate(
+            (body.get("brand_name") or "").strip(),
+            (body.get("filename") or "").strip() or None,
+            total_size,
+            _int_arg(body.get("chunk_size")),
+        )
+    except UploadSessionError as e:
+        return jsonify({"ok": False, "error": str(e)}), e.status
+    return jsonify(res), 201
+
+@ingestion_bp.put("/uploads/<upload_id>/chunks/<int:index>")
+def upload_chunk(upload_id: str, index: int):
+    try:
+        res = _uploads.put_chunk(
+            upload_id, index, _int_arg(request.args.get("offset")),
+            request.stream, request.content_length,
+        )
+    except UploadSessionError as e:
+        return jsonify({"ok": False, "error": str(e)}), e.status
+    return jsonify(res)
+
+@ingestion_bp.get("/uploads/<upload_id>")
+def upload_status(upload_id: str):
+    try:
+        return jsonify(_uploads.status(upload_id))
+    except UploadSessionError as e:
+        return jsonify({"ok": False, "error": str(e)}), e.status
+
+@ingestion_bp.post("/uploads/<upload_id>/finalize")
+def upload_finalize(upload_id: str):
+    try:
+        res = _uploads.finalize(upload_id, as_job=_wants_job())
+    except UploadSessionError as e:
+        return jsonify({"ok": False, "error": str(e)}), e.status
+    except JobLimitReached as e:
+        return jsonify({"ok": False, "error": str(e)}), 429
+    if _wants_job():
+        return _job_accepted(res)
+    return jsonify(res), (200 if res.get("ok") else 400)
+
+# -------- Versões (snapshots) --------
+@ingestion_bp.get("/versions")
+def list_versions():
+    brand = (request.args.get("brand_name") or "").strip()
+    if not brand:
+        return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
+    return jsonify(_versions.list(brand))
+
+@ingestion_bp.post("/versions/rollback")
+def rollback_version():
+    body = request.get_json(silent=True) or request.form
+    brand = (body.get("brand_name") or "").strip()
+    if not brand:
+        return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
+    res = _versions.rollback(brand, (body.get("version_id") or "").strip() or None)
+    return jsonify(res), (200 if res.get("ok") else 400)
+
+@ingestion_bp.post("/versions/compact")
+def compact_versions():
+    body = request.get_json(silent=True) or request.form
+    brand = (body.get("brand_name") or "").strip()
+    if not brand:
+        return jsonify({"ok": False, "error": "brand_name obrigatório"}), 400
+    res = _versions.compact(brand, _int_arg(body.get("keep")))
     return jsonify(res), (200 if res.get("ok") else 400)
 
 @ingestion_bp.get("/template.zip")
@@ -1,13 +1,14 @@
 import os
-from google.oauth2 import service_account
-import google.auth
 
 def load_credentials():
     # Prefer service-account (container mount) -> /secrets/service-account.json
     svc_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "/secrets/service-account.json")
+    # imports do google-auth só quando um cliente é de fato criado
     if os.path.exists(svc_path):
+        from google.oauth2 import service_account
         return service_account.Credentials.from_service_account_file(svc_path)
     # Fallback para ADC se estiver configurado (ex.: Cloud Run/Build)
+    import google.auth
     creds, _ = google.auth.default()
     return creds
 
@@ -1,35 +1,330 @@
 # app/infra/bucket/gcs_client.py
 import os
+import queue
+import threading
+from concurrent.futures import Future
 from datetime import timedelta
-from typing import List, Optional
-from google.cloud import storage
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from google.cloud import storage
+
+# blob.chunk_size precisa ser múltiplo de 256 KiB
+_CHUNK_QUANTUM = 256 * 1024
+UPLOAD_CHUNK_BYTES = int(os.getenv("GCS_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+_MAX_COMPOSE_SOURCES = 32  # limite da API de compose
+# leitura em streaming: tamanho dos blocos repassados e quantos podem ficar na fila
+STREAM_CHUNK_BYTES = int(os.getenv("GCS_STREAM_CHUNK_BYTES", str(256 * 1024)))
+STREAM_BUFFERED_CHUNKS = int(os.getenv("GCS_STREAM_BUFFERED_CHUNKS", "8"))
+
+
+def _align_chunk(n: int) -> int:
+    return max(_CHUNK_QUANTUM, (n // _CHUNK_QUANTUM) * _CHUNK_QUANTUM)
+
+
+class _StreamCancelled(Exception):
+    pass
+
+
+class ChunkUpload:
+    """
+    Origem de um upload resumable alimentada por outra thread (o inverso de iter_range):
+    o produtor chama write()/close(); o SDK lê com read() na thread do upload. Se o buffer
+    passar de max_buffered_bytes o upload é abandonado (write devolve False), para nunca
+    segurar o produtor. abort() descarta: o objeto não chega a existir.
+    """
+
+    def __init__(self, max_buffered_bytes: int):
+        self.max_buffered_bytes = max_buffered_bytes
+        self.result: "Future[str]" = Future()
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+        self._read = 0
+        self._eof = False
+        self._aborted = False
+
+    def write(self, data: bytes) -> bool:
+        with self._cond:
+            if self._aborted or self._eof:
+                return False
+            if self._buf and len(self._buf) + len(data) > self.max_buffered_bytes:
+                self._aborted = True
+                self._cond.notify_all()
+                return False
+            self._buf += data
+            self._cond.notify_all()
+            return True
+
+    def close(self) -> None:
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def abort(self) -> None:
+        with self._cond:
+            self._aborted = True
+            self._cond.notify_all()
+
+    # lado do SDK: read() só devolve menos que n no fim (menos que chunk_size = último bloco)
+    def read(self, n: int = -1) -> bytes:
+        with self._cond:
+            while not self._aborted and not self._eof and (n is None or n < 0 or len(self._buf) < n):
+                self._cond.wait()
+            if self._aborted:
+                raise _StreamCancelled()
+            take = len(self._buf) if n is None or n < 0 else min(n, len(self._buf))
+            data = bytes(self._buf[:take])
+            del self._buf[:take]
+            self._read += take
+            return data
+
+    def tell(self) -> int:
+        return self._read
+
+
+# um storage.Client por processo, criado no primeiro uso (SDK fora do cold start)
+_shared_client: Optional["storage.Client"] = None
+_client_lock = threading.Lock()
+
+
+def shared_client() -> "storage.Client":
+    global _shared_client
+    if _shared_client is None:
+        with _client_lock:
+            if _shared_client is None:
+                from google.cloud import storage
+                _shared_client = storage.Client()
+    return _shared_client
 
 
 class GCSClient:
     def __init__(self):
-        self._client: Optional[storage.Client] = None
+        self._client: Optional["storage.Client"] = None
 
     @property
-    def client(self) -> storage.Client:
+    def client(self) -> "storage.Client":
         if self._client is None:
-            self._client = storage.Client()
+            self._client = shared_client()
         return self._client
 
-    def write_object(self, bucket: str, path: str, data: bytes, content_type: str) -> str:
+    @staticmethod
+    def object_url(bucket: str, path: str) -> str:
+        # URL pública só para referência; quando bucket é privado use signed_url()
+        return f"https://storage.googleapis.com/{bucket}/{path}"
+
+    def write_object(self, bucket: str, path: str, data: bytes, content_type: str,
+                     metadata: Optional[Dict[str, str]] = None) -> str:
         bkt = self.client.bucket(bucket)
         blob = bkt.blob(path)
+        if metadata:
+            blob.metadata = metadata
         blob.upload_from_string(data, content_type=content_type)
-        # URL pública só para referência; quando bucket é privado use signed_url()
-        return f"https://storage.googleapis.com/{bucket}/{path}"
+        return self.object_url(bucket, path)
+
+    def write_stream(self, bucket: str, path: str, fp: BinaryIO, size: Optional[int],
+                     content_type: str, chunk_size: Optional[int] = None,
+                     metadata: Optional[Dict[str, str]] = None) -> str:
+        """Upload resumable lendo 'fp' em blocos de chunk_size (memória constante)."""
+        bkt = self.client.bucket(bucket)
+        blob = bkt.blob(path, chunk_size=_align_chunk(chunk_size or UPLOAD_CHUNK_BYTES))
+        if metadata:
+            blob.metadata = metadata
+        blob.upload_from_file(fp, size=size, content_type=content_type)
+        return self.object_url(bucket, path)
+
+    def compose(self, bucket: str, path: str, part_paths: List[str], content_type: str,
+                metadata: Optional[Dict[str, str]] = None) -> str:
+        """
+        Junta as partes (na ordem) em 'path'. Acima de 32 partes compõe em níveis,
+        usando objetos intermediários que são removidos ao final.
+        """
+        bkt = self.client.bucket(bucket)
+        level, intermediates, n = list(part_paths), [], 0
+        while len(level) > _MAX_COMPOSE_SOURCES:
+            nxt = []
+            for i in range(0, len(level), _MAX_COMPOSE_SOURCES):
+                tmp = f"{part_paths[0]}.compose-{n:04d}"
+                n += 1
+                bkt.blob(tmp).compose([bkt.blob(p) for p in level[i:i + _MAX_COMPOSE_SOURCES]])
+                intermediates.append(tmp)
+                nxt.append(tmp)
+            level = nxt
+        dest = bkt.blob(path)
+        dest.content_type = content_type
+        if metadata:
+            dest.metadata = metadata
+        try:
+            dest.compose([bkt.blob(p) for p in level])
+        finally:
+            self.delete_objects(bucket, intermediates)
+        return self.object_url(bucket, path)
+
+    def delete_objects(self, bucket: str, paths: List[str]) -> None:
+        """Remove objetos ignorando os que já não existem."""
+        if not paths:
+            return
+        bkt = self.client.bucket(bucket)
+        bkt.delete_blobs([bkt.blob(p) for p in paths], on_error=lambda blob: None)
+
+    def create_if_absent(self, bucket: str, path: str, data: bytes,
+                         content_type: str = "application/json") -> Optional[int]:
+        """Cria o objeto só se ele não existir (precondição de geração 0); devolve a geração ou None."""
+        return self.write_if_generation(bucket, path, data, 0, content_type)
+
+    def write_if_generation(self, bucket: str, path: str, data: bytes, generation: int,
+                            content_type: str = "application/json") -> Optional[int]:
+        """Grava só se o objeto ainda estiver em 'generation' (0 = ausente); devolve a nova geração ou None."""
+        from google.api_core.exceptions import PreconditionFailed
+        blob = self.client.bucket(bucket).blob(path)
+        try:
+            blob.upload_from_string(data, content_type=content_type, if_generation_match=generation)
+        except PreconditionFailed:
+            return None
+        return blob.generation
+
+    def read_object(self, bucket: str, path: str) -> Optional[Tuple[bytes, int]]:
+        """(bytes, geração lida) numa só requisição; None se o objeto não existe."""
+        from google.api_core.exceptions import NotFound
+        blob = self.client.bucket(bucket).blob(path)
+        try:
+            data = blob.download_as_bytes()
+        except NotFound:
+            return None
+        return data, blob.generation
+
+    def object_info(self, bucket: str, path: str) -> Optional[Dict[str, Any]]:
+        blob = self.client.bucket(bucket).get_blob(path)
+        if blob is None:
+            return None
+        return {"generation": blob.generation, "updated": blob.updated, "size": blob.size,
+                "content_type": blob.content_type, "crc32c": blob.crc32c, "metadata": blob.metadata or {}}
+
+    def delete_generation(self, bucket: str, path: str, generation: int) -> bool:
+        """Remove o objeto apenas se ainda estiver na geração informada."""
+        from google.api_core.exceptions import NotFound, PreconditionFailed
+        try:
+            self.client.bucket(bucket).blob(path).delete(if_generation_match=generation)
+            return True
+        except (PreconditionFailed, NotFound):
+            return False
+
+    def iter_range(self, bucket: str, path: str, start: int = 0, end: Optional[int] = None,
+                   generation: Optional[int] = None,
+                   chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+        """
+        Bytes [start, end] (end inclusivo; None = até o fim) de uma geração do objeto, numa
+        única requisição ao Storage, repassados em blocos de chunk_size. Memória limitada a
+        STREAM_BUFFERED_CHUNKS blocos: o download espera o consumidor. Fechar o gerador
+        (cliente desconectou) interrompe o download.
+        """
+        blob = self.client.bucket(bucket).blob(path, generation=generation)
+        chunks: "queue.Queue[Any]" = queue.Queue(maxsize=STREAM_BUFFERED_CHUNKS)
+        cancelled = threading.Event()
+        done = object()
+
+        def put(item: Any) -> None:
+            while True:
+                try:
+                    chunks.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    if cancelled.is_set():
+                        raise _StreamCancelled()
+
+        class _Sink:
+            def __init__(self):
+                self.buf = bytearray()
+
+            def write(self, data: bytes) -> int:
+                self.buf += data
+                while len(self.buf) >= chunk_size:
+                    put(bytes(self.buf[:chunk_size]))
+                    del self.buf[:chunk_size]
+                return len(data)
+
+        def download() -> None:
+            sink = _Sink()
+            try:
+                # checksum só vale para o objeto inteiro
+                ranged = bool(start) or end is not None
+                blob.download_to_file(sink, start=start or None, end=end,
+                                      checksum=None if ranged else "md5")
+                if sink.buf:
+                    put(bytes(sink.buf))
+                put(done)
+            except _StreamCancelled:
+                pass
+            except Exception as e:
+                try:
+                    put(e)
+                except _StreamCancelled:
+                    pass
+
+        threading.Thread(target=download, name="gcs-stream", daemon=True).start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    def upload_chunks(self, bucket: str, path: str, content_type: str,
+                      max_buffered_bytes: int = 4 * UPLOAD_CHUNK_BYTES) -> ChunkUpload:
+        """Upload resumable em background com origem em blocos (ver ChunkUpload); result resolve para a URL."""
+        upload = ChunkUpload(max_buffered_bytes)
+
+        def run() -> None:
+            try:
+                upload.result.set_result(self.write_stream(bucket, path, upload, None, content_type))
+            except BaseException as e:
+                upload.result.set_exception(e)
+
+        threading.Thread(target=run, name="gcs-upload", daemon=True).start()
+        return upload
 
     def signed_url(self, bucket: str, path: str, minutes: int = 15) -> str:
+        return self.sign_urls(bucket, [path], minutes * 60)[path]
+
+    def _signing_kwargs(self) -> Dict[str, Any]:
+        """
+        Credencial sem chave privada (ADC no Cloud Run) assina via IAM signBlob:
+        precisa do e-mail da service account e de um access token válido.
+        """
+        from google.auth.credentials import Signing
+        creds = self.client._credentials
+        if isinstance(creds, Signing):
+            return {}
+        if not creds.valid:
+            from google.auth.transport.requests import Request
+            creds.refresh(Request())
+        return {"service_account_email": creds.service_account_email, "access_token": creds.token}
+
+    def sign_urls(self, bucket: str, paths: List[str], expiry_seconds: int,
+                  workers: int = 8) -> Dict[str, str]:
+        """URLs V4 (GET) para vários objetos; com signBlob cada assinatura é uma chamada, em paralelo."""
+        if not paths:
+            return {}
         bkt = self.client.bucket(bucket)
-        blob = bkt.blob(path)
-        return blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=minutes),
-            method="GET",
-        )
+        kwargs = self._signing_kwargs()
+
+        def sign(path: str) -> str:
+            return bkt.blob(path).generate_signed_url(
+                version="v4",
+                expiration=timedelta(seconds=expiry_seconds),
+                method="GET",
+                **kwargs,
+            )
+
+        if len(paths) == 1 or not kwargs:
+            # assinatura local (chave privada): só CPU, threads não ajudam
+            return {p: sign(p) for p in paths}
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            return dict(zip(paths, pool.map(sign, paths)))
 
     def list_paths(self, bucket: str, prefix: str) -> List[str]:
         """Lista nomes (paths) de objetos sob um prefixo."""
@@ -37,6 +332,23 @@ class GCSClient:
         blobs = self.client.list_blobs(bkt, prefix=prefix)
         return [b.name for b in blobs if not b.name.endswith("/")]
 
+    def list_objects(self, bucket: str, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """Metadados enxutos (tamanho, geração, crc32c, data, metadata custom) por path sob um prefixo."""
+        fields = "items(name,size,generation,crc32c,contentType,updated,metadata),nextPageToken"
+        out: Dict[str, Dict[str, Any]] = {}
+        for b in self.client.list_blobs(bucket, prefix=prefix, fields=fields):
+            if b.name.endswith("/"):
+                continue
+            out[b.name] = {
+                "size": b.size,
+                "generation": b.generation,
+                "crc32c": b.crc32c,
+                "content_type": b.content_type,
+                "updated": b.updated,
+                "metadata": b.metadata or {},
+            }
+        return out
+
     def read_bytes(self, bucket: str, path: str) -> bytes:
         bkt = self.client.bucket(bucket)
         blob = bkt.blob(path)
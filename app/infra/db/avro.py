@@ -0,0 +1,122 @@
+# app/infra/db/avro.py
+"""
+Escritor mínimo de Avro Object Container File (codec deflate) só com a stdlib,
+para cargas no BigQuery sem depender de fastavro/pyarrow.
+Cobre os tipos das nossas tabelas: STRING, INT64, FLOAT64, BOOL, TIMESTAMP e JSON,
+todos anuláveis (union ["null", T]).
+"""
+import json
+import os
+import struct
+import zlib
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterable, List, Tuple
+
+_MAGIC = b"Obj\x01"
+_BLOCK_ROWS = 1000
+
+# tipo BigQuery -> tipo Avro (TIMESTAMP/JSON com anotações que o BigQuery reconhece)
+_AVRO_TYPES: Dict[str, Any] = {
+    "STRING": "string",
+    "INT64": "long",
+    "FLOAT64": "double",
+    "BOOL": "boolean",
+    "TIMESTAMP": {"type": "long", "logicalType": "timestamp-micros"},
+    "JSON": {"type": "string", "sqlType": "JSON"},
+}
+
+
+def _long(n: int) -> bytes:
+    n = (n << 1) ^ (n >> 63)  # zigzag
+    out = bytearray()
+    while n & ~0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _bytes(b: bytes) -> bytes:
+    return _long(len(b)) + b
+
+
+def _timestamp_micros(v: Any) -> int:
+    if isinstance(v, (int, float)):
+        return int(v * 1_000_000)
+    if isinstance(v, str):
+        v = datetime.fromisoformat(v.replace("Z", "+00:00"))
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    delta = v - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _encode_value(bq_type: str, v: Any) -> bytes:
+    if bq_type == "INT64":
+        return _long(int(v))
+    if bq_type == "FLOAT64":
+        return struct.pack("<d", float(v))
+    if bq_type == "BOOL":
+        return b"\x01" if v else b"\x00"
+    if bq_type == "TIMESTAMP":
+        return _long(_timestamp_micros(v))
+    if bq_type == "JSON":
+        v = v if isinstance(v, str) else json.dumps(v, ensure_ascii=False, default=str)
+    return _bytes(str(v).encode("utf-8"))
+
+
+def avro_schema(name: str, fields: List[Tuple[str, str]]) -> Dict[str, Any]:
+    return {
+        "type": "record",
+        "name": name,
+        "fields": [
+            {"name": col, "type": ["null", _AVRO_TYPES[bq_type]], "default": None}
+            for col, bq_type in fields
+        ],
+    }
+
+
+def encode_row(fields: List[Tuple[str, str]], row: Dict[str, Any]) -> bytes:
+    out = bytearray()
+    for col, bq_type in fields:
+        v = row.get(col)
+        if v is None:
+            out += b"\x00"  # union índice 0 = null
+        else:
+            out += b"\x02" + _encode_value(bq_type, v)  # índice 1 (zigzag)
+    return bytes(out)
+
+
+def write_container(fp: BinaryIO, name: str, fields: List[Tuple[str, str]],
+                    rows: Iterable[Dict[str, Any]], level: int = 6) -> int:
+    """Grava as linhas em blocos comprimidos (no máximo _BLOCK_ROWS em memória); devolve o total de linhas."""
+    sync = os.urandom(16)
+    meta = {
+        "avro.schema": json.dumps(avro_schema(name, fields)).encode("utf-8"),
+        "avro.codec": b"deflate",
+    }
+    fp.write(_MAGIC)
+    fp.write(_long(len(meta)))
+    for k, v in meta.items():
+        fp.write(_bytes(k.encode("utf-8")) + _bytes(v))
+    fp.write(_long(0))
+    fp.write(sync)
+
+    total = 0
+    block: List[bytes] = []
+
+    def flush() -> None:
+        if not block:
+            return
+        comp = zlib.compressobj(level, zlib.DEFLATED, -15)  # deflate "cru" (RFC 1951)
+        data = comp.compress(b"".join(block)) + comp.flush()
+        fp.write(_long(len(block)) + _long(len(data)) + data + sync)
+        block.clear()
+
+    for row in rows:
+        block.append(encode_row(fields, row))
+        total += 1
+        if len(block) >= _BLOCK_ROWS:
+            flush()
+    flush()
+    return total
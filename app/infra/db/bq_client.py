@@ -1,35 +1,87 @@
 # app/infra/db/bq_client.py
 
 import os
-from typing import Any, Dict, List, Optional, Iterable
-from google.cloud import bigquery
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Iterable, Tuple
 from ..auth.credentials import load_credentials, resolve_project_id
+from .avro import write_container
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
 
 __all__ = [
     "client",
     "fq",
     "ensure_dataset",
-    "ensure_assets_table",
-    "ensure_colors_table",
     "ensure_all_tables",
     "ensure_assets_tables",  # alias solicitado
     "q",
+    "q_async",
     "q_stream",
+    "dml",
     "load_json",
+    "load_tables",
+    "record_query_stats",
+    "TABLE_SCHEMAS",
+    "TABLE_LAYOUT",
 ]
 
 _DATASET = os.getenv("BQ_DATASET", "brand_guides")
-_bq_client: Optional[bigquery.Client] = None
+_bq_client: Optional["bigquery.Client"] = None
+_client_lock = threading.Lock()
+# avro (padrão): arquivo tipado e comprimido em disco | json: load_table_from_json
+_LOAD_FORMAT = os.getenv("BQ_LOAD_FORMAT", "avro").lower()
+# jobs de consulta em voo por processo (q_async): leituras concorrentes sem estourar a cota
+_QUERY_CONCURRENCY = int(os.getenv("BQ_QUERY_CONCURRENCY", "16"))
+_query_pool: Optional[ThreadPoolExecutor] = None
+
+# Colunas declaradas no CREATE e nas migrações (manter em sincronia), na ordem da tabela.
+TABLE_SCHEMAS: Dict[str, List[Tuple[str, str]]] = {
+    "assets": [
+        ("brand_name", "STRING"), ("category", "STRING"), ("subcategory", "STRING"),
+        ("sequence", "INT64"), ("original_name", "STRING"), ("path", "STRING"),
+        ("url", "STRING"), ("created_at", "TIMESTAMP"),
+        ("category_key", "STRING"), ("category_label", "STRING"), ("category_seq", "INT64"),
+        ("subcategory_key", "STRING"), ("subcategory_label", "STRING"), ("subcategory_seq", "INT64"),
+        ("columns", "INT64"), ("is_original", "BOOL"), ("asset_type", "STRING"),
+        ("text_content", "STRING"), ("renditions", "JSON"), ("version_id", "STRING"),
+    ],
+    "colors": [
+        ("brand_name", "STRING"), ("color_name", "STRING"), ("hex", "STRING"),
+        ("role", "STRING"), ("created_at", "TIMESTAMP"),
+        ("palette_key", "STRING"), ("color_key", "STRING"), ("color_label", "STRING"),
+        ("rgb_txt", "STRING"), ("cmic_txt", "STRING"), ("cmyk_txt", "STRING"),
+        ("pantone_txt", "STRING"), ("category", "STRING"), ("subcategory", "STRING"),
+        ("sequence", "INT64"), ("raw_json", "JSON"), ("version_id", "STRING"),
+    ],
+}
+
+# Cluster pelos filtros das leituras (brand_name sempre primeiro): é ele que poda as leituras.
+# Sem partição: nenhuma leitura filtra por data, então uma partição por created_at não podaria nada.
+TABLE_LAYOUT: Dict[str, Dict[str, Any]] = {
+    "assets": {"partition": None, "cluster": ["brand_name", "category_key", "subcategory_key"]},
+    "colors": {"partition": None, "cluster": ["brand_name", "category", "subcategory"]},
+}
+
+_recorder = threading.local()
 
 
 # ----------------------------
 # Client / helpers
 # ----------------------------
-def client() -> bigquery.Client:
+def client() -> "bigquery.Client":
     global _bq_client
     if _bq_client is None:
-        creds = load_credentials()
-        _bq_client = bigquery.Client(project=resolve_project_id(creds), credentials=creds)
+        with _client_lock:
+            if _bq_client is None:
+                # SDK importado só no primeiro uso (fora do cold start)
+                from google.cloud import bigquery
+                creds = load_credentials()
+                _bq_client = bigquery.Client(project=resolve_project_id(creds), credentials=creds)
     return _bq_client
 
 
@@ -41,12 +93,6 @@ def _exec(sql: str) -> None:
     client().query(sql).result()
 
 
-def _exec_many(ddls: List[str]) -> None:
-    for ddl in ddls:
-        if ddl and ddl.strip():
-            _exec(ddl)
-
-
 # ----------------------------
 # Ensure (Dataset / Tables)
 # ----------------------------
@@ -54,82 +100,26 @@ def ensure_dataset() -> None:
     _exec(f"CREATE SCHEMA IF NOT EXISTS `{client().project}.{_DATASET}`;")
 
 
-def ensure_assets_table() -> None:
-    """
-    Tabela 'assets' compatível com legado, com colunas novas para a nova ingestão.
-    Mantém 'category' e 'subcategory' legadas; adiciona chaves/seq novas.
+def create_table_sql(table: str, name: Optional[str] = None, if_not_exists: bool = True) -> str:
+    """CREATE com todas as colunas declaradas, já no layout de TABLE_LAYOUT."""
+    cols = ",\n      ".join(
+        f"{col} {t} DEFAULT CURRENT_TIMESTAMP()" if col == "created_at" else f"{col} {t}"
+        for col, t in TABLE_SCHEMAS[table]
+    )
+    layout = TABLE_LAYOUT[table]
+    partition = f"PARTITION BY DATE({layout['partition']})\n    " if layout["partition"] else ""
+    return f"""
+    CREATE TABLE {"IF NOT EXISTS " if if_not_exists else ""}{fq(name or table)} (
+      {cols}
+    )
+    {partition}CLUSTER BY {", ".join(layout['cluster'])};
     """
-    ensure_dataset()
-
-    # Criação base (legado)
-    _exec(f"""
-    CREATE TABLE IF NOT EXISTS {fq('assets')} (
-      brand_name        STRING,
-      category          STRING,
-      subcategory       STRING,
-      sequence          INT64,
-      original_name     STRING,
-      path              STRING,
-      url               STRING,
-      created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP()
-    );
-    """)
-
-    # Evoluções (idempotentes)
-    _exec_many([
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS category_key STRING;",
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS category_label STRING;",
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS category_seq INT64;",
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS subcategory_key STRING;",
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS subcategory_label STRING;",
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS subcategory_seq INT64;",
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS columns INT64;",        # 1..4
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS is_original BOOL;",
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS asset_type STRING;",    # 'image' | 'text'
-        f"ALTER TABLE {fq('assets')} ADD COLUMN IF NOT EXISTS text_content STRING;",  # textos de categoria/sub
-    ])
-
-    # View de compatibilidade opcional
-    _exec(f"""
-    CREATE OR REPLACE VIEW {fq('assets_legacy')} AS
-    SELECT
-      brand_name,
-      COALESCE(category_label, category)              AS category,
-      COALESCE(subcategory_label, subcategory)        AS subcategory,
-      sequence, original_name, path, url, created_at
-    FROM {fq('assets')};
-    """)
-
-
-def ensure_colors_table() -> None:
-    ensure_dataset()
-    _exec(f"""
-    CREATE TABLE IF NOT EXISTS {fq('colors')} (
-      brand_name  STRING,
-      color_name  STRING,
-      hex         STRING,
-      role        STRING,
-      created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP()
-    );
-    """)
-    _exec_many([
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS palette_key STRING;",
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS color_key STRING;",
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS color_label STRING;",
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS rgb_txt STRING;",
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS cmic_txt STRING;",   # legado
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS cmyk_txt STRING;",   # novo
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS pantone_txt STRING;",# novo
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS category STRING;",   # novo: main|secondary
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS subcategory STRING;",# novo: primary|secondary|others|null
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS sequence INT64;",
-        f"ALTER TABLE {fq('colors')} ADD COLUMN IF NOT EXISTS raw_json JSON;",
-    ])
 
 
 def ensure_all_tables() -> None:
-    ensure_assets_table()
-    ensure_colors_table()
+    """Aplica as migrações pendentes (ver app.infra.db.migrations)."""
+    from .migrations import migrate
+    migrate()
 
 
 def ensure_assets_tables() -> None:
@@ -149,33 +139,168 @@ def _infer_type(v: Any) -> str:
     return "STRING"
 
 
+@contextmanager
+def record_query_stats():
+    """
+    Coleta, para cada q() desta thread, os bytes processados/cobrados (cache de
+    consulta desligado), para conferir se os filtros realmente podam a tabela.
+    """
+    _recorder.stats = []
+    try:
+        yield _recorder.stats
+    finally:
+        _recorder.stats = None
+
+
+def _query_config(params: Optional[Dict[str, Any]], force: bool = False):
+    if not params and not force:
+        return None
+    from google.cloud import bigquery
+    qp = [bigquery.ScalarQueryParameter(k, _infer_type(v), v) for k, v in (params or {}).items()]
+    return bigquery.QueryJobConfig(query_parameters=qp)
+
+
 def q(sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-    job_config = None
-    if params:
-        qp = [bigquery.ScalarQueryParameter(k, _infer_type(v), v) for k, v in params.items()]
-        job_config = bigquery.QueryJobConfig(query_parameters=qp)
-    rows = client().query(sql, job_config=job_config).result()
+    job_config = _query_config(params)
+    stats = getattr(_recorder, "stats", None)
+    if stats is not None:
+        job_config = job_config or _query_config({}, force=True)
+        job_config.use_query_cache = False
+    job = client().query(sql, job_config=job_config)
+    rows = job.result()
+    if stats is not None:
+        stats.append({
+            "job_id": job.job_id,
+            "bytes_processed": job.total_bytes_processed,
+            "bytes_billed": job.total_bytes_billed,
+            "tables": [t.table_id for t in (job.referenced_tables or [])],
+            "sql": " ".join(sql.split())[:160],
+        })
     return [dict(r) for r in rows]
 
 
+def _get_query_pool() -> ThreadPoolExecutor:
+    global _query_pool
+    if _query_pool is None:
+        with _client_lock:
+            if _query_pool is None:
+                _query_pool = ThreadPoolExecutor(max_workers=max(1, _QUERY_CONCURRENCY),
+                                                 thread_name_prefix="bq-query")
+    return _query_pool
+
+
+def q_async(sql: str, params: Optional[Dict[str, Any]] = None) -> "Future[List[Dict[str, Any]]]":
+    """
+    q() no executor compartilhado e limitado (BQ_QUERY_CONCURRENCY): dispare as consultas
+    de uma leitura e só depois espere os resultados. As tarefas do executor são sempre
+    consultas-folha (nunca esperam outras), então não há como travar o pool.
+    """
+    stats = getattr(_recorder, "stats", None)
+
+    def run() -> List[Dict[str, Any]]:
+        _recorder.stats = stats  # record_query_stats da thread que disparou
+        try:
+            return q(sql, params)
+        finally:
+            _recorder.stats = None
+
+    return _get_query_pool().submit(run)
+
+
 def q_stream(sql: str, params: Optional[Dict[str, Any]] = None) -> Iterable[Dict[str, Any]]:
-    job_config = None
-    if params:
-        qp = [bigquery.ScalarQueryParameter(k, _infer_type(v), v) for k, v in params.items()]
-        job_config = bigquery.QueryJobConfig(query_parameters=qp)
+    job_config = _query_config(params)
     for row in client().query(sql, job_config=job_config).result(page_size=1000):
         yield dict(row)
 
 
+def dml(sql: str, params: Optional[Dict[str, Any]] = None) -> int:
+    """Executa INSERT/UPDATE/DELETE/MERGE e devolve o número de linhas afetadas."""
+    job_config = _query_config(params)
+    job = client().query(sql, job_config=job_config)
+    job.result()
+    return int(job.num_dml_affected_rows or 0)
+
+
 def load_json(table: str, rows: List[Dict[str, Any]]) -> None:
     if not rows:
         return
+    from google.cloud import bigquery
     job = client().load_table_from_json(
         rows,
         f"{client().project}.{_DATASET}.{table}",
         job_config=bigquery.LoadJobConfig(
             write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            create_disposition=bigquery.CreateDisposition.CREATE_NEVER,
             ignore_unknown_values=True
         ),
     )
     job.result()
+
+
+def _load_avro(table: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Codifica as linhas em Avro (deflate) num arquivo temporário contra o schema declarado
+    e carrega via load_table_from_file. Só entram as colunas presentes nas linhas, para
+    que as omitidas continuem recebendo o DEFAULT da tabela (como no load em JSON).
+    """
+    present = set()
+    for r in rows:
+        present.update(r.keys())
+    fields = [(col, t) for col, t in TABLE_SCHEMAS[table] if col in present]
+    from google.cloud import bigquery
+    started = time.perf_counter()
+    with tempfile.TemporaryFile() as fp:
+        n = write_container(fp, table, fields, rows)
+        encoded = fp.tell()
+        fp.seek(0)
+        job = client().load_table_from_file(
+            fp,
+            f"{client().project}.{_DATASET}.{table}",
+            job_config=bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.AVRO,
+                use_avro_logical_types=True,
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                create_disposition=bigquery.CreateDisposition.CREATE_NEVER,
+            ),
+        )
+        job.result()
+    return {
+        "table": table,
+        "format": "avro",
+        "rows": n,
+        "encoded_bytes": encoded,
+        "latency_ms": round((time.perf_counter() - started) * 1000),
+        "job_id": job.job_id,
+    }
+
+
+def _load_one(table: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Cargas nunca criam a tabela (CREATE_NEVER): sem ela (migrações não aplicadas, ou a
+    troca de nomes do table_layout, que roda em janela de manutenção) a carga falha na
+    hora, em vez de criar uma tabela sem layout com schema inferido.
+    """
+    if _LOAD_FORMAT == "avro" and table in TABLE_SCHEMAS:
+        return _load_avro(table, rows)
+    started = time.perf_counter()
+    load_json(table, rows)
+    return {
+        "table": table,
+        "format": "json",
+        "rows": len(rows),
+        "encoded_bytes": None,
+        "latency_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+
+def load_tables(tables: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Carrega várias tabelas ao mesmo tempo (um load job por tabela, em paralelo).
+    Devolve {tabela: {rows, encoded_bytes, latency_ms, ...}}; relança a primeira falha.
+    """
+    tables = {t: rows for t, rows in tables.items() if rows}
+    if not tables:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(tables), thread_name_prefix="bq-load") as pool:
+        futures = {t: pool.submit(_load_one, t, rows) for t, rows in tables.items()}
+        return {t: f.result() for t, f in futures.items()}
@@ -0,0 +1,372 @@
+# app/infra/db/migrations.py
+"""
+Migrações versionadas do schema no BigQuery.
+
+As versões aplicadas ficam em schema_migrations (uma linha por migração). No boot,
+ensure_schema() faz uma única leitura dessa tabela (tabledata.list, sem job de query)
+e só aplica algo se faltar versão. A aplicação roda uma vez só, sob um lock em GCS
+(objeto criado com precondição de geração 0). Dentro de cada migração os passos de um
+mesmo grupo são independentes e rodam em paralelo; os grupos rodam em ordem.
+
+    python -m app.infra.db.migrations status
+    python -m app.infra.db.migrations migrate      # pré-deploy
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from ..bucket.gcs_client import GCSClient
+from .bq_client import client, dml, ensure_dataset, fq, _DATASET
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+# auto: aplica o que faltar antes de servir | background: idem numa thread, sem segurar o
+# boot (só com migrate no pré-deploy: até lá o worker atende com o schema que houver)
+# check: só avisa | off: não consulta (migrate roda no pré-deploy)
+ON_BOOT = os.getenv("MIGRATIONS_ON_BOOT", "auto").lower()
+_LOCK_BUCKET = os.getenv("GCS_BUCKET", "brand-guides")
+_LOCK_PATH = f"_migrations/{_DATASET}.lock"
+LOCK_TTL_SECONDS = int(os.getenv("MIGRATIONS_LOCK_TTL_SECONDS", "600"))
+LOCK_WAIT_SECONDS = int(os.getenv("MIGRATIONS_LOCK_WAIT_SECONDS", "300"))
+
+
+def _add_columns(table: str, columns: List[str]) -> str:
+    """Um único ALTER com vários ADD COLUMN (um job, uma atualização de metadados)."""
+    adds = ",\n      ".join(f"ADD COLUMN IF NOT EXISTS {c}" for c in columns)
+    return f"ALTER TABLE {fq(table)}\n      {adds};"
+
+
+# ----------------------------
+# Migrações (só acrescentar no fim; nunca editar uma já aplicada)
+# ----------------------------
+def _m001_base_tables() -> List[List[str]]:
+    # DDL congelado como foi aplicado (não usar TABLE_SCHEMAS/TABLE_LAYOUT, que mudam)
+    return [
+        [f"""
+        CREATE TABLE IF NOT EXISTS {fq('assets')} (
+          brand_name STRING,
+          category STRING,
+          subcategory STRING,
+          sequence INT64,
+          original_name STRING,
+          path STRING,
+          url STRING,
+          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP(),
+          category_key STRING,
+          category_label STRING,
+          category_seq INT64,
+          subcategory_key STRING,
+          subcategory_label STRING,
+          subcategory_seq INT64,
+          columns INT64,
+          is_original BOOL,
+          asset_type STRING,
+          text_content STRING,
+          renditions JSON,
+          version_id STRING
+        )
+        PARTITION BY DATE(created_at)
+        CLUSTER BY brand_name, category_key, subcategory_key;
+        """, f"""
+        CREATE TABLE IF NOT EXISTS {fq('colors')} (
+          brand_name STRING,
+          color_name STRING,
+          hex STRING,
+          role STRING,
+          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP(),
+          palette_key STRING,
+          color_key STRING,
+          color_label STRING,
+          rgb_txt STRING,
+          cmic_txt STRING,
+          cmyk_txt STRING,
+          pantone_txt STRING,
+          category STRING,
+          subcategory STRING,
+          sequence INT64,
+          raw_json JSON,
+          version_id STRING
+        )
+        PARTITION BY DATE(created_at)
+        CLUSTER BY brand_name, category, subcategory;
+        """],
+        # tabelas legadas: colunas da nova ingestão
+        [
+            _add_columns("assets", [
+                "category_key STRING", "category_label STRING", "category_seq INT64",
+                "subcategory_key STRING", "subcategory_label STRING", "subcategory_seq INT64",
+                "columns INT64",        # 1..4
+                "is_original BOOL",
+                "asset_type STRING",    # 'image' | 'text'
+                "text_content STRING",  # textos de categoria/sub
+                "renditions JSON",      # [{name,path,width,height,content_type}]
+            ]),
+            _add_columns("colors", [
+                "palette_key STRING", "color_key STRING", "color_label STRING",
+                "rgb_txt STRING",
+                "cmic_txt STRING",      # legado
+                "cmyk_txt STRING", "pantone_txt STRING",
+                "category STRING",      # main|secondary
+                "subcategory STRING",   # primary|secondary|others|null
+                "sequence INT64", "raw_json JSON",
+            ]),
+        ],
+        # view de compatibilidade (depende das colunas acima)
+        [f"""
+        CREATE OR REPLACE VIEW {fq('assets_legacy')} AS
+        SELECT
+          brand_name,
+          COALESCE(category_label, category)              AS category,
+          COALESCE(subcategory_label, subcategory)        AS subcategory,
+          sequence, original_name, path, url, created_at
+        FROM {fq('assets')};
+        """],
+    ]
+
+
+def _m002_ingestion_versions() -> List[List[str]]:
+    return [[
+        _add_columns("assets", ["version_id STRING"]),
+        _add_columns("colors", ["version_id STRING"]),
+        # ponteiro da versão corrente por marca (uma linha por marca)
+        f"""
+        CREATE TABLE IF NOT EXISTS {fq('brand_versions')} (
+          brand_name           STRING,
+          version_id           STRING,
+          previous_version_id  STRING,
+          updated_at           TIMESTAMP
+        );
+        """,
+    ]]
+
+
+def _m003_drop_partition() -> List[List[str]]:
+    # Recria sem partição só tabela vazia (instalação nova); com dados, quem troca o
+    # layout é o python -m app.infra.db.table_layout migrate (cópia + troca de nomes).
+    return [[f"""
+        IF NOT EXISTS (SELECT 1 FROM {fq('assets')} LIMIT 1) THEN
+          CREATE OR REPLACE TABLE {fq('assets')} (
+            brand_name STRING,
+            category STRING,
+            subcategory STRING,
+            sequence INT64,
+            original_name STRING,
+            path STRING,
+            url STRING,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP(),
+            category_key STRING,
+            category_label STRING,
+            category_seq INT64,
+            subcategory_key STRING,
+            subcategory_label STRING,
+            subcategory_seq INT64,
+            columns INT64,
+            is_original BOOL,
+            asset_type STRING,
+            text_content STRING,
+            renditions JSON,
+            version_id STRING
+          )
+          CLUSTER BY brand_name, category_key, subcategory_key;
+        END IF;
+        """, f"""
+        IF NOT EXISTS (SELECT 1 FROM {fq('colors')} LIMIT 1) THEN
+          CREATE OR REPLACE TABLE {fq('colors')} (
+            brand_name STRING,
+            color_name STRING,
+            hex STRING,
+            role STRING,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP(),
+            palette_key STRING,
+            color_key STRING,
+            color_label STRING,
+            rgb_txt STRING,
+            cmic_txt STRING,
+            cmyk_txt STRING,
+            pantone_txt STRING,
+            category STRING,
+            subcategory STRING,
+            sequence INT64,
+            raw_json JSON,
+            version_id STRING
+          )
+          CLUSTER BY brand_name, category, subcategory;
+        END IF;
+        """]]
+
+
+MIGRATIONS: List[Dict[str, Any]] = [
+    {"version": 1, "name": "tabelas base (assets, colors, assets_legacy)", "steps": _m001_base_tables},
+    {"version": 2, "name": "snapshots de ingestão (version_id, brand_versions)", "steps": _m002_ingestion_versions},
+    {"version": 3, "name": "assets/colors sem partição (tabelas vazias)", "steps": _m003_drop_partition},
+]
+LATEST_VERSION = max(m["version"] for m in MIGRATIONS)
+
+
+# ----------------------------
+# Estado
+# ----------------------------
+def applied_versions() -> List[int]:
+    """Leitura barata (sem job): versões já registradas em schema_migrations."""
+    from google.api_core.exceptions import NotFound
+    from google.cloud import bigquery
+    try:
+        rows = client().list_rows(
+            f"{client().project}.{_DATASET}.{MIGRATIONS_TABLE}",
+            selected_fields=[bigquery.SchemaField("version", "INT64")],
+        )
+        return sorted(r["version"] for r in rows)
+    except NotFound:
+        return []
+
+
+def pending_migrations(applied: List[int] = None) -> List[Dict[str, Any]]:
+    done = set(applied_versions() if applied is None else applied)
+    return [m for m in MIGRATIONS if m["version"] not in done]
+
+
+def _ensure_migrations_table() -> None:
+    ensure_dataset()
+    client().query(f"""
+    CREATE TABLE IF NOT EXISTS {fq(MIGRATIONS_TABLE)} (
+      version      INT64,
+      name         STRING,
+      applied_at   TIMESTAMP,
+      duration_ms  INT64,
+      applied_by   STRING
+    );
+    """).result()
+
+
+# ----------------------------
+# Lock (GCS)
+# ----------------------------
+@contextmanager
+def migration_lock(gcs: GCSClient = None):
+    """
+    Lock exclusivo entre processos/instâncias: só um consegue criar o objeto.
+    Lock mais velho que LOCK_TTL_SECONDS é tratado como abandonado e removido.
+    """
+    gcs = gcs or GCSClient()
+    owner = json.dumps({"host": socket.gethostname(), "pid": os.getpid(),
+                        "at": datetime.now(timezone.utc).isoformat()}).encode("utf-8")
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while True:
+        generation = gcs.create_if_absent(_LOCK_BUCKET, _LOCK_PATH, owner)
+        if generation is not None:
+            break
+        info = gcs.object_info(_LOCK_BUCKET, _LOCK_PATH)
+        if info and info["updated"]:
+            age = (datetime.now(timezone.utc) - info["updated"]).total_seconds()
+            if age > LOCK_TTL_SECONDS:
+                gcs.delete_generation(_LOCK_BUCKET, _LOCK_PATH, info["generation"])
+                continue
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"lock de migração ocupado: gs://{_LOCK_BUCKET}/{_LOCK_PATH}")
+        time.sleep(2)
+    try:
+        yield
+    finally:
+        gcs.delete_generation(_LOCK_BUCKET, _LOCK_PATH, generation)
+
+
+# ----------------------------
+# Aplicação
+# ----------------------------
+def _run_group(statements: List[str]) -> None:
+    if len(statements) == 1:
+        client().query(statements[0]).result()
+        return
+    with ThreadPoolExecutor(max_workers=len(statements)) as pool:
+        # result() propaga a primeira falha
+        for job in [pool.submit(lambda s: client().query(s).result(), s) for s in statements]:
+            job.result()
+
+
+def _apply(migration: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    steps: Callable[[], List[List[str]]] = migration["steps"]
+    for group in steps():
+        _run_group(group)
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    dml(f"""
+    INSERT INTO {fq(MIGRATIONS_TABLE)} (version, name, applied_at, duration_ms, applied_by)
+    VALUES (@version, @name, CURRENT_TIMESTAMP(), @duration_ms, @applied_by)
+    """, {"version": migration["version"], "name": migration["name"],
+          "duration_ms": duration_ms, "applied_by": f"{socket.gethostname()}:{os.getpid()}"})
+    return {"version": migration["version"], "name": migration["name"], "duration_ms": duration_ms}
+
+
+def migrate() -> Dict[str, Any]:
+    """Aplica, em ordem e sob lock, as migrações que ainda não constam em schema_migrations."""
+    if not pending_migrations():
+        return {"ok": True, "version": LATEST_VERSION, "applied": []}
+    applied = []
+    with migration_lock():
+        _ensure_migrations_table()
+        # outro processo pode ter aplicado enquanto esperávamos o lock
+        for m in pending_migrations():
+            applied.append(_apply(m))
+    return {"ok": True, "version": LATEST_VERSION, "applied": applied}
+
+
+def status() -> Dict[str, Any]:
+    applied = applied_versions()
+    return {
+        "version": max(applied) if applied else 0,
+        "latest": LATEST_VERSION,
+        "pending": [{"version": m["version"], "name": m["name"]} for m in pending_migrations(applied)],
+    }
+
+
+def ensure_schema() -> None:
+    """Chamado no create_app: uma leitura quando o schema já está em dia."""
+    if ON_BOOT == "off":
+        return
+    if ON_BOOT == "background":
+        # import do SDK + credenciais + leitura saem do caminho do cold start
+        threading.Thread(target=_ensure_schema_logged, name="schema-check", daemon=True).start()
+        return
+    if ON_BOOT == "check":
+        pending = pending_migrations()
+        if pending:
+            logger.warning("schema desatualizado: migrações pendentes %s",
+                           [m["version"] for m in pending])
+        return
+    _apply_pending()
+
+
+def _apply_pending() -> None:
+    res = migrate()
+    if res["applied"]:
+        logger.info("migrações aplicadas: %s", res["applied"])
+
+
+def _ensure_schema_logged() -> None:
+    try:
+        _apply_pending()
+    except Exception:
+        logger.exception("falha ao verificar/aplicar migrações no boot")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.infra.db.migrations")
+    parser.add_argument("cmd", choices=["status", "migrate"], nargs="?", default="migrate")
+    args = parser.parse_args(argv)
+    res = status() if args.cmd == "status" else migrate()
+    print(json.dumps(res, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# app/infra/db/table_layout.py
+"""
+Migração online de assets/colors para o layout de TABLE_LAYOUT (clusterizado por
+marca/categoria, sem partição) — tabelas heap legadas e as particionadas por dia:
+
+    python -m app.infra.db.table_layout migrate [--table assets] [--dry-run]
+    python -m app.infra.db.table_layout check --brand <marca>
+
+migrate:
+  1. copia a tabela para <tabela>__relayout como estava num instante T (time travel),
+     já com o CLUSTER BY;
+  2. recopia as versões de ingestão que chegaram depois de T (cargas são atômicas por
+     tabela, então version_id identifica cada carga inteira);
+  3. troca os nomes (tabela -> <tabela>__heap_<data>, __relayout -> tabela) e faz uma
+     última recópia das versões que caíram na tabela antiga durante a troca.
+  Leituras seguem atendidas pelos documentos pré-computados; só a janela entre os
+  dois RENAME (segundos) fica sem a tabela. Rode fora do horário de ingestão: uma
+  carga nessa janela falha (CREATE_NEVER) e a ingestão tem de ser reenviada.
+check:
+  roda sidebar/gallery/colors de uma marca sem cache e compara os bytes processados
+  por cada consulta com o tamanho da tabela que ela lê (a poda vem do cluster).
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+from google.api_core.exceptions import NotFound
+
+from .bq_client import (
+    TABLE_LAYOUT, client, create_table_sql, dml, fq, q, record_query_stats, _DATASET,
+)
+
+
+def _table_id(name: str) -> str:
+    return f"{client().project}.{_DATASET}.{name}"
+
+
+def current_layout(table: str) -> Dict[str, Any]:
+    t = client().get_table(_table_id(table))
+    tp = t.time_partitioning
+    return {
+        "partition": (tp.field if tp else None),
+        "cluster": list(t.clustering_fields or []),
+        "num_bytes": t.num_bytes,
+        "num_rows": t.num_rows,
+    }
+
+
+def needs_migration(table: str) -> bool:
+    cur = current_layout(table)
+    want = TABLE_LAYOUT[table]
+    return cur["partition"] != want["partition"] or cur["cluster"] != want["cluster"]
+
+
+def _schema(table: str):
+    return client().get_table(_table_id(table)).schema
+
+
+def _catch_up(source: str, target: str, cols: str) -> int:
+    """Copia as versões presentes em 'source' e ausentes em 'target'."""
+    return dml(f"""
+    INSERT INTO {fq(target)} ({cols})
+    SELECT {cols} FROM {fq(source)}
+    WHERE version_id IS NOT NULL
+      AND version_id NOT IN (
+        SELECT DISTINCT version_id FROM {fq(target)} WHERE version_id IS NOT NULL
+      )
+    """)
+
+
+def migrate_table(table: str, dry_run: bool = False) -> Dict[str, Any]:
+    if table not in TABLE_LAYOUT:
+        return {"table": table, "ok": False, "error": "tabela sem layout declarado"}
+    if not needs_migration(table):
+        return {"table": table, "ok": True, "skipped": "layout já aplicado"}
+    staging = f"{table}__relayout"
+    backup = f"{table}__heap_{time.strftime('%Y%m%d%H%M%S', time.gmtime())}"
+    if dry_run:
+        return {"table": table, "ok": True, "dry_run": True, "staging": staging, "backup": backup,
+                "from": current_layout(table), "to": TABLE_LAYOUT[table]}
+
+    started = time.perf_counter()
+    try:
+        client().delete_table(_table_id(staging))  # sobra de tentativa anterior
+    except NotFound:
+        pass
+    schema = _schema(table)
+    cols = ", ".join(f.name for f in schema)
+    snapshot = q("SELECT CURRENT_TIMESTAMP() AS ts")[0]["ts"]
+
+    # 1) cópia no layout novo (schema declarado + colunas extras da tabela antiga)
+    client().query(create_table_sql(table, staging, if_not_exists=False)).result()
+    declared = {f.name for f in _schema(staging)}
+    for f in schema:
+        if f.name not in declared:
+            client().query(
+                f"ALTER TABLE {fq(staging)} ADD COLUMN IF NOT EXISTS {f.name} {f.field_type};"
+            ).result()
+    copied = dml(f"""
+    INSERT INTO {fq(staging)} ({cols})
+    SELECT {cols} FROM {fq(table)} FOR SYSTEM_TIME AS OF TIMESTAMP('{snapshot.isoformat()}')
+    """)
+
+    # 2) recópia do que chegou durante a cópia
+    caught_up = _catch_up(table, staging, cols)
+
+    # 3) troca de nomes + recópia final
+    client().query(f"ALTER TABLE {fq(table)} RENAME TO `{backup}`;").result()
+    client().query(f"ALTER TABLE {fq(staging)} RENAME TO `{table}`;").result()
+    caught_up += _catch_up(backup, table, cols)
+
+    return {
+        "table": table,
+        "ok": True,
+        "copied_rows": copied,
+        "caught_up_rows": caught_up,
+        "backup": backup,
+        "layout": current_layout(table),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def check_pruning(brand: str) -> Dict[str, Any]:
+    """Bytes processados por consulta das leituras reais de uma marca x tamanho da tabela que ela lê."""
+    from ...repositories.assets_repository import AssetsRepository
+
+    repo = AssetsRepository()
+    sizes = {t: current_layout(t)["num_bytes"] for t in TABLE_LAYOUT}
+    out: Dict[str, Any] = {"brand_name": brand, "table_bytes": sizes, "pruning": "cluster", "queries": {}}
+    worst = 0.0
+    for name, call in (("sidebar", repo.sidebar), ("gallery", repo.gallery), ("colors", repo.colors)):
+        with record_query_stats() as stats:
+            call(brand)
+        for s in stats:
+            table = next((t for t in s.get("tables") or [] if t in sizes), None)
+            s["table"] = table
+            if table is not None:
+                s["fraction_scanned"] = round((s["bytes_processed"] or 0) / (sizes[table] or 1), 4)
+                worst = max(worst, s["fraction_scanned"])
+        out["queries"][name] = stats
+    out["max_fraction_scanned"] = worst
+    return out
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.infra.db.table_layout")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate")
+    m.add_argument("--table", action="append", choices=sorted(TABLE_LAYOUT))
+    m.add_argument("--dry-run", action="store_true")
+    c = sub.add_parser("check")
+    c.add_argument("--brand", required=True)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "migrate":
+        res = [migrate_table(t, args.dry_run) for t in (args.table or sorted(TABLE_LAYOUT))]
+        print(json.dumps(res, indent=2, default=str))
+        return 0 if all(r.get("ok") for r in res) else 1
+    print(json.dumps(check_pruning(args.brand), indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# app/infra/startup.py
+"""
+Orçamento de cold start: fases do create_app, tempo até a primeira requisição,
+quebra do tempo de import por módulo (opcional) e aquecimento dos clientes.
+
+    STARTUP_IMPORT_PROFILE=1   mede o import de cada módulo carregado depois do pacote app
+    STARTUP_WARMUP=1           importa os SDKs e cria os clientes numa thread após o boot
+    STARTUP_PROBE_TOKEN=<seg>  registra as rotas abaixo, que exigem o header X-Probe-Token
+    GET /_startup              relatório (também logado uma vez, após a primeira requisição)
+    GET /_warmup               aquecimento síncrono (ex.: startup probe do Cloud Run)
+
+Sem STARTUP_PROBE_TOKEN as rotas não existem: o relatório expõe detalhes internos e o
+/_warmup dispara trabalho (SDKs, credenciais) a pedido de qualquer um.
+"""
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+IMPORT_PROFILE = os.getenv("STARTUP_IMPORT_PROFILE", "0") == "1"
+WARMUP = os.getenv("STARTUP_WARMUP", "0") == "1"
+PROBE_TOKEN = os.getenv("STARTUP_PROBE_TOKEN", "")
+PROBE_HEADER = "X-Probe-Token"
+# SDKs cujo carregamento deve ficar fora do caminho do cold start
+HEAVY_MODULES = ("google.cloud.bigquery", "google.cloud.storage", "google.auth", "PIL")
+
+_T0 = time.perf_counter()  # import do pacote app
+_phases: List[Dict[str, Any]] = []
+_state: Dict[str, Any] = {"first_request_ms": None, "logged": False, "warmup": None}
+_lock = threading.Lock()
+
+
+def _process_age_s() -> Optional[float]:
+    """Segundos desde o início do processo (Linux; None fora dele)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
+
+_PROCESS_AGE_AT_T0 = _process_age_s()
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def mark(phase: str) -> None:
+    """Fecha uma fase: tempo desde a marca anterior (ou desde o import do pacote)."""
+    now = time.perf_counter()
+    with _lock:
+        since = _phases[-1]["_at"] if _phases else _T0
+        _phases.append({"phase": phase, "ms": _ms(now - since), "_at": now})
+
+
+# ----------------------------
+# Import por módulo (opcional)
+# ----------------------------
+class _TimedLoader:
+    """Delegação completa ao loader original; só mede exec_module."""
+
+    def __init__(self, loader, name: str, profiler: "_ImportProfiler"):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler.enter()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.leave(self._name, time.perf_counter() - started)
+
+
+class _ImportProfiler:
+    """
+    MetaPathFinder na frente do sys.meta_path: delega a busca aos demais finders e
+    embrulha o loader encontrado. Tempo próprio = total menos os imports aninhados.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._local = threading.local()
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, name, self)
+            return spec
+        return None
+
+    def enter(self) -> None:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+
+    def leave(self, name: str, elapsed: float) -> None:
+        stack = self._local.stack
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        self.timings[name] = {"total_ms": _ms(elapsed), "self_ms": _ms(elapsed - children)}
+
+    def report(self, top: int = 25) -> Dict[str, Any]:
+        by_package: Dict[str, float] = {}
+        for name, t in self.timings.items():
+            pkg = ".".join(name.split(".")[:2]) if name.startswith("google.") else name.split(".")[0]
+            by_package[pkg] = by_package.get(pkg, 0.0) + t["self_ms"]
+        slowest = sorted(self.timings.items(), key=lambda kv: kv[1]["self_ms"], reverse=True)[:top]
+        return {
+            "modules": len(self.timings),
+            "total_self_ms": round(sum(t["self_ms"] for t in self.timings.values()), 1),
+            "by_package_ms": dict(sorted(((k, round(v, 1)) for k, v in by_package.items()),
+                                         key=lambda kv: kv[1], reverse=True)[:top]),
+            "slowest": [{"module": n, **t} for n, t in slowest],
+        }
+
+
+_profiler: Optional[_ImportProfiler] = None
+
+
+def install_import_profiler() -> None:
+    global _profiler
+    if IMPORT_PROFILE and _profiler is None:
+        _profiler = _ImportProfiler()
+        sys.meta_path.insert(0, _profiler)
+
+
+# ----------------------------
+# Aquecimento
+# ----------------------------
+def warm_up() -> Dict[str, Any]:
+    """Importa os SDKs e cria os clientes compartilhados (BigQuery e Storage)."""
+    from .bucket.gcs_client import shared_client
+    from .db.bq_client import client
+
+    steps: Dict[str, Any] = {}
+    for name, fn in (("bigquery", client), ("storage", shared_client)):
+        started = time.perf_counter()
+        try:
+            fn()
+            steps[name] = {"ok": True, "ms": _ms(time.perf_counter() - started)}
+        except Exception as e:
+            steps[name] = {"ok": False, "ms": _ms(time.perf_counter() - started), "error": str(e)}
+    _state["warmup"] = steps
+    return steps
+
+
+def start_background_warmup() -> None:
+    if WARMUP:
+        threading.Thread(target=warm_up, name="startup-warmup", daemon=True).start()
+
+
+# ----------------------------
+# Relatório
+# ----------------------------
+def report() -> Dict[str, Any]:
+    with _lock:
+        phases = [{k: v for k, v in p.items() if k != "_at"} for p in _phases]
+    out: Dict[str, Any] = {
+        "process_age_at_app_import_ms": (_ms(_PROCESS_AGE_AT_T0)
+                                         if _PROCESS_AGE_AT_T0 is not None else None),
+        "phases": phases,
+        "create_app_ms": round(sum(p["ms"] for p in phases), 1),
+        "first_request_ms": _state["first_request_ms"],
+        "heavy_modules_loaded": {m: m in sys.modules for m in HEAVY_MODULES},
+        "warmup": _state["warmup"],
+    }
+    if _profiler is not None:
+        out["imports"] = _profiler.report()
+    return out
+
+
+def init_app(app) -> None:
+    """Registra a medição da primeira requisição e, com STARTUP_PROBE_TOKEN, /_startup e /_warmup."""
+    from flask import abort, jsonify, request
+
+    @app.before_request
+    def _first_request():
+        if _state["first_request_ms"] is None:
+            with _lock:
+                if _state["first_request_ms"] is None:
+                    _state["first_request_ms"] = _ms(time.perf_counter() - _T0)
+
+    @app.after_request
+    def _log_report(response):
+        if not _state["logged"]:
+            _state["logged"] = True
+            logger.info("startup: %s", report())
+        return response
+
+    if not PROBE_TOKEN:
+        return
+
+    def _probe(fn):
+        def view():
+            token = request.headers.get(PROBE_HEADER, "")
+            if not hmac.compare_digest(token.encode("utf-8"), PROBE_TOKEN.encode("utf-8")):
+                return abort(404)  # não anuncia a rota
+            return jsonify(fn())
+        return view
+
+    app.add_url_rule("/_startup", "startup_report", _probe(report))
+    app.add_url_rule("/_warmup", "startup_warmup", _probe(lambda: {"ok": True, "warmup": warm_up()}))
@@ -1,59 +1,90 @@
 # app/repositories/assets_repository.py
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from collections import defaultdict
-from ..infra.db.bq_client import q, fq
+from ..infra.db.bq_client import q_async, fq
+from .versions_repository import current_version_clause
+
+# consultas já disparadas; chamar espera os resultados e monta o payload
+Pending = Callable[[], Any]
 
 
 class AssetsRepository:
     # -------- Sidebar --------
     def sidebar(self, brand: str) -> List[Dict[str, Any]]:
-        cats_sql = f"""
-        SELECT
-          category_key,
-          ANY_VALUE(category_label) AS category_label,
-          ANY_VALUE(category_seq)   AS category_seq
-        FROM {fq('assets')}
-        WHERE brand_name = @brand
-        GROUP BY category_key
-        ORDER BY category_seq, category_key
-        """
-        cats = q(cats_sql, {"brand": brand})
+        return self.start_sidebar(brand)()
 
-        subs_sql = f"""
+    def start_sidebar(self, brand: str) -> Pending:
+        # uma consulta: categorias + subcategorias aninhadas via ARRAY_AGG
+        sql = f"""
+        WITH base AS (
+          SELECT
+            category_key, category_label, category_seq,
+            subcategory_key, subcategory_label, subcategory_seq, columns
+          FROM {fq('assets')}
+          WHERE brand_name = @brand
+            AND {current_version_clause()}
+        ),
+        cats AS (
+          SELECT
+            category_key,
+            ANY_VALUE(category_label) AS category_label,
+            ANY_VALUE(category_seq)   AS category_seq
+          FROM base
+          GROUP BY category_key
+        ),
+        subs AS (
+          SELECT
+            category_key,
+            subcategory_key,
+            ANY_VALUE(subcategory_label) AS subcategory_label,
+            ANY_VALUE(subcategory_seq)   AS subcategory_seq,
+            ANY_VALUE(columns)           AS columns
+          FROM base
+          WHERE subcategory_key IS NOT NULL
+          GROUP BY category_key, subcategory_key
+        ),
+        subs_by_cat AS (
+          SELECT
+            category_key,
+            ARRAY_AGG(
+              STRUCT(subcategory_key, subcategory_label, subcategory_seq, columns)
+              ORDER BY subcategory_seq, subcategory_key
+            ) AS subcategories
+          FROM subs
+          GROUP BY category_key
+        )
         SELECT
-          category_key,
-          subcategory_key,
-          ANY_VALUE(subcategory_label) AS subcategory_label,
-          ANY_VALUE(subcategory_seq)   AS subcategory_seq,
-          ANY_VALUE(columns)           AS columns
-        FROM {fq('assets')}
-        WHERE brand_name = @brand
-          AND subcategory_key IS NOT NULL
-        GROUP BY category_key, subcategory_key
-        ORDER BY category_key, subcategory_seq, subcategory_key
+          c.category_key,
+          c.category_label,
+          c.category_seq,
+          s.subcategories
+        FROM cats c
+        LEFT JOIN subs_by_cat s ON s.category_key = c.category_key
+        ORDER BY c.category_seq, c.category_key
         """
-        subs = q(subs_sql, {"brand": brand})
+        rows = q_async(sql, {"brand": brand})
 
-        subs_by_cat: Dict[str, List[Dict[str, Any]]] = {}
-        for s in subs:
-            subs_by_cat.setdefault(s["category_key"], []).append({
-                "subcategory_key": s["subcategory_key"],
-                "subcategory_label": s["subcategory_label"],
-                "subcategory_seq": s["subcategory_seq"],
-                "columns": s["columns"],
-            })
+        def finish() -> List[Dict[str, Any]]:
+            out: List[Dict[str, Any]] = []
+            for c in rows.result():
+                sub_list = [
+                    {
+                        "subcategory_key": s["subcategory_key"],
+                        "subcategory_label": s["subcategory_label"],
+                        "subcategory_seq": s["subcategory_seq"],
+                        "columns": s["columns"],
+                    } for s in (c["subcategories"] or [])
+                ]
+                out.append({
+                    "category_key": c["category_key"],
+                    "category_label": c["category_label"],
+                    "category_seq": c["category_seq"],
+                    "subcategory_count": len(sub_list),
+                    "subcategories": sub_list,
+                })
+            return out
 
-        out: List[Dict[str, Any]] = []
-        for c in cats:
-            sub_list = subs_by_cat.get(c["category_key"], [])
-            out.append({
-                "category_key": c["category_key"],
-                "category_label": c["category_label"],
-                "category_seq": c["category_seq"],
-                "subcategory_count": len(sub_list),
-                "subcategories": sub_list,
-            })
-        return out
+        return finish
 
     # -------- Gallery --------
     def gallery(
@@ -62,17 +93,39 @@ class AssetsRepository:
         category_key: Optional[str] = None,
         subcategory_seq: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        base_where = ["brand_name = @brand"]
+        return self.start_gallery(brand, category_key, subcategory_seq)()
+
+    def start_gallery(
+        self,
+        brand: str,
+        category_key: Optional[str] = None,
+        subcategory_seq: Optional[int] = None,
+    ) -> Pending:
+        base_where = ["brand_name = @brand", current_version_clause()]
         params: Dict[str, Any] = {"brand": brand}
         if category_key:
             base_where.append("category_key = @cat")
             params["cat"] = category_key
+        # o filtro de subcategory_seq vale para subcategorias e seus textos; textos de
+        # categoria e imagens não são filtrados por ele
+        sseq_filter = "TRUE"
         if subcategory_seq is not None:
-            base_where.append("subcategory_seq = @sseq")
+            sseq_filter = "subcategory_seq = @sseq"
             params["sseq"] = int(subcategory_seq)
 
-        subs_sql = f"""
-        WITH subs AS (
+        # Uma consulta só: subcategorias, textos e imagens (ARRAY_AGG ordenado) por linha.
+        # Subcategoria NULL ou '' recebe as imagens sem subcategoria (NULL e '').
+        sql = f"""
+        WITH base AS (
+          SELECT
+            category_key, category_label, category_seq,
+            subcategory_key, subcategory_label, subcategory_seq, columns,
+            asset_type, text_content, sequence,
+            is_original, original_name, path, url, renditions
+          FROM {fq('assets')}
+          WHERE {" AND ".join(base_where)}
+        ),
+        subs AS (
           SELECT
             category_key,
             subcategory_key,
@@ -81,133 +134,117 @@ class AssetsRepository:
             ANY_VALUE(subcategory_label) AS subcategory_label,
             ANY_VALUE(subcategory_seq)   AS subcategory_seq,
             ANY_VALUE(columns)           AS columns
-          FROM {fq('assets')}
-          WHERE {" AND ".join(base_where)}
+          FROM base
+          WHERE {sseq_filter}
           GROUP BY category_key, subcategory_key
-        )
-        SELECT
-          category_key,
-          category_label,
-          category_seq,
-          subcategory_key,
-          subcategory_label,
-          subcategory_seq,
-          columns
-        FROM subs
-        ORDER BY category_seq, category_key, subcategory_seq, subcategory_key
-        """
-        subs = q(subs_sql, params)
-
-        # textos de categoria (sem subcategoria)
-        cat_txt_where = [w for w in base_where if not w.startswith("subcategory_seq")]
-        cat_txt_sql = f"""
-        WITH t AS (
+        ),
+        cat_txt AS (
           SELECT
             category_key,
-            text_content,
-            sequence
-          FROM {fq('assets')}
-          WHERE {" AND ".join(cat_txt_where)}
-            AND asset_type = 'text'
+            STRING_AGG(text_content, '\\n\\n' ORDER BY sequence) AS category_text
+          FROM base
+          WHERE asset_type = 'text'
             AND (subcategory_key IS NULL OR subcategory_key = '')
-        )
-        SELECT
-          category_key,
-          STRING_AGG(text_content, '\\n\\n' ORDER BY sequence) AS category_text
-        FROM t
-        GROUP BY category_key
-        """
-        cat_txt = q(cat_txt_sql, {k: v for k, v in params.items() if k != "sseq"})
-        cat_text_map = {r["category_key"]: (r["category_text"] or "").strip() for r in cat_txt}
-
-        # textos por subcategoria
-        sub_txt_sql = f"""
-        WITH t AS (
+          GROUP BY category_key
+        ),
+        sub_txt AS (
           SELECT
             category_key,
             subcategory_key,
-            text_content,
-            sequence
-          FROM {fq('assets')}
-          WHERE {" AND ".join(base_where)}
+            STRING_AGG(text_content, '\\n\\n' ORDER BY sequence) AS subcategory_text
+          FROM base
+          WHERE {sseq_filter}
             AND asset_type = 'text'
             AND subcategory_key IS NOT NULL
+          GROUP BY category_key, subcategory_key
+        ),
+        imgs AS (
+          SELECT
+            category_key,
+            IFNULL(subcategory_key, '') AS sub_key,
+            ARRAY_AGG(
+              STRUCT(is_original, original_name, path, url, sequence, renditions)
+              ORDER BY sequence, original_name
+            ) AS images
+          FROM base
+          WHERE asset_type = 'image'
+          GROUP BY category_key, sub_key
         )
         SELECT
-          category_key,
-          subcategory_key,
-          STRING_AGG(text_content, '\\n\\n' ORDER BY sequence) AS subcategory_text
-        FROM t
-        GROUP BY category_key, subcategory_key
+          s.category_key,
+          s.category_label,
+          s.category_seq,
+          s.subcategory_key,
+          s.subcategory_label,
+          s.subcategory_seq,
+          s.columns,
+          ct.category_text,
+          st.subcategory_text,
+          i.images
+        FROM subs s
+        LEFT JOIN cat_txt ct
+          ON ct.category_key = s.category_key
+        LEFT JOIN sub_txt st
+          ON st.category_key = s.category_key
+         AND st.subcategory_key = IFNULL(s.subcategory_key, '')
+        LEFT JOIN imgs i
+          ON i.category_key = s.category_key
+         AND i.sub_key = IFNULL(s.subcategory_key, '')
+        ORDER BY s.category_seq, s.category_key, s.subcategory_seq, s.subcategory_key
         """
-        sub_txt = q(sub_txt_sql, params)
-        sub_text_map: Dict[str, Dict[str, str]] = {}
-        for r in sub_txt:
-            sub_text_map.setdefault(r["category_key"], {})[r["subcategory_key"]] = (r["subcategory_text"] or "").strip()
-
-        out_by_cat: Dict[str, Dict[str, Any]] = {}
-        for s in subs:
-            cat_key = s["category_key"]
-            cat_payload = out_by_cat.setdefault(cat_key, {
-                "category_key": cat_key,
-                "category_label": s["category_label"],
-                "category_seq": s["category_seq"],
-                "category_text": cat_text_map.get(cat_key) or "",
-                "subcategories": []
-            })
+        rows = q_async(sql, params)
 
-            img_where = [
-                "brand_name = @brand",
-                "category_key = @cat",
-                "asset_type = 'image'"
-            ]
-            img_params = {"brand": brand, "cat": cat_key}
+        def finish() -> List[Dict[str, Any]]:
+            subs = rows.result()
 
-            if s["subcategory_key"] in (None, ""):
-                img_where.append("(subcategory_key IS NULL OR subcategory_key = '')")
-                storage_prefix = f"{brand.lower()}/{cat_key}/"
-            else:
-                img_where.append("subcategory_key = @subk")
-                img_params["subk"] = s["subcategory_key"]
-                storage_prefix = f"{brand.lower()}/{cat_key}/{s['subcategory_key']}/"
+            out_by_cat: Dict[str, Dict[str, Any]] = {}
+            for s in subs:
+                cat_key = s["category_key"]
+                cat_payload = out_by_cat.setdefault(cat_key, {
+                    "category_key": cat_key,
+                    "category_label": s["category_label"],
+                    "category_seq": s["category_seq"],
+                    "category_text": (s["category_text"] or "").strip(),
+                    "subcategories": []
+                })
 
-            imgs_sql = f"""
-            SELECT is_original, original_name, path, url, sequence
-            FROM {fq('assets')}
-            WHERE {" AND ".join(img_where)}
-            ORDER BY sequence, original_name
-            """
-            imgs = q(imgs_sql, img_params)
+                if s["subcategory_key"] in (None, ""):
+                    storage_prefix = f"{brand.lower()}/{cat_key}/"
+                else:
+                    storage_prefix = f"{brand.lower()}/{cat_key}/{s['subcategory_key']}/"
 
-            cat_payload["subcategories"].append({
-                "subcategory_key": s["subcategory_key"],
-                "subcategory_label": s["subcategory_label"],
-                "subcategory_seq": s["subcategory_seq"],
-                "columns": s["columns"],
-                "subcategory_text": sub_text_map.get(cat_key, {}).get(s["subcategory_key"] or "", ""),
-                "storage_prefix": storage_prefix,
-                "images": [
-                    {
-                        "is_original": r["is_original"],
-                        "original_name": r["original_name"],
-                        "path": r["path"],
-                        "url": r["url"],
-                        "sequence": r["sequence"],
-                    } for r in imgs
-                ],
-            })
+                cat_payload["subcategories"].append({
+                    "subcategory_key": s["subcategory_key"],
+                    "subcategory_label": s["subcategory_label"],
+                    "subcategory_seq": s["subcategory_seq"],
+                    "columns": s["columns"],
+                    "subcategory_text": (s["subcategory_text"] or "").strip(),
+                    "storage_prefix": storage_prefix,
+                    "images": [
+                        {
+                            "is_original": r["is_original"],
+                            "original_name": r["original_name"],
+                            "path": r["path"],
+                            "url": r["url"],
+                            "sequence": r["sequence"],
+                            "renditions": r["renditions"],
+                        } for r in (s["images"] or [])
+                    ],
+                })
 
-        out: List[Dict[str, Any]] = []
-        for payload in out_by_cat.values():
-            payload["subcategories"].sort(
-                key=lambda x: (
-                    x["subcategory_seq"] if x["subcategory_seq"] is not None else 9999,
-                    x["subcategory_key"] or ""
+            out: List[Dict[str, Any]] = []
+            for payload in out_by_cat.values():
+                payload["subcategories"].sort(
+                    key=lambda x: (
+                        x["subcategory_seq"] if x["subcategory_seq"] is not None else 9999,
+                        x["subcategory_key"] or ""
+                    )
                 )
-            )
-            out.append(payload)
-        out.sort(key=lambda c: (c["category_seq"], c["category_key"]))
-        return out
+                out.append(payload)
+            out.sort(key=lambda c: (c["category_seq"], c["category_key"]))
+            return out
+
+        return finish
 
     # -------- Colors (tabela) --------
     def colors(self, brand: str) -> Dict[str, Any]:
@@ -228,6 +265,9 @@ class AssetsRepository:
           ]
         }
         """
+        return self.start_colors(brand)()
+
+    def start_colors(self, brand: str) -> Pending:
         colors_sql = f"""
         SELECT
           color_label,
@@ -241,6 +281,7 @@ class AssetsRepository:
           sequence
         FROM {fq('colors')}
         WHERE brand_name = @brand
+          AND {current_version_clause()}
         ORDER BY
           CASE
             WHEN LOWER(IFNULL(category,'')) = 'main' THEN 0
@@ -252,8 +293,6 @@ class AssetsRepository:
           sequence,
           color_label
         """
-        rows = q(colors_sql, {"brand": brand})
-
         # texts da categoria 'cores' vindos do assets (principal/secundaria)
         txt_sql = f"""
         SELECT
@@ -261,51 +300,60 @@ class AssetsRepository:
           STRING_AGG(text_content, '\\n\\n' ORDER BY sequence) AS txt
         FROM {fq('assets')}
         WHERE brand_name = @brand
+          AND {current_version_clause()}
           AND category_key = 'cores'
           AND asset_type = 'text'
           AND subcategory_key IS NOT NULL
         GROUP BY subcategory_key
         """
-        texts = {r["subcategory_key"]: (r["txt"] or "").strip() for r in q(txt_sql, {"brand": brand})}
+        # as duas consultas saem juntas; a montagem espera as duas
+        color_rows = q_async(colors_sql, {"brand": brand})
+        text_rows = q_async(txt_sql, {"brand": brand})
 
-        groups_map: Dict[Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]] = defaultdict(list)
-        for r in rows:
-            groups_map[(r["category"], r["subcategory"])].append({
-                "label": r["color_label"],
-                "key": r["color_key"],
-                "hex": r["hex"],
-                "rgb": r["rgb_txt"],
-                "cmyk": r["cmyk_txt"],
-                "pantone": r["pantone_txt"],
-                "sequence": r["sequence"],
-            })
+        def finish() -> Dict[str, Any]:
+            rows = color_rows.result()
+            texts = {r["subcategory_key"]: (r["txt"] or "").strip() for r in text_rows.result()}
 
-        groups: List[Dict[str, Any]] = []
-        for (cat, sub), items in groups_map.items():
-            groups.append({
-                "category": cat,
-                "subcategory": sub,
-                "items": items
-            })
+            groups_map: Dict[Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]] = defaultdict(list)
+            for r in rows:
+                groups_map[(r["category"], r["subcategory"])].append({
+                    "label": r["color_label"],
+                    "key": r["color_key"],
+                    "hex": r["hex"],
+                    "rgb": r["rgb_txt"],
+                    "cmyk": r["cmyk_txt"],
+                    "pantone": r["pantone_txt"],
+                    "sequence": r["sequence"],
+                })
 
-        # ordena grupos por regra semelhante ao ORDER BY de cima
-        def cat_rank(v: Optional[str]) -> int:
-            if v is None or v == "":
-                return 2
-            v2 = v.lower()
-            if v2 == "main":
-                return 0
-            if v2 == "secondary":
-                return 1
-            return 3
+            groups: List[Dict[str, Any]] = []
+            for (cat, sub), items in groups_map.items():
+                groups.append({
+                    "category": cat,
+                    "subcategory": sub,
+                    "items": items
+                })
 
-        groups.sort(key=lambda g: (cat_rank(g["category"]), g["subcategory"] or ""))
+            # ordena grupos por regra semelhante ao ORDER BY de cima
+            def cat_rank(v: Optional[str]) -> int:
+                if v is None or v == "":
+                    return 2
+                v2 = v.lower()
+                if v2 == "main":
+                    return 0
+                if v2 == "secondary":
+                    return 1
+                return 3
 
-        return {
-            "brand_name": brand,
-            "texts": {
-                "principal": texts.get("principal", ""),
-                "secundaria": texts.get("secundaria", "")
-            },
-            "groups": groups
-        }
+            groups.sort(key=lambda g: (cat_rank(g["category"]), g["subcategory"] or ""))
+
+            return {
+                "brand_name": brand,
+                "texts": {
+                    "principal": texts.get("principal", ""),
+                    "secundaria": texts.get("secundaria", "")
+                },
+                "groups": groups
+            }
+
+        return finish
@@ -0,0 +1,77 @@
+# app/repositories/jobs_repository.py
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+_JOB_DIR = os.getenv("INGEST_JOB_DIR", os.path.join(tempfile.gettempdir(), "brand-guides-jobs"))
+_JOB_TTL_SECONDS = int(os.getenv("INGEST_JOB_TTL_SECONDS", str(24 * 3600)))
+
+
+class MemoryJobStore:
+    """Jobs em memória do processo (só o worker que criou o job consegue responder)."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job["job_id"]] = json.loads(json.dumps(job, default=str))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job is not None else None
+
+    def prune(self, older_than: float) -> None:
+        with self._lock:
+            for k in [k for k, j in self._jobs.items() if j.get("updated_at", 0) < older_than]:
+                del self._jobs[k]
+
+
+class FileJobStore:
+    """
+    Um arquivo JSON por job em disco local: visível para todos os workers do container.
+    Escrita atômica (tmp + os.replace), então leituras nunca veem JSON parcial.
+    """
+
+    def __init__(self, directory: str = _JOB_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def put(self, job: Dict[str, Any]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, default=str)
+        os.replace(tmp, self._path(job["job_id"]))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def prune(self, older_than: float) -> None:
+        for name in os.listdir(self.directory):
+            p = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(p) < older_than:
+                    os.unlink(p)
+            except OSError:
+                continue
+
+
+def make_job_store():
+    kind = os.getenv("INGEST_JOB_STORE", "file").lower()
+    return MemoryJobStore() if kind == "memory" else FileJobStore()
+
+
+def job_expiry_cutoff() -> float:
+    return time.time() - _JOB_TTL_SECONDS
@@ -0,0 +1,78 @@
+# app/repositories/object_manifest_repository.py
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
+
+from ..infra.bucket.gcs_client import GCSClient
+
+# fora dos prefixos das marcas (safe_str nunca gera '_' no início), como _readmodel/
+MANIFEST_PREFIX = "_manifest/"
+MANIFEST_VERSION = 1
+
+
+def _encode(objects: Dict[str, Dict[str, Any]]) -> bytes:
+    out = {}
+    for path, meta in objects.items():
+        meta = dict(meta)
+        if isinstance(meta.get("updated"), datetime):
+            meta["updated"] = meta["updated"].isoformat()
+        out[path] = meta
+    doc = {"version": MANIFEST_VERSION, "built_at": datetime.now(timezone.utc).isoformat(), "objects": out}
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(data: bytes) -> Optional[Dict[str, Dict[str, Any]]]:
+    doc = json.loads(data)
+    if doc.get("version") != MANIFEST_VERSION:
+        return None  # formato antigo: refaz a partir do bucket
+    objects = doc.get("objects") or {}
+    for meta in objects.values():
+        if meta.get("updated"):
+            meta["updated"] = datetime.fromisoformat(meta["updated"])
+    return objects
+
+
+class ObjectManifestRepository:
+    """
+    Um manifest por diretório de marca em gs://<bucket>/_manifest/<marca>/objects.json:
+    path -> {size, generation, crc32c, content_type, updated, metadata}, o mesmo formato
+    de GCSClient.list_objects. Escritas concorrentes usam a geração como precondição.
+    """
+
+    def __init__(self, gcs: Optional[GCSClient] = None, bucket: Optional[str] = None):
+        self.gcs = gcs or GCSClient()
+        self.bucket = bucket or os.getenv("GCS_BUCKET", "brand-guides")
+
+    def _path(self, brand_dir: str) -> str:
+        return f"{MANIFEST_PREFIX}{quote(brand_dir, safe='').replace('.', '%2E')}/objects.json"
+
+    def scan(self, brand_dir: str) -> Dict[str, Dict[str, Any]]:
+        """Listagem completa do diretório da marca (só na escrita/reconstrução do manifest)."""
+        return self.gcs.list_objects(self.bucket, brand_dir + "/")
+
+    def load(self, brand_dir: str) -> Optional[Tuple[Dict[str, Dict[str, Any]], int, int]]:
+        """(objetos, geração, bytes) ou None se ainda não há manifest (ou é de outro formato)."""
+        found = self.gcs.read_object(self.bucket, self._path(brand_dir))
+        if found is None:
+            return None
+        data, generation = found
+        objects = _decode(data)
+        if objects is None:
+            return None
+        return objects, generation, len(data)
+
+    def save(self, brand_dir: str, objects: Dict[str, Dict[str, Any]],
+             if_generation_match: Optional[int] = None) -> Tuple[Optional[int], int]:
+        """
+        (nova geração, bytes). if_generation_match=None grava incondicionalmente (a geração
+        volta None); com valor, grava só se o manifest ainda estiver nela (0 = ausente) e
+        devolve None como geração quando outro escritor chegou antes.
+        """
+        data = _encode(objects)
+        path = self._path(brand_dir)
+        if if_generation_match is None:
+            self.gcs.write_object(self.bucket, path, data, "application/json")
+            return None, len(data)
+        return self.gcs.write_if_generation(self.bucket, path, data, if_generation_match), len(data)
@@ -0,0 +1,111 @@
+# app/repositories/readmodel_repository.py
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+from urllib.parse import quote
+
+from ..infra.bucket.gcs_client import GCSClient
+
+# gcs (padrão) | local | off
+_BACKEND = os.getenv("READMODEL_BACKEND", "gcs").lower()
+_DIR = os.getenv("READMODEL_DIR", os.path.join(tempfile.gettempdir(), "brand-guides-readmodel"))
+# fora dos prefixos das marcas (safe_str nunca gera '_' no início)
+READMODEL_PREFIX = "_readmodel/"
+HASH_KEY = "sha256"
+
+
+def _brand_dir(brand: str) -> str:
+    # marca exata (como em brand_name = @brand), escapada para caber num path ('.'/'..' inclusive)
+    return quote(brand, safe="").replace(".", "%2E")
+
+
+def doc_name(kind: str, category_key: Optional[str] = None) -> str:
+    """sidebar.json, gallery.json, gallery/<categoria>.json, colors.json"""
+    if category_key:
+        return f"{kind}/{quote(category_key, safe='')}.json"
+    return f"{kind}.json"
+
+
+class GCSReadModelStore:
+    """Documentos prontos em gs://<bucket>/_readmodel/<marca>/..., hash em metadata."""
+
+    def __init__(self, gcs: Optional[GCSClient] = None, bucket: Optional[str] = None):
+        self.gcs = gcs or GCSClient()
+        self.bucket = bucket or os.getenv("GCS_BUCKET", "brand-guides")
+
+    def _path(self, brand: str, name: str) -> str:
+        return f"{READMODEL_PREFIX}{_brand_dir(brand)}/{name}"
+
+    def put(self, brand: str, name: str, data: bytes, content_hash: str) -> None:
+        self.gcs.write_object(self.bucket, self._path(brand, name), data, "application/json",
+                              {HASH_KEY: content_hash})
+
+    def get(self, brand: str, name: str) -> Optional[bytes]:
+        try:
+            return self.gcs.read_bytes(self.bucket, self._path(brand, name))
+        except Exception:
+            return None  # ausente (ou Storage indisponível): leitura cai no BigQuery
+
+    def names(self, brand: str) -> List[str]:
+        prefix = f"{READMODEL_PREFIX}{_brand_dir(brand)}/"
+        return [p[len(prefix):] for p in self.gcs.list_paths(self.bucket, prefix)]
+
+    def delete(self, brand: str, names: List[str]) -> None:
+        self.gcs.delete_objects(self.bucket, [self._path(brand, n) for n in names])
+
+    def delete_brand(self, brand: str) -> None:
+        self.delete(brand, self.names(brand))
+
+
+class LocalReadModelStore:
+    """Mesmo layout em disco local (escrita atômica); hash em <nome>.sha256."""
+
+    def __init__(self, directory: str = _DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, brand: str, name: str) -> str:
+        return os.path.join(self.directory, _brand_dir(brand), *name.split("/"))
+
+    def put(self, brand: str, name: str, data: bytes, content_hash: str) -> None:
+        path = self._path(brand, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for target, payload in ((path + "." + HASH_KEY, content_hash.encode("ascii")), (path, data)):
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, target)
+
+    def get(self, brand: str, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(brand, name), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def names(self, brand: str) -> List[str]:
+        base = os.path.join(self.directory, _brand_dir(brand))
+        out = []
+        for dirpath, _, files in os.walk(base):
+            for f in files:
+                if f.endswith(".json"):
+                    out.append(os.path.relpath(os.path.join(dirpath, f), base).replace(os.sep, "/"))
+        return out
+
+    def delete(self, brand: str, names: List[str]) -> None:
+        for n in names:
+            for p in (self._path(brand, n), self._path(brand, n) + "." + HASH_KEY):
+                try:
+                    os.unlink(p)
+                except OSError:
+                    pass
+
+    def delete_brand(self, brand: str) -> None:
+        shutil.rmtree(os.path.join(self.directory, _brand_dir(brand)), ignore_errors=True)
+
+
+def make_readmodel_store():
+    if _BACKEND == "off":
+        return None
+    return LocalReadModelStore() if _BACKEND == "local" else GCSReadModelStore()
@@ -0,0 +1,129 @@
+# app/repositories/upload_sessions_repository.py
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, BinaryIO, Dict, List, Optional
+
+_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "brand-guides-uploads"))
+_SESSION_TTL_SECONDS = int(os.getenv("INGEST_UPLOAD_TTL_SECONDS", str(24 * 3600)))
+_WRITE_BLOCK = 1024 * 1024
+
+
+class UploadSessionsRepository:
+    """
+    Sessões de upload em disco local, compartilhadas entre workers:
+      <dir>/<upload_id>/session.json   metadados
+      <dir>/<upload_id>/data.zip       arquivo pré-alocado, chunks gravados no offset
+      <dir>/<upload_id>/chunks/<n>     marcador de chunk recebido por completo
+      <dir>/<upload_id>/finalize       criado (O_EXCL) por quem ganhou a finalização
+      <dir>/<upload_id>.zip            data.zip já entregue a um job (a sessão é apagada)
+    A expiração (prune) olha o mtime do diretório, renovado a cada chunk recebido.
+    """
+
+    def __init__(self, directory: str = _UPLOAD_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _dir(self, upload_id: str) -> str:
+        return os.path.join(self.directory, upload_id)
+
+    def data_path(self, upload_id: str) -> str:
+        return os.path.join(self._dir(upload_id), "data.zip")
+
+    def create(self, session: Dict[str, Any]) -> None:
+        d = self._dir(session["upload_id"])
+        os.makedirs(os.path.join(d, "chunks"))
+        with open(self.data_path(session["upload_id"]), "wb") as f:
+            f.truncate(session["total_size"])  # esparso: não ocupa disco antes dos chunks
+        self.save(session)
+
+    def save(self, session: Dict[str, Any]) -> None:
+        d = self._dir(session["upload_id"])
+        fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(d, "session.json"))
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._dir(upload_id), "session.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_chunk(self, upload_id: str, index: int, offset: int, stream: BinaryIO, length: int) -> int:
+        """Copia o corpo do request direto para o offset do arquivo, em blocos; devolve bytes gravados."""
+        written = 0
+        fd = os.open(self.data_path(upload_id), os.O_WRONLY)
+        try:
+            while written < length:
+                block = stream.read(min(_WRITE_BLOCK, length - written))
+                if not block:
+                    break
+                os.pwrite(fd, block, offset + written)
+                written += len(block)
+            if written == length:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        if written == length:
+            open(os.path.join(self._dir(upload_id), "chunks", str(index)), "wb").close()
+            os.utime(self._dir(upload_id))  # upload ativo não expira no meio
+        return written
+
+    def received(self, upload_id: str) -> List[int]:
+        try:
+            names = os.listdir(os.path.join(self._dir(upload_id), "chunks"))
+        except FileNotFoundError:
+            return []
+        return sorted(int(n) for n in names if n.isdigit())
+
+    def _claim_path(self, upload_id: str) -> str:
+        return os.path.join(self._dir(upload_id), "finalize")
+
+    def claim(self, upload_id: str) -> bool:
+        """Reserva a finalização da sessão; entre requests/workers concorrentes só um recebe True."""
+        try:
+            fd = os.open(self._claim_path(upload_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except (FileExistsError, FileNotFoundError):
+            return False
+        os.close(fd)
+        return True
+
+    def unclaim(self, upload_id: str) -> None:
+        try:
+            os.remove(self._claim_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def claimed(self, upload_id: str) -> bool:
+        return os.path.exists(self._claim_path(upload_id))
+
+    def detach_data(self, upload_id: str) -> str:
+        """Tira data.zip da sessão (rename no mesmo disco) para um job assumir o arquivo."""
+        path = os.path.join(self.directory, f"{upload_id}.zip")
+        os.replace(self.data_path(upload_id), path)
+        return path
+
+    def attach_data(self, upload_id: str, path: str) -> None:
+        """Desfaz detach_data (o job não chegou a ser criado)."""
+        os.replace(path, self.data_path(upload_id))
+
+    def delete(self, upload_id: str) -> None:
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def prune(self) -> None:
+        cutoff = time.time() - _SESSION_TTL_SECONDS
+        for name in os.listdir(self.directory):
+            p = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(p) >= cutoff:
+                    continue
+                if os.path.isdir(p):
+                    shutil.rmtree(p, ignore_errors=True)
+                else:
+                    os.unlink(p)  # arquivo de um job que não terminou
+            except OSError:
+                continue
@@ -0,0 +1,104 @@
+# app/repositories/versions_repository.py
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from ..infra.db.bq_client import q, fq, dml
+
+
+def new_version_id() -> str:
+    """Ordenável pelo instante da ingestão: v20240131T120000-1a2b3c4d."""
+    return "v" + time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+
+
+def current_version_clause(column: str = "version_id", brand_param: str = "brand") -> str:
+    """
+    Filtro das leituras: só linhas da versão corrente da marca.
+    Sem ponteiro, compara NULL com NULL e segue lendo as linhas legadas.
+    """
+    return (
+        f"IFNULL({column}, '') = IFNULL((SELECT ANY_VALUE(version_id) FROM {fq('brand_versions')} "
+        f"WHERE brand_name = @{brand_param}), '')"
+    )
+
+
+class VersionsRepository:
+    def current(self, brand: str) -> Optional[Dict[str, Any]]:
+        sql = f"""
+        SELECT brand_name, version_id, previous_version_id, updated_at
+        FROM {fq('brand_versions')}
+        WHERE brand_name = @brand
+        LIMIT 1
+        """
+        rows = q(sql, {"brand": brand})
+        return rows[0] if rows else None
+
+    def activate(self, brand: str, version_id: str, only_newer: bool = False) -> bool:
+        """
+        Troca o ponteiro em um único MERGE: leitores veem a versão antiga ou a nova, nunca a mistura.
+        only_newer (ingestão): não troca se o ponteiro já está numa versão mais recente, para
+        que uma carga mais lenta não passe por cima de outra iniciada depois; o rollback troca
+        sempre. Devolve se o ponteiro mudou.
+        """
+        condition = "AND IFNULL(T.version_id, '') < S.version_id" if only_newer else ""
+        sql = f"""
+        MERGE {fq('brand_versions')} T
+        USING (SELECT @brand AS brand_name, @version AS version_id) S
+        ON T.brand_name = S.brand_name
+        WHEN MATCHED {condition} THEN UPDATE SET
+          previous_version_id = T.version_id,
+          version_id = S.version_id,
+          updated_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN
+          INSERT (brand_name, version_id, previous_version_id, updated_at)
+          VALUES (S.brand_name, S.version_id, NULL, CURRENT_TIMESTAMP())
+        """
+        return dml(sql, {"brand": brand, "version": version_id}) > 0
+
+    def list_versions(self, brand: str) -> List[Dict[str, Any]]:
+        """Versões ainda presentes nas tabelas (mais recente primeiro); NULL = linhas legadas."""
+        sql = f"""
+        WITH a AS (
+          SELECT version_id, COUNT(*) AS assets
+          FROM {fq('assets')}
+          WHERE brand_name = @brand
+          GROUP BY version_id
+        ),
+        c AS (
+          SELECT version_id, COUNT(*) AS colors
+          FROM {fq('colors')}
+          WHERE brand_name = @brand
+          GROUP BY version_id
+        )
+        SELECT
+          COALESCE(a.version_id, c.version_id) AS version_id,
+          IFNULL(a.assets, 0) AS assets,
+          IFNULL(c.colors, 0) AS colors
+        FROM a
+        FULL OUTER JOIN c ON IFNULL(a.version_id, '') = IFNULL(c.version_id, '')
+        ORDER BY IFNULL(COALESCE(a.version_id, c.version_id), '') DESC
+        """
+        return q(sql, {"brand": brand})
+
+    def delete_version(self, brand: str, version_id: str) -> Dict[str, int]:
+        """Remove as linhas de uma versão que não vai ao ar (carga pela metade ou superada)."""
+        out: Dict[str, int] = {}
+        for table in ("assets", "colors"):
+            sql = f"""
+            DELETE FROM {fq(table)}
+            WHERE brand_name = @brand
+              AND version_id = @version
+            """
+            out[table] = dml(sql, {"brand": brand, "version": version_id})
+        return out
+
+    def delete_older_than(self, brand: str, cutoff_version: str) -> Dict[str, int]:
+        """Remove linhas de versões anteriores a cutoff_version (legadas incluídas)."""
+        out: Dict[str, int] = {}
+        for table in ("assets", "colors"):
+            sql = f"""
+            DELETE FROM {fq(table)}
+            WHERE brand_name = @brand
+              AND IFNULL(version_id, '') < @cutoff
+            """
+            out[table] = dml(sql, {"brand": brand, "cutoff": cutoff_version})
+        return out
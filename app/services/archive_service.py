@@ -0,0 +1,237 @@
+# app/services/archive_service.py
+import hashlib
+import itertools
+import json
+import logging
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from ..infra.bucket.gcs_client import ChunkUpload, GCSClient
+from ..utils.naming import safe_str
+from .object_manifest import ObjectManifestService, brand_dir, object_manifest
+from ..utils.zip_segments import (
+    SEGMENT_KEY, archive_path, segment_entry, segment_path,
+)
+from ..utils.zip_stream import ZipStream, slices
+
+logger = logging.getLogger(__name__)
+
+_BUCKET = os.getenv("GCS_BUCKET", "brand-guides")
+# bytes baixados à frente do que já foi escrito no ZIP (por download)
+PREFETCH_BUDGET_BYTES = int(os.getenv("ARCHIVE_PREFETCH_BUDGET_BYTES", str(64 * 1024 * 1024)))
+PREFETCH_WORKERS = int(os.getenv("ARCHIVE_PREFETCH_WORKERS", "8"))
+# acima disto o objeto não é baixado inteiro: entra em streaming quando chega a vez dele
+STREAM_OBJECT_BYTES = int(os.getenv("ARCHIVE_STREAM_OBJECT_BYTES", str(16 * 1024 * 1024)))
+# ZIP montado fica gravado no bucket e serve os downloads seguintes como um objeto só
+CACHE_ARCHIVES = os.getenv("ARCHIVE_CACHE", "true").lower() == "true"
+FAILURES_ENTRY = "_falhas.json"
+# metadata dos originais gravada pela ingestão (ver ingestion_service)
+_CRC_KEY = "zip_crc32"
+_SIZE_KEY = "zip_size"
+# muda quando a montagem muda, para não servir ZIPs antigos em cache
+_LAYOUT_VERSION = "1"
+
+
+def _date_time(updated: Optional[datetime]) -> Tuple[int, int, int, int, int, int]:
+    if updated is None:
+        return datetime.now(timezone.utc).timetuple()[:6]
+    return updated.astimezone(timezone.utc).timetuple()[:6]
+
+
+def _primed(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Puxa o primeiro bloco já (erro de objeto ausente aparece antes de escrever o cabeçalho)."""
+    chunks = iter(chunks)
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], chunks)
+
+
+class ArchiveService:
+    """
+    originais.zip. Cada original ingerido tem um segmento (seus bytes comprimidos, como
+    vieram no ZIP da ingestão); o arquivo é montado concatenando cabeçalhos novos e os
+    segmentos, sem recomprimir, e o resultado fica gravado como um objeto único, servido
+    direto nos downloads seguintes. Originais sem segmento são comprimidos na hora.
+
+    A montagem sai em streaming: os próximos objetos são baixados em paralelo dentro de
+    PREFETCH_BUDGET_BYTES e objetos grandes passam do Storage para o ZIP em blocos.
+    Falhas viram a entrada _falhas.json (e o ZIP não é guardado).
+    """
+
+    def __init__(self, gcs: Optional[GCSClient] = None, bucket: str = _BUCKET,
+                 manifest: Optional[ObjectManifestService] = None):
+        self.gcs = gcs or GCSClient()
+        self.bucket = bucket
+        self.manifest = manifest or object_manifest
+
+    @staticmethod
+    def originais_prefix(brand: str, category_key: str) -> str:
+        return f"{brand.lower()}/{category_key}/originais/"
+
+    def originais_zip(self, brand: str, category_key: str) -> Tuple[str, Iterator[bytes], Optional[int]]:
+        """
+        (nome do arquivo, gerador de bytes, tamanho ou None quando montado na hora).
+        Listagem e consulta ao ZIP guardado (ambas pelo manifest) acontecem aqui, antes da resposta.
+        """
+        fname = f"{brand.lower()}-{category_key}-originais.zip"
+        prefix = self.originais_prefix(brand, category_key)
+        objects = self.manifest.list_objects(prefix)
+        entries = self._plan(safe_str(brand).lower() + "/", prefix, objects)
+        if not CACHE_ARCHIVES:
+            return fname, self.stream_zip(entries), None
+
+        target = archive_path(safe_str(brand).lower() + "/", category_key, self._digest(entries))
+        info = self.manifest.info(target)
+        if info is not None:
+            try:
+                chunks = _primed(self.gcs.iter_range(self.bucket, target, generation=info["generation"]))
+                return fname, chunks, info["size"]
+            except Exception:
+                pass  # manifest deste worker atrasado em relação ao bucket: monta de novo
+        return fname, self._assemble_and_store(entries, target), None
+
+    def _plan(self, brand_prefix: str, prefix: str,
+              objects: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        entries = []
+        for path, meta in sorted(objects.items()):
+            name = path[len(prefix):]
+            date_time = _date_time(meta.get("updated"))
+            md = meta.get("metadata") or {}
+            entry = {"name": name, "path": path, "generation": meta.get("generation"),
+                     "size": meta.get("size") or 0, "date_time": date_time, "raw": None}
+            raw = segment_entry(name, md, md.get(_CRC_KEY), md.get(_SIZE_KEY), date_time)
+            # o original pode ter sido regravado por fora da ingestão: só vale se o tamanho bate
+            if raw is not None and raw.file_size == entry["size"]:
+                entry["raw"] = raw
+                entry["segment"] = segment_path(brand_prefix, md[SEGMENT_KEY])
+            entries.append(entry)
+        return entries
+
+    @staticmethod
+    def _digest(entries: List[Dict[str, Any]]) -> str:
+        """Identidade do conteúdo do ZIP: nome, origem (segmento ou geração) e data de cada entrada."""
+        h = hashlib.sha256(_LAYOUT_VERSION.encode())
+        for e in entries:
+            source = e["segment"] if e["raw"] is not None else f"{e['path']}#{e['generation']}"
+            h.update(json.dumps([e["name"], source, e["date_time"]]).encode("utf-8"))
+        return h.hexdigest()[:32]
+
+    def _assemble_and_store(self, entries: List[Dict[str, Any]], target: str) -> Iterator[bytes]:
+        """Repassa o ZIP montado e, em paralelo, grava a mesma sequência em 'target'."""
+        failures: List[Dict[str, str]] = []
+        try:
+            upload: Optional[ChunkUpload] = self.gcs.upload_chunks(self.bucket, target, "application/zip")
+        except Exception:
+            upload = None
+        completed = False
+        try:
+            for chunk in self.stream_zip(entries, failures):
+                if upload is not None and not upload.write(chunk):
+                    upload = None  # Storage mais lento que o cliente: só deixa de guardar
+                yield chunk
+            completed = True
+        finally:
+            if upload is not None:
+                if completed and not failures:
+                    upload.close()
+                    upload.result.add_done_callback(lambda f: self._stored(f, target))
+                else:
+                    upload.abort()
+
+    def _stored(self, result: "Future[str]", target: str) -> None:
+        """Registra o ZIP gravado no manifest e remove os anteriores da mesma categoria."""
+        if result.exception() is not None:
+            logger.warning("originais.zip não foi guardado: %s", result.exception())
+            return
+        folder = target.rsplit("/", 1)[0] + "/"
+        try:
+            info = self.gcs.object_info(self.bucket, target)
+            if info:
+                self.manifest.apply(brand_dir(target), put={target: info})
+            self.manifest.delete([p for p in self.manifest.list_paths(folder) if p != target])
+        except Exception as e:
+            logger.warning("manifest não atualizado após gravar %s: %s", target, e)
+
+    def stream_zip(self, entries: List[Dict[str, Any]],
+                   failures: Optional[List[Dict[str, str]]] = None) -> Iterator[bytes]:
+        """entries: ver _plan(). Entradas com 'raw' vêm do segmento; as demais são comprimidas aqui."""
+        zs = ZipStream()
+        failures = failures if failures is not None else []
+        pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="zip-prefetch")
+        ahead: Deque[Tuple[Dict[str, Any], Optional[Future]]] = deque()
+        state = {"next": 0, "reserved": 0}
+
+        def fetch_size(e: Dict[str, Any]) -> int:
+            return e["raw"].compress_size if e["raw"] is not None else e["size"]
+
+        def fetch(e: Dict[str, Any]) -> Tuple[bool, bytes]:
+            """(veio do segmento?, bytes). Segmento ausente: cai para o original."""
+            if e["raw"] is not None:
+                try:
+                    return True, self.gcs.read_bytes(self.bucket, e["segment"])
+                except Exception:
+                    pass
+            return False, self.gcs.read_bytes(self.bucket, e["path"])
+
+        def fill() -> None:
+            while state["next"] < len(entries) and len(ahead) < PREFETCH_WORKERS * 2:
+                e = entries[state["next"]]
+                size = fetch_size(e)
+                future = None
+                if size <= STREAM_OBJECT_BYTES:
+                    if ahead and state["reserved"] + size > PREFETCH_BUDGET_BYTES:
+                        return
+                    state["reserved"] += size
+                    future = pool.submit(fetch, e)
+                ahead.append((e, future))
+                state["next"] += 1
+
+        try:
+            fill()
+            while ahead:
+                e, future = ahead.popleft()
+                if future is not None:
+                    try:
+                        from_segment, data = future.result()
+                    except Exception as exc:
+                        failures.append({"path": e["path"], "error": str(exc)})
+                        data = None
+                    finally:
+                        state["reserved"] -= fetch_size(e)
+                    fill()
+                    if data is None:
+                        continue
+                    if from_segment:
+                        yield from zs.raw_entry(e["raw"], slices(data))
+                    else:
+                        yield from zs.entry(e["name"], slices(data), len(data), e["date_time"])
+                    continue
+                fill()  # a fila segue baixando enquanto o objeto grande passa
+                try:
+                    raw = e["raw"]
+                    chunks = None
+                    if raw is not None:
+                        try:
+                            chunks = _primed(self.gcs.iter_range(self.bucket, e["segment"]))
+                        except Exception:
+                            raw = None  # segmento ausente: comprime o original
+                    if raw is not None:
+                        yield from zs.raw_entry(raw, chunks)
+                    else:
+                        chunks = _primed(self.gcs.iter_range(self.bucket, e["path"], generation=e["generation"]))
+                        yield from zs.entry(e["name"], chunks, e["size"], e["date_time"])
+                except Exception as exc:
+                    # se o cabeçalho já saiu, a entrada fica truncada; de todo modo é listada
+                    failures.append({"path": e["path"], "error": f"falha na cópia: {exc}"})
+            if failures:
+                manifest = json.dumps({"failures": failures}, ensure_ascii=False, indent=2).encode("utf-8")
+                yield from zs.entry(FAILURES_ENTRY, [manifest], compress_type=zipfile.ZIP_DEFLATED)
+            yield zs.close()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,31 @@
+# app/services/assets_cache.py
+import copy
+import os
+from typing import Any, Dict, Optional
+
+from ..utils.ttl_cache import TTLCache
+
+_MAX_ENTRIES = int(os.getenv("ASSETS_CACHE_MAX_ENTRIES", "512"))
+_MAX_BYTES = int(os.getenv("ASSETS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# outros workers do gunicorn não recebem a invalidação: o TTL limita o tempo de dado antigo
+_TTL_SECONDS = float(os.getenv("ASSETS_CACHE_TTL_SECONDS", "60"))
+
+# cache do processo para sidebar/gallery/colors; chave: (tipo, marca, category_key, subcategory_seq).
+# Sem version_id na chave: descobrir a versão corrente custaria uma leitura por request; a
+# invalidação ao fim da ingestão/rollback cobre este worker e o TTL cobre os demais.
+# Cada leitura recebe uma cópia: os serviços montam a resposta em cima do resultado.
+assets_cache = TTLCache(_MAX_ENTRIES, _MAX_BYTES, _TTL_SECONDS, copier=copy.deepcopy)
+
+
+def cache_key(kind: str, brand: str, category_key: Optional[str] = None,
+              subcategory_seq: Optional[int] = None) -> tuple:
+    return (kind, brand, category_key, subcategory_seq)
+
+
+def invalidate_brand(brand: str) -> int:
+    """Descarta as leituras em cache da marca (chamado ao fim de ingestão/rollback)."""
+    return assets_cache.invalidate(lambda k: k[1] == brand)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return assets_cache.stats()
@@ -1,20 +1,25 @@
 # app/services/assets_service.py  (arquivo completo, atualizado para usar /assets/stream)
 from typing import Any, Dict, List, Optional
 import os
+import json
 from urllib.parse import quote
-from ..repositories.assets_repository import AssetsRepository
-from ..infra.bucket.gcs_client import GCSClient
+from ..repositories.assets_repository import AssetsRepository, Pending
+from .assets_cache import assets_cache, cache_key
+from .object_manifest import object_manifest
 
-_BUCKET = os.getenv("GCS_BUCKET", "brand-guides")
 _BASE_PATH = os.getenv("BASE_PATH", "").rstrip("/")
 
 class AssetsService:
     def __init__(self):
         self.repo = AssetsRepository()
-        self.gcs = GCSClient()
 
+    # start_*: dispara as consultas (ou acha o cache) e devolve quem entrega o payload;
+    # várias leituras disparadas antes de esperar correm em paralelo no BigQuery
     def sidebar(self, brand: str) -> List[Dict[str, Any]]:
-        return self.repo.sidebar(brand)
+        return self.start_sidebar(brand)()
+
+    def start_sidebar(self, brand: str) -> Pending:
+        return assets_cache.get_or_start(cache_key("sidebar", brand), lambda: self.repo.start_sidebar(brand))
 
     def _make_stream_url(self, brand: str, path: str) -> str:
         # Link interno da própria aplicação (proxy), sem expor Storage
@@ -28,8 +33,29 @@ class AssetsService:
         category_key: Optional[str] = None,
         subcategory_seq: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        data = self.repo.gallery(brand, category_key, subcategory_seq)
+        return self.start_gallery(brand, category_key, subcategory_seq)()
+
+    def start_gallery(
+        self,
+        brand: str,
+        category_key: Optional[str] = None,
+        subcategory_seq: Optional[int] = None,
+    ) -> Pending:
+        return assets_cache.get_or_start(
+            cache_key("gallery", brand, category_key, subcategory_seq),
+            lambda: self._start_load_gallery(brand, category_key, subcategory_seq),
+        )
 
+    def _start_load_gallery(
+        self,
+        brand: str,
+        category_key: Optional[str],
+        subcategory_seq: Optional[int],
+    ) -> Pending:
+        rows = self.repo.start_gallery(brand, category_key, subcategory_seq)
+        return lambda: self._with_stream_urls(brand, rows())
+
+    def _with_stream_urls(self, brand: str, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         # Para cada imagem, substituir o campo "url" por link interno /assets/stream
         # e remover qualquer URL externa eventualmente retornada pelo repositório.
         for cat in data:
@@ -44,17 +70,37 @@ class AssetsService:
                     # (já sobrescrevemos, mas garantimos que não há campo alternativo)
                     img.pop("signed_url", None)
                     sub["stream"].append(stream_url)
+                    self._attach_renditions(brand, img)
         return data
 
+    def _attach_renditions(self, brand: str, img: Dict[str, Any]) -> None:
+        # rendições geradas na ingestão: {"thumb": {url, width, height}, ...} + srcset pronto
+        rends = img.get("renditions") or []
+        if isinstance(rends, str):
+            rends = json.loads(rends)
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for r in rends:
+            by_name[r["name"]] = {
+                "url": self._make_stream_url(brand, r["path"]),
+                "width": r.get("width"),
+                "height": r.get("height"),
+                "content_type": r.get("content_type"),
+            }
+        img["renditions"] = by_name
+        img["srcset"] = ", ".join(f"{v['url']} {v['width']}w" for v in by_name.values() if v.get("width"))
+
     def colors(self, brand: str) -> Dict[str, Any]:
-        return self.repo.colors(brand)
+        return self.start_colors(brand)()
+
+    def start_colors(self, brand: str) -> Pending:
+        return assets_cache.get_or_start(cache_key("colors", brand), lambda: self.repo.start_colors(brand))
 
     def has_originais(self, brand: str, category_key: str) -> Dict[str, Any]:
         if not brand or not category_key:
             return {"ok": False, "error": "brand e category_key são obrigatórios"}
         prefix = f"{brand.lower()}/{category_key.lower()}/originais/"
         try:
-            paths = self.gcs.list_paths(_BUCKET, prefix)
+            paths = object_manifest.list_paths(prefix)
             cnt = len(paths)
             return {
                 "ok": True,
@@ -0,0 +1,129 @@
+# app/services/ingestion_jobs_service.py
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from ..repositories.jobs_repository import make_job_store, job_expiry_cutoff
+from ..utils.spool import spool_to_file
+from .ingestion_service import IngestionService
+
+MAX_CONCURRENT_JOBS = int(os.getenv("INGEST_MAX_JOBS", "2"))
+# o job em execução regrava updated_at a cada HEARTBEAT; parado há mais de STALE, o
+# worker morreu (deploy, OOM, SIGKILL) e get() passa a responder "failed"
+HEARTBEAT_SECONDS = int(os.getenv("INGEST_JOB_HEARTBEAT_SECONDS", "30"))
+STALE_SECONDS = int(os.getenv("INGEST_JOB_STALE_SECONDS", "300"))
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobLimitReached(Exception):
+    pass
+
+
+class IngestionJobsService:
+    """
+    Ingestão em background: o upload é gravado em disco, o POST devolve o job_id
+    e um pool limitado (INGEST_MAX_JOBS por processo) executa IngestionService.ingest_zip.
+    """
+
+    def __init__(self, service: Optional[IngestionService] = None, store=None,
+                 max_jobs: Optional[int] = None):
+        self.service = service or IngestionService()
+        self.store = store or make_job_store()
+        self.max_jobs = max(1, max_jobs or MAX_CONCURRENT_JOBS)
+        self._slots = threading.BoundedSemaphore(self.max_jobs)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="ingest-job")
+        self._save_lock = threading.Lock()  # progresso e heartbeat gravam o mesmo job
+
+    def submit(self, brand_name: str, file_obj, filename: Optional[str] = None) -> Dict[str, Any]:
+        self._acquire_slot()
+        try:
+            spooled = spool_to_file(file_obj)
+        except Exception:
+            self._slots.release()
+            raise
+        return self._enqueue(brand_name, spooled, filename)
+
+    def submit_file(self, brand_name: str, path: str, filename: Optional[str] = None) -> Dict[str, Any]:
+        """Como submit(), para um arquivo já em disco; o job assume o arquivo e o remove ao final."""
+        self._acquire_slot()
+        return self._enqueue(brand_name, path, filename)
+
+    def _acquire_slot(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise JobLimitReached(f"limite de {self.max_jobs} ingestões simultâneas atingido")
+
+    def _enqueue(self, brand_name: str, spooled: str, filename: Optional[str]) -> Dict[str, Any]:
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "state": "queued",
+            "brand_name": brand_name,
+            "filename": filename,
+            "created_at": now,
+            "updated_at": now,
+            "progress": {"stage": "queued"},
+            "result": None,
+        }
+        try:
+            self.store.put(job)
+            self.store.prune(job_expiry_cutoff())
+            snapshot = dict(job)  # o worker passa a mutar 'job'
+            self._pool.submit(self._run, job, spooled)
+        except Exception:
+            self._slots.release()
+            raise
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not _JOB_ID_RE.match(job_id or ""):
+            return None
+        job = self.store.get(job_id)
+        if job is None or job.get("state") not in ("queued", "running"):
+            return job
+        silent = time.time() - (job.get("updated_at") or 0)
+        if silent > STALE_SECONDS:
+            # só na resposta: se o worker estiver vivo, o próximo heartbeat corrige
+            job.update(state="failed", progress={"stage": "interrupted"},
+                       result={"ok": False, "error": "interrupted",
+                               "detail": f"job sem heartbeat há {int(silent)}s (worker encerrado?)"})
+        return job
+
+    def _save(self, job: Dict[str, Any], **changes: Any) -> None:
+        with self._save_lock:
+            job.update(changes)
+            job["updated_at"] = time.time()
+            self.store.put(job)
+
+    def _heartbeat(self, job: Dict[str, Any], stop: threading.Event) -> None:
+        while not stop.wait(HEARTBEAT_SECONDS):
+            self._save(job)
+
+    def _run(self, job: Dict[str, Any], spooled: str) -> None:
+        stop = threading.Event()
+        try:
+            self._save(job, state="running", progress={"stage": "starting"})
+            threading.Thread(target=self._heartbeat, args=(job, stop),
+                             name="ingest-job-heartbeat", daemon=True).start()
+
+            def on_progress(p: Dict[str, Any]) -> None:
+                self._save(job, progress=p)
+
+            with open(spooled, "rb") as f:
+                res = self.service.ingest_zip(job["brand_name"], f, filename=job["filename"],
+                                              progress=on_progress)
+            self._save(job, state="succeeded" if res.get("ok") else "failed",
+                       progress={"stage": "done"}, result=res)
+        except Exception as e:
+            self._save(job, state="failed", progress={"stage": "done"},
+                       result={"ok": False, "error": f"Falha na ingestão do ZIP: {e}"})
+        finally:
+            stop.set()
+            try:
+                os.unlink(spooled)
+            except OSError:
+                pass
+            self._slots.release()
@@ -2,24 +2,43 @@
 import os
 import re
 import json
+import logging
 import mimetypes
+import threading
 import zipfile
-from typing import Any, Dict, List, Optional
-
-from ..infra.db.bq_client import load_json
-from ..infra.bucket.gcs_client import GCSClient
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from ..infra.db.bq_client import load_tables
+from ..infra.bucket.gcs_client import GCSClient, UPLOAD_CHUNK_BYTES
+from ..repositories.versions_repository import VersionsRepository, new_version_id
+from .upload_pipeline import UploadPipeline, COMPOSITE_THRESHOLD_BYTES
+from .rendition_pipeline import RenditionPipeline
+from .assets_cache import invalidate_brand
+from .readmodel_service import ReadModelService
+from .object_manifest import object_manifest
 from ..utils.naming import safe_str
+from ..utils.zip_index import ZipIndex, is_artifact_component
+from ..utils.spool import mapped_zip_source
+from ..utils.renditions import is_raster
+from ..utils.zip_segments import (
+    CSIZE_KEY, METHOD_KEY, SEGMENT_KEY, RawMember, is_reusable, segment_digest,
+    segment_metadata, segment_path,
+)
 from ..utils.validators import (
     parse_category_dir, parse_subcategory_dir, file_prefix_sequence
 )
 
-ORIG_DIRNAME = "originais"
-SYSTEM_ARTIFACTS = {"__macosx", ".ds_store", "thumbs.db", "desktop.ini"}
-
+logger = logging.getLogger(__name__)
 
-def _is_artifact_component(comp: str) -> bool:
-    c = comp.strip().lower()
-    return (not c) or (c in SYSTEM_ARTIFACTS) or c.startswith("._")
+ORIG_DIRNAME = "originais"
+SPOOL_UPLOADS = os.getenv("INGEST_SPOOL", "true").lower() == "true"
+MEMORY_BUDGET_BYTES = int(os.getenv("INGEST_MEMORY_BUDGET_BYTES", str(128 * 1024 * 1024)))
+DEDUP_ENABLED = os.getenv("INGEST_DEDUP", "true").lower() == "true"
+# metadata gravada em cada objeto: CRC32 e tamanho da entrada no diretório central do ZIP
+ZIP_CRC_KEY = "zip_crc32"
+ZIP_SIZE_KEY = "zip_size"
 
 
 def _norm_zip_basename(name: Optional[str]) -> str:
@@ -29,75 +48,107 @@ def _norm_zip_basename(name: Optional[str]) -> str:
     return safe_str(base)
 
 
+def _rss_bytes() -> Optional[int]:
+    """RSS atual do processo (/proc/self/statm; None fora do Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+class _RssSampler:
+    """
+    Amostra o RSS numa thread enquanto a ingestão roda: pico e aumento em relação ao
+    início da ingestão (ru_maxrss só dá o pico desde o início do processo). O valor é
+    do processo inteiro: requests concorrentes no mesmo worker entram na conta.
+    """
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.start = self.peak = _rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="ingest-rss", daemon=True)
+
+    def __enter__(self) -> "_RssSampler":
+        if self.start is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._sample()
+
+    def _sample(self) -> None:
+        rss = _rss_bytes()
+        if rss is not None and self.peak is not None and rss > self.peak:
+            self.peak = rss
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def report(self) -> Dict[str, Optional[int]]:
+        self._sample()
+        return {
+            "rss_start_bytes": self.start,
+            "rss_peak_bytes": self.peak,
+            "rss_peak_delta_bytes": (self.peak - self.start) if self.start is not None else None,
+        }
+
+
+class _IngestRun:
+    """Estado de uma ingestão: ZIP aberto, índice, pipeline e linhas em construção."""
+
+    def __init__(self, zf: zipfile.ZipFile, index: ZipIndex, pipe: Optional[UploadPipeline],
+                 brand_name: str, dry_run: bool = False):
+        self.zf = zf
+        self.index = index
+        self.pipe = pipe
+        self.brand_name = brand_name
+        # dry_run: só o diretório central é lido; nada é descompactado nem enviado
+        self.dry_run = dry_run
+        self.sources: Dict[int, Dict[str, Any]] = {}  # índice da linha -> entradas de origem (dry_run)
+        self.rows: List[Dict[str, Any]] = []
+        self.pending: Dict[int, Future] = {}   # índice da linha -> upload em andamento
+        self.upload_kind: Dict[int, str] = {}  # índice da linha -> "new" | "changed" | "skipped"
+        self.existing: Dict[str, Dict[str, Any]] = {}
+        self.renditions: Optional[RenditionPipeline] = None
+        self.segments: Dict[str, Future] = {}  # path do segmento -> upload em andamento
+
+
 class IngestionService:
     def __init__(self):
         self.gcs = GCSClient()
         self.bucket = os.getenv("GCS_BUCKET", "brand-guides")
+        self.versions = VersionsRepository()
+        self.readmodel = ReadModelService()
 
     # -------- ZIP helpers --------
-    def _names(self, zf: zipfile.ZipFile) -> List[str]:
-        out = []
-        for n in zf.namelist():
-            n = n.replace("\\", "/")
-            comps = [c for c in n.split("/") if c != ""]
-            if not comps:
-                continue
-            if any(_is_artifact_component(c) for c in comps):
-                continue
-            out.append(n)
-        return out
-
-    def _strip_single_container_root(self, zf: zipfile.ZipFile, zip_filename: Optional[str]) -> str:
-        names = self._names(zf)
-        if any("/" not in n for n in names):
+    def _strip_single_container_root(self, index: ZipIndex, zip_filename: Optional[str]) -> str:
+        if index.has_root_files():
             return ""
-        first_level = set(n.split("/", 1)[0] for n in names if "/" in n)
+        first_level = index.top_level()
         if len(first_level) != 1:
             return ""
-        only = list(first_level)[0]
-        if not all(n.startswith(only + "/") for n in names):
-            return ""
         # sempre ignoramos container único
-        return only + "/"
-
-    def _iter_direct_subdirs(self, zf: zipfile.ZipFile, parent: str) -> List[str]:
-        parent = parent.rstrip("/") + "/"
-        seen = set()
-        for n in self._names(zf):
-            if not n.startswith(parent):
-                continue
-            rel = n[len(parent):]
-            if not rel:
-                continue
-            if "/" in rel:
-                first = rel.split("/", 1)[0].strip()
-                if first and not _is_artifact_component(first):
-                    seen.add(parent + first + "/")
-        return sorted(seen)
-
-    def _dir_exists(self, zf: zipfile.ZipFile, d: str) -> bool:
-        d = d.rstrip("/") + "/"
-        return any(n.startswith(d) for n in self._names(zf))
-
-    def _iter_files(self, zf: zipfile.ZipFile, folder: str) -> List[str]:
-        folder = folder.rstrip("/") + "/"
-        return [
-            n for n in self._names(zf)
-            if n.startswith(folder) and n != folder and not n.endswith("/")
-        ]
-
-    def _list_level_txts(self, zf: zipfile.ZipFile, folder: str) -> List[str]:
-        folder = folder.rstrip("/") + "/"
+        return first_level[0] + "/"
+
+    def _iter_direct_subdirs(self, index: ZipIndex, parent: str) -> List[str]:
+        return index.subdirs(parent.rstrip("/") + "/")
+
+    def _dir_exists(self, index: ZipIndex, d: str) -> bool:
+        return index.exists(d.rstrip("/") + "/")
+
+    def _iter_files(self, index: ZipIndex, folder: str) -> List[str]:
+        return index.files(folder.rstrip("/") + "/")
+
+    def _list_level_txts(self, index: ZipIndex, folder: str) -> List[str]:
         txts = []
-        for name in self._names(zf):
-            if not name.startswith(folder):
-                continue
-            rel = name[len(folder):]
-            if not rel or "/" in rel:
-                continue
-            low = rel.lower()
+        for name in index.direct_files(folder.rstrip("/") + "/"):
+            low = name.lower()
             if low.endswith(".txt") and os.path.basename(low) != "readme.md":
-                txts.append(folder + rel)
+                txts.append(name)
         txts.sort()
         return txts
 
@@ -107,24 +158,124 @@ class IngestionService:
             out.append(zf.read(p).decode("utf-8").strip())
         return "\n\n".join([t for t in out if t])
 
+    def _level_text(self, run: "_IngestRun", paths: List[str]) -> Optional[str]:
+        """Texto da próxima linha de run.rows; em dry_run registra só as entradas de origem."""
+        if run.dry_run:
+            self._plan_source(run, paths)
+            return None
+        return self._concat_txts(run.zf, paths)
+
+    def _read_text(self, run: "_IngestRun", member: str) -> Optional[str]:
+        """Como _level_text para uma entrada só; KeyError se ela não existe no ZIP."""
+        info = run.zf.getinfo(member)
+        if run.dry_run:
+            self._plan_source(run, [member])
+            return None
+        with run.zf.open(info) as fp:
+            return fp.read().decode("utf-8").strip()
+
+    def _plan_source(self, run: "_IngestRun", members: List[str],
+                     content_type: Optional[str] = None) -> None:
+        infos = [run.zf.getinfo(m) for m in members]
+        run.sources[len(run.rows)] = {
+            "entries": list(members),
+            "bytes": sum(i.file_size for i in infos),
+            "compressed_bytes": sum(i.compress_size for i in infos),
+            "content_type": content_type,
+        }
+
     # -------- Upload --------
     def _guess_content_type(self, filename: str) -> str:
         return mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
-    def _upload(self, brand: str, cat_key: str, sub_dirname: Optional[str],
-                filename: str, data: bytes, content_type: str, is_original: bool) -> Dict[str, str]:
+    def _object_path(self, brand: str, cat_key: str, sub_dirname: Optional[str],
+                     filename: str, is_original: bool) -> str:
         parts = [safe_str(brand).lower(), safe_str(cat_key).lower()]
         if is_original:
             parts.append(ORIG_DIRNAME)
         elif sub_dirname:
             parts.append(sub_dirname.strip())  # preserva dirname EXATO, trim bordas
         parts.append(filename)
-        path = "/".join(parts)
-        url = self.gcs.write_object(self.bucket, path, data, content_type)
-        return {"path": path, "url": url}
+        return "/".join(parts)
+
+    def _enqueue_entry(self, run: "_IngestRun", member: str, cat_key: str, sub_dirname: Optional[str],
+                       filename: str, is_original: bool) -> str:
+        """Agenda o upload de uma entrada do ZIP para a próxima linha de run.rows."""
+        path = self._object_path(run.brand_name, cat_key, sub_dirname, filename, is_original)
+        content_type = self._guess_content_type(filename)
+        if run.dry_run:
+            self._plan_source(run, [member], content_type)
+            return path
+        info = run.zf.getinfo(member)
+        fingerprint = {ZIP_CRC_KEY: f"{info.CRC:08x}", ZIP_SIZE_KEY: str(info.file_size)}
+        prev = run.existing.get(path)
+        if is_original and is_reusable(info):
+            fingerprint.update(self._enqueue_segment(run, info, fingerprint, prev))
+        idx = len(run.rows)
+        data: Optional[bytes] = None
+        if prev is not None and all(prev["metadata"].get(k) == v for k, v in fingerprint.items()):
+            # conteúdo idêntico ao já gravado: não sobe de novo
+            fut: Future = Future()
+            fut.set_result(self.gcs.object_url(self.bucket, path))
+            run.upload_kind[idx] = "skipped"
+        elif info.file_size > COMPOSITE_THRESHOLD_BYTES:
+            # entrada muito grande: partes em paralelo + compose
+            with run.zf.open(info) as fp:
+                fut = run.pipe.submit_composite(path, fp, info.file_size, content_type, fingerprint)
+            run.upload_kind[idx] = "changed" if prev is not None else "new"
+        elif info.file_size > UPLOAD_CHUNK_BYTES:
+            fut = run.pipe.submit_stream(path, lambda: run.zf.open(info), info.file_size,
+                                         content_type, fingerprint)
+            run.upload_kind[idx] = "changed" if prev is not None else "new"
+        else:
+            data = run.zf.read(info)
+            fut = run.pipe.submit(path, data, content_type, fingerprint)
+            run.upload_kind[idx] = "changed" if prev is not None else "new"
+        run.pending[idx] = fut
+
+        rend = run.renditions
+        if rend is not None and is_raster(filename) and rend.wants(info.file_size):
+            crc = fingerprint[ZIP_CRC_KEY]
+            if not rend.reuse(idx, path, crc):
+                read = (lambda: data) if data is not None else (lambda: run.zf.read(info))
+                rend.submit(idx, path, crc, info.file_size, read)
+        return path
+
+    def _enqueue_segment(self, run: "_IngestRun", info: zipfile.ZipInfo, fingerprint: Dict[str, str],
+                         prev: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Guarda os bytes comprimidos do original, como vieram no ZIP, em um segmento
+        endereçado por conteúdo; o originais.zip é montado a partir deles sem recomprimir.
+        Devolve a metadata que liga o original ao segmento.
+        """
+        brand_prefix = safe_str(run.brand_name).lower() + "/"
+        prev_meta = (prev or {}).get("metadata") or {}
+        if all(prev_meta.get(k) == v for k, v in fingerprint.items()) and prev_meta.get(SEGMENT_KEY) \
+                and segment_path(brand_prefix, prev_meta[SEGMENT_KEY]) in run.existing:
+            # mesmo conteúdo e segmento já gravado: nem relê os bytes
+            return {k: prev_meta[k] for k in (SEGMENT_KEY, METHOD_KEY, CSIZE_KEY)}
+        digest = segment_digest(run.zf, info)
+        path = segment_path(brand_prefix, digest)
+        if path not in run.existing and path not in run.segments:
+            content_type = "application/octet-stream"
+            if info.compress_size > UPLOAD_CHUNK_BYTES:
+                run.segments[path] = run.pipe.submit_stream(path, lambda: RawMember(run.zf, info),
+                                                            info.compress_size, content_type)
+            else:
+                run.segments[path] = run.pipe.submit(path, RawMember(run.zf, info).read(), content_type)
+        return segment_metadata(info, digest)
+
+    def _existing_objects(self, brand_name: str) -> Dict[str, Dict[str, Any]]:
+        """Objetos já gravados da marca (uma listagem paginada) para deduplicar uploads."""
+        if not DEDUP_ENABLED:
+            return {}
+        try:
+            return self.gcs.list_objects(self.bucket, safe_str(brand_name).lower() + "/")
+        except Exception:
+            return {}  # sem listagem, sobe tudo
 
     # -------- Colors --------
-    def _find_cores_colors_json(self, zf: zipfile.ZipFile, root: str) -> Optional[str]:
+    def _find_cores_colors_json(self, index: ZipIndex, root: str) -> Optional[str]:
         """
         Aceita também categorias prefixadas com NN-:
           /cores/colors.json
@@ -135,12 +286,8 @@ class IngestionService:
           /NN-colors/colors.json
         """
         pat = re.compile(r"/(?:\d{2}-)?(?:cores|colors)/(?:colors|cores)\.json$", re.IGNORECASE)
-        root_l = (root or "").lower()
-        for name in self._names(zf):
-            low = name.lower()
-            if root_l and not low.startswith(root_l):
-                continue
-            if pat.search(low):
+        for name in index.files(root or ""):
+            if pat.search(name.lower()):
                 return name
         return None
 
@@ -151,8 +298,13 @@ class IngestionService:
         txt = re.sub(r"^\s*//.*?$", "", txt, flags=re.M)
         return json.loads(txt)
 
-    def ingest_colors_from_json_bytes(self, brand_name: str, data: bytes) -> Dict[str, Any]:
+    def ingest_colors_from_json_bytes(self, brand_name: str, data: bytes,
+                                      dry_run: bool = False,
+                                      version_id: Optional[str] = None) -> Dict[str, Any]:
         """
+        dry_run=True valida e devolve as linhas em "rows" sem gravar no BigQuery.
+        version_id marca as linhas com o snapshot da ingestão em curso.
+
         Formatos suportados:
 
         A) Plano
@@ -206,6 +358,7 @@ class IngestionService:
                 "sequence": int(item.get("sequence") or seq),
                 "role": None,
                 "raw_json": item,
+                "version_id": version_id,
             })
 
         if isinstance(payload.get("colors"), list):
@@ -229,207 +382,398 @@ class IngestionService:
                     if isinstance(it, dict):
                         _push(it, "secondary", None)
 
+        if dry_run:
+            return {"ok": True, "inserted": 0, "planned": len(rows), "rows": rows}
         if rows:
-            load_json("colors", rows)
+            load_tables({"colors": rows})
         return {"ok": True, "inserted": len(rows)}
 
-    def ingest_colors_from_zip(self, brand_name: str, zf: zipfile.ZipFile, root: str) -> Dict[str, Any]:
-        candidate = self._find_cores_colors_json(zf, root)
+    def ingest_colors_from_zip(self, brand_name: str, zf: zipfile.ZipFile, root: str,
+                               index: Optional[ZipIndex] = None,
+                               dry_run: bool = False,
+                               version_id: Optional[str] = None) -> Dict[str, Any]:
+        candidate = self._find_cores_colors_json(index or ZipIndex(zf.namelist()), root)
         if not candidate:
             return {"ok": True, "inserted": 0, "warnings": ["cores/{colors|cores}.json não encontrado (opcional)."]}
         with zf.open(candidate) as fp:
             data = fp.read()
-        return self.ingest_colors_from_json_bytes(brand_name, data)
+        return self.ingest_colors_from_json_bytes(brand_name, data, dry_run=dry_run,
+                                                  version_id=version_id)
 
     # -------- Descoberta de categorias --------
-    def _discover_categories_under_root(self, zf: zipfile.ZipFile, root: str) -> List[str]:
-        first_dirs = set()
-        for n in self._names(zf):
-            if not n.startswith(root):
-                continue
-            rel = n[len(root):]
-            if not rel or "/" not in rel:
-                continue
-            first = rel.split("/", 1)[0].strip()
-            if first and not _is_artifact_component(first):
-                first_dirs.add(first + "/")
-        nn = [d for d in first_dirs if re.match(r"^\d{2}-", d)]
-        if nn:
-            return [root + d for d in sorted(nn)]
-        return [root + d for d in sorted(first_dirs)]
+    def _discover_categories_under_root(self, index: ZipIndex, root: str) -> List[str]:
+        first_dirs = index.subdirs(root)
+        nn = [d for d in first_dirs if re.match(r"^\d{2}-", d[len(root):])]
+        return nn or first_dirs
 
     # -------- Ingestão principal --------
-    def ingest_zip(self, brand_name: str, file_obj, filename: Optional[str] = None) -> Dict[str, Any]:
+    def ingest_zip(self, brand_name: str, file_obj, filename: Optional[str] = None,
+                   spool: Optional[bool] = None,
+                   progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   dry_run: bool = False) -> Dict[str, Any]:
+        """
+        dry_run=True: só valida e planeja (ver validate_zip); nada é gravado.
+        spool=True (padrão via INGEST_SPOOL): o upload vai para disco, é lido via mmap
+        e a memória em voo fica limitada a INGEST_MEMORY_BUDGET_BYTES. Em qualquer modo,
+        entradas grandes sobem em blocos (resumable) ou em partes paralelas (compose).
+        progress, se informado, recebe {"stage", "done", "total"} ao longo da ingestão.
+        """
         if not brand_name:
             return {"ok": False, "error": "brand_name obrigatório"}
+        if spool is None:
+            spool = SPOOL_UPLOADS
         try:
-            with zipfile.ZipFile(file_obj) as zf:
-                container = self._strip_single_container_root(zf, filename)
-                root = container or ""
-
-                details: Dict[str, Any] = {"brand_name": brand_name, "errors": []}
-                assets_rows: List[Dict[str, Any]] = []
-
-                colors_res = self.ingest_colors_from_zip(brand_name, zf, root)
-                details["colors"] = colors_res
-                ok = colors_res.get("ok", True)
-
-                cats = self._discover_categories_under_root(zf, root)
-                for cat_dir in cats:
-                    base = os.path.basename(cat_dir.rstrip("/")).strip()
-                    try:
-                        if re.match(r"^\d{2}-", base):
-                            cat_seq, cat_label = parse_category_dir(base)
-                        else:
-                            cat_seq, cat_label = (0, base)
-                        if _is_artifact_component(cat_label):
-                            continue
-
-                        cat_key = safe_str(cat_label).lower()
-                        is_cores = (cat_key == "cores" or cat_label.lower() == "colors")
-
-                        # TXT categoria (exceto cores)
-                        cat_txts = self._list_level_txts(zf, cat_dir)
-                        if cat_txts and not is_cores:
-                            assets_rows.append({
-                                "brand_name": brand_name,
-                                "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
-                                "subcategory_key": None, "subcategory_label": None, "subcategory_seq": None,
-                                "columns": None, "is_original": False,
-                                "asset_type": "text", "text_content": self._concat_txts(zf, cat_txts),
-                                "sequence": 0, "original_name": "", "path": "", "url": ""
-                            })
-
-                        must_have_originals = (cat_key == "tipografia")
-                        originals_dir = f"{cat_dir}{ORIG_DIRNAME}/"
-                        has_originals = self._dir_exists(zf, originals_dir)
-                        if must_have_originals and not has_originals:
-                            raise ValueError("03-tipografia deve conter pasta 'originais/'")
-
-                        if has_originals and not is_cores:
-                            for p in self._iter_files(zf, originals_dir):
-                                fname = os.path.basename(p).strip()
-                                content = zf.read(p)
-                                up = self._upload(
-                                    brand_name, cat_key, None, fname, content,
-                                    self._guess_content_type(fname), is_original=True
-                                )
-                                assets_rows.append({
-                                    "brand_name": brand_name,
-                                    "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
-                                    "subcategory_key": None, "subcategory_label": None, "subcategory_seq": None,
-                                    "columns": None, "is_original": True,
-                                    "asset_type": "image", "text_content": None,
-                                    "sequence": file_prefix_sequence(fname),
-                                    "original_name": fname, "path": up["path"], "url": up["url"]
-                                })
-
-                        if is_cores:
-                            for fname, sublab in (("principal.txt", "principal"), ("secundaria.txt", "secundaria")):
-                                path = f"{cat_dir}{fname}"
-                                try:
-                                    with zf.open(path) as fp:
-                                        txt = fp.read().decode("utf-8").strip()
-                                    assets_rows.append({
-                                        "brand_name": brand_name,
-                                        "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
-                                        "subcategory_key": safe_str(sublab),
-                                        "subcategory_label": sublab, "subcategory_seq": 0,
-                                        "columns": None, "is_original": False,
-                                        "asset_type": "text", "text_content": txt,
-                                        "sequence": 0, "original_name": "", "path": "", "url": ""
-                                    })
-                                except KeyError:
-                                    pass
-                            continue
-
-                        subdirs = self._iter_direct_subdirs(zf, cat_dir)
-                        if subdirs:
-                            for sub in subdirs:
-                                if os.path.basename(sub.rstrip("/")).strip() == ORIG_DIRNAME:
-                                    continue
-                                sub_dirname = os.path.basename(sub.rstrip("/")).strip()
-                                if re.match(r"^\d{2}($|-)", sub_dirname):
-                                    sub_seq, sub_label, cols = parse_subcategory_dir(sub_dirname)
-                                else:
-                                    sub_seq, sub_label, cols = (0, None, None)
-
-                                if (sub_label is not None) and (sub_label != "") and _is_artifact_component(sub_label):
-                                    continue
-
-                                tech_key = sub_dirname  # preserva NN-label-NN / NN-NN / NN--NN
-                                display_label = sub_label if sub_label is not None else None
-
-                                # txt da subpasta
-                                sub_txts = self._list_level_txts(zf, sub)
-                                if sub_txts:
-                                    assets_rows.append({
-                                        "brand_name": brand_name,
-                                        "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
-                                        "subcategory_key": tech_key,
-                                        "subcategory_label": (display_label if display_label is not None else ""),
-                                        "subcategory_seq": sub_seq,
-                                        "columns": cols, "is_original": False,
-                                        "asset_type": "text", "text_content": self._concat_txts(zf, sub_txts),
-                                        "sequence": 0, "original_name": "", "path": "", "url": ""
-                                    })
-
-                                files = [p for p in self._iter_files(zf, sub) if not p.lower().endswith(".txt")]
-                                # NENHUM bloqueio/aviso para quantidade impar em 2 colunas — sempre salvar
-                                for p in sorted(files):
-                                    fname = os.path.basename(p).strip()
-                                    content = zf.read(p)
-                                    up = self._upload(
-                                        brand_name, cat_key, sub_dirname, fname, content,
-                                        self._guess_content_type(fname), is_original=False
-                                    )
-                                    assets_rows.append({
-                                        "brand_name": brand_name,
-                                        "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
-                                        "subcategory_key": tech_key,
-                                        "subcategory_label": (display_label if display_label is not None else ""),
-                                        "subcategory_seq": sub_seq,
-                                        "columns": cols, "is_original": False,
-                                        "asset_type": "image", "text_content": None,
-                                        "sequence": file_prefix_sequence(fname),
-                                        "original_name": fname,
-                                        "path": up["path"],
-                                        "url": up["url"]
-                                    })
-                        else:
-                            files = [p for p in self._iter_files(zf, cat_dir) if not p.lower().endswith(".txt")]
-                            for p in sorted(files):
-                                fname = os.path.basename(p).strip()
-                                content = zf.read(p)
-                                up = self._upload(
-                                    brand_name, cat_key, None, fname, content,
-                                    self._guess_content_type(fname), is_original=False
-                                )
-                                assets_rows.append({
-                                    "brand_name": brand_name,
-                                    "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
-                                    "subcategory_key": None, "subcategory_label": None, "subcategory_seq": None,
-                                    "columns": None, "is_original": False,
-                                    "asset_type": "image", "text_content": None,
-                                    "sequence": file_prefix_sequence(fname),
-                                    "original_name": fname,
-                                    "path": up["path"],
-                                    "url": up["url"]
-                                })
-
-                    except Exception as e:
-                        ok = False
-                        details["errors"].append({"category": base, "error": str(e)})
-
-                if assets_rows:
-                    load_json("assets", assets_rows)
-
-                summary = {"assets": len(assets_rows), "colors": details["colors"].get("inserted", 0)}
-                details["summary"] = summary
-                details["ok"] = ok
-                return {"ok": ok, "brand_name": brand_name, "details": details, "summary": summary}
-
+            if dry_run:
+                # o diretório central se lê com seeks no próprio stream; não precisa de spool
+                return self._plan_archive(brand_name, file_obj, filename)
+            if spool:
+                with mapped_zip_source(file_obj) as src:
+                    return self._ingest_archive(brand_name, src, filename, True, progress)
+            return self._ingest_archive(brand_name, file_obj, filename, False, progress)
         except zipfile.BadZipFile:
             return {"ok": False, "error": "Arquivo enviado não é um ZIP válido."}
         except Exception as e:
             return {"ok": False, "error": f"Falha na ingestão do ZIP: {e}"}
+        finally:
+            if not dry_run:
+                invalidate_brand(brand_name)
+
+    def validate_zip(self, brand_name: str, file_obj, filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Pré-validação: roda a mesma descoberta de categorias/subcategorias da ingestão
+        usando apenas o diretório central do ZIP (só o colors.json é descompactado).
+        Devolve as linhas planejadas, os paths de destino, o total de bytes e todos os erros.
+        """
+        return self.ingest_zip(brand_name, file_obj, filename=filename, dry_run=True)
+
+    def _plan_archive(self, brand_name: str, source, filename: Optional[str]) -> Dict[str, Any]:
+        with zipfile.ZipFile(source) as zf:
+            index = ZipIndex(zf.namelist())
+            root = self._strip_single_container_root(index, filename) or ""
+            run = _IngestRun(zf, index, None, brand_name, dry_run=True)
+
+            details: Dict[str, Any] = {"brand_name": brand_name, "errors": [], "warnings": []}
+            colors_res = self.ingest_colors_from_zip(brand_name, zf, root, index, dry_run=True)
+            color_rows = colors_res.pop("rows", [])
+            details["colors"] = colors_res
+            ok = colors_res.get("ok", True)
+            if not ok:
+                details["errors"].append({"category": "cores", "error": colors_res.get("error")})
+
+            for cat_dir in self._discover_categories_under_root(index, root):
+                base = os.path.basename(cat_dir.rstrip("/")).strip()
+                try:
+                    self._ingest_category(run, cat_dir, base)
+                except Exception as e:
+                    ok = False
+                    details["errors"].append({"category": base, "error": str(e)})
+
+            rows: List[Dict[str, Any]] = []
+            seen: Dict[str, str] = {}
+            total_bytes = total_compressed = uploads = 0
+            for idx, row in enumerate(run.rows):
+                src = run.sources.get(idx)
+                rows.append({**row, "source": src})
+                if not src:
+                    continue
+                if row["path"]:
+                    uploads += 1
+                    total_bytes += src["bytes"]
+                    total_compressed += src["compressed_bytes"]
+                    entry = src["entries"][0]
+                    if row["path"] in seen:
+                        # duas entradas caem no mesmo objeto: a última sobrescreve a anterior
+                        details["warnings"].append({
+                            "path": row["path"], "entries": [seen[row["path"]], entry],
+                            "warning": "entradas diferentes com o mesmo destino",
+                        })
+                    seen[row["path"]] = entry
+
+            plan = {
+                "assets": rows,
+                "colors": color_rows,
+                "paths": list(seen),
+                "total_bytes": total_bytes,
+                "total_compressed_bytes": total_compressed,
+                "entries": len(index.names),
+            }
+            summary = {
+                "assets": len(rows),
+                "colors": len(color_rows),
+                "uploads": uploads,
+                "total_bytes": total_bytes,
+            }
+            details["summary"] = summary
+            details["ok"] = ok
+            return {"ok": ok, "brand_name": brand_name, "dry_run": True,
+                    "details": details, "plan": plan, "summary": summary}
+
+    def _ingest_archive(self, brand_name: str, source, filename: Optional[str], streaming: bool,
+                        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        def report(stage: str, done: int = 0, total: int = 0) -> None:
+            if progress is not None:
+                try:
+                    progress({"stage": stage, "done": done, "total": total})
+                except Exception:
+                    pass  # progresso é informativo; nunca derruba a ingestão
+
+        budget = MEMORY_BUDGET_BYTES if streaming else None
+        with _RssSampler() as rss, zipfile.ZipFile(source) as zf, \
+                UploadPipeline(self.gcs, self.bucket, max_inflight_bytes=budget) as pipe:
+            index = ZipIndex(zf.namelist())
+            container = self._strip_single_container_root(index, filename)
+            root = container or ""
+            run = _IngestRun(zf, index, pipe, brand_name)
+            version_id = new_version_id()
+            run.existing = self._existing_objects(brand_name)
+            run.renditions = RenditionPipeline(pipe, safe_str(brand_name).lower() + "/", run.existing)
+
+            details: Dict[str, Any] = {"brand_name": brand_name, "errors": []}
+            # faixa de linhas por categoria, para consolidar falhas de upload em ordem
+            spans: List[Dict[str, Any]] = []
+
+            # as cores são carregadas no fim, em paralelo com os assets
+            colors_res = self.ingest_colors_from_zip(brand_name, zf, root, index,
+                                                     dry_run=True, version_id=version_id)
+            color_rows = colors_res.pop("rows", [])
+            colors_res.pop("planned", None)
+            details["colors"] = colors_res
+            ok = colors_res.get("ok", True)
+
+            cats = self._discover_categories_under_root(index, root)
+            report("categories", 0, len(cats))
+            for n_done, cat_dir in enumerate(cats, 1):
+                base = os.path.basename(cat_dir.rstrip("/")).strip()
+                span: Dict[str, Any] = {"category": base, "start": len(run.rows), "error": None}
+                spans.append(span)
+                try:
+                    self._ingest_category(run, cat_dir, base)
+                except Exception as e:
+                    span["error"] = str(e)
+                finally:
+                    span["end"] = len(run.rows)
+                report("categories", n_done, len(cats))
+            report("renditions", run.renditions.generated, run.renditions.generated + run.renditions.pending)
+            run.renditions.finish()
+            report("uploading", sum(1 for f in run.pending.values() if f.done()), len(run.pending))
+            pipe.close()
+            # manifest dos objetos da marca: listagens de leitura não tocam mais o bucket
+            details["objects_manifest"] = object_manifest.rebuild(safe_str(brand_name).lower())
+
+            # Consolida na ordem original: a primeira falha de upload de uma
+            # categoria descarta a linha e as seguintes, como no fluxo sequencial.
+            assets_rows: List[Dict[str, Any]] = []
+            for span in spans:
+                stop, error = span["end"], span["error"]
+                for idx in range(span["start"], span["end"]):
+                    fut = run.pending.get(idx)
+                    if fut is None:
+                        continue
+                    exc = fut.exception()
+                    if exc is not None:
+                        stop, error = idx, str(exc)
+                        break
+                    run.rows[idx]["url"] = fut.result()
+                    rends = run.renditions.renditions_for(idx)
+                    if rends is not None:
+                        run.rows[idx]["renditions"] = rends
+                assets_rows.extend(run.rows[span["start"]:stop])
+                if error is not None:
+                    ok = False
+                    details["errors"].append({"category": span["category"], "error": error})
+
+            report("loading", 0, len(assets_rows))
+            # created_at explícito: o mesmo instante para todas as linhas da carga
+            created_at = datetime.now(timezone.utc).isoformat()
+            for row in assets_rows:
+                row["version_id"] = version_id
+                row["created_at"] = created_at
+            for row in color_rows:
+                row["created_at"] = created_at
+            try:
+                details["load"] = load_tables({"assets": assets_rows, "colors": color_rows})
+            except Exception:
+                # uma tabela pode ter entrado e a outra não: essa versão nunca vai ao ar
+                self._discard_version(brand_name, version_id)
+                raise
+            if colors_res.get("ok", True):
+                colors_res["inserted"] = len(color_rows)
+
+            # o ponteiro muda quando a carga entrou inteira, mesmo com categorias com erro
+            # (ficam fora da versão e listadas em details["errors"], como antes dos snapshots),
+            # e só para frente: outra ingestão da marca, iniciada depois, pode ter terminado antes
+            ready = bool(assets_rows or color_rows)
+            try:
+                activated = ready and self.versions.activate(brand_name, version_id, only_newer=True)
+            except Exception:
+                self._discard_version(brand_name, version_id)
+                raise
+            if ready and not activated:
+                self._discard_version(brand_name, version_id)  # superada: ninguém vai ler
+            if activated:
+                report("publishing")
+                details["read_model"] = self.readmodel.publish(brand_name, version_id)
+            details["version"] = {"version_id": version_id, "activated": activated,
+                                  "partial": activated and not ok,
+                                  "superseded": ready and not activated}
+
+            details["renditions"] = run.renditions.report()
+            failed_segments = [p for p, f in run.segments.items() if f.exception() is not None]
+            # segmento faltando não invalida a versão: o originais.zip recomprime aquele arquivo
+            details["archive_segments"] = {"uploaded": len(run.segments) - len(failed_segments),
+                                           "failed": failed_segments}
+            details["memory"] = {
+                "mode": "spooled" if streaming else "in_memory",
+                "budget_bytes": budget,
+                "peak_buffered_bytes": pipe.peak_inflight_bytes,
+                **rss.report(),
+            }
+            counts = {"new": 0, "changed": 0, "skipped": 0}
+            for idx, fut in run.pending.items():
+                if fut.exception() is None:
+                    counts[run.upload_kind[idx]] += 1
+            summary = {
+                "assets": len(assets_rows),
+                "colors": details["colors"].get("inserted", 0),
+                "uploaded": counts["new"] + counts["changed"],
+                "skipped": counts["skipped"],
+                "changed": counts["changed"],
+            }
+            details["summary"] = summary
+            details["ok"] = ok
+            return {"ok": ok, "brand_name": brand_name, "details": details, "summary": summary}
+
+    def _discard_version(self, brand_name: str, version_id: str) -> None:
+        """Linhas de uma versão que não foi ativada; a compactação só apaga versões mais antigas."""
+        try:
+            self.versions.delete_version(brand_name, version_id)
+        except Exception:
+            logger.warning("linhas da versão %s de %s não removidas", version_id, brand_name, exc_info=True)
+
+    def _ingest_category(self, run: "_IngestRun", cat_dir: str, base: str) -> None:
+        index, assets_rows, brand_name = run.index, run.rows, run.brand_name
+        if re.match(r"^\d{2}-", base):
+            cat_seq, cat_label = parse_category_dir(base)
+        else:
+            cat_seq, cat_label = (0, base)
+        if is_artifact_component(cat_label):
+            return
+
+        cat_key = safe_str(cat_label).lower()
+        is_cores = (cat_key == "cores" or cat_label.lower() == "colors")
+
+        # TXT categoria (exceto cores)
+        cat_txts = self._list_level_txts(index, cat_dir)
+        if cat_txts and not is_cores:
+            assets_rows.append({
+                "brand_name": brand_name,
+                "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
+                "subcategory_key": None, "subcategory_label": None, "subcategory_seq": None,
+                "columns": None, "is_original": False,
+                "asset_type": "text", "text_content": self._level_text(run, cat_txts),
+                "sequence": 0, "original_name": "", "path": "", "url": ""
+            })
+
+        must_have_originals = (cat_key == "tipografia")
+        originals_dir = f"{cat_dir}{ORIG_DIRNAME}/"
+        has_originals = self._dir_exists(index, originals_dir)
+        if must_have_originals and not has_originals:
+            raise ValueError("03-tipografia deve conter pasta 'originais/'")
+
+        if has_originals and not is_cores:
+            for p in self._iter_files(index, originals_dir):
+                fname = os.path.basename(p).strip()
+                path = self._enqueue_entry(run, p, cat_key, None, fname, is_original=True)
+                assets_rows.append({
+                    "brand_name": brand_name,
+                    "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
+                    "subcategory_key": None, "subcategory_label": None, "subcategory_seq": None,
+                    "columns": None, "is_original": True,
+                    "asset_type": "image", "text_content": None,
+                    "sequence": file_prefix_sequence(fname),
+                    "original_name": fname, "path": path, "url": ""
+                })
+
+        if is_cores:
+            for fname, sublab in (("principal.txt", "principal"), ("secundaria.txt", "secundaria")):
+                path = f"{cat_dir}{fname}"
+                try:
+                    txt = self._read_text(run, path)
+                    assets_rows.append({
+                        "brand_name": brand_name,
+                        "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
+                        "subcategory_key": safe_str(sublab),
+                        "subcategory_label": sublab, "subcategory_seq": 0,
+                        "columns": None, "is_original": False,
+                        "asset_type": "text", "text_content": txt,
+                        "sequence": 0, "original_name": "", "path": "", "url": ""
+                    })
+                except KeyError:
+                    pass
+            return
+
+        subdirs = self._iter_direct_subdirs(index, cat_dir)
+        if subdirs:
+            for sub in subdirs:
+                if os.path.basename(sub.rstrip("/")).strip() == ORIG_DIRNAME:
+                    continue
+                sub_dirname = os.path.basename(sub.rstrip("/")).strip()
+                if re.match(r"^\d{2}($|-)", sub_dirname):
+                    sub_seq, sub_label, cols = parse_subcategory_dir(sub_dirname)
+                else:
+                    sub_seq, sub_label, cols = (0, None, None)
+
+                if (sub_label is not None) and (sub_label != "") and is_artifact_component(sub_label):
+                    continue
+
+                tech_key = sub_dirname  # preserva NN-label-NN / NN-NN / NN--NN
+                display_label = sub_label if sub_label is not None else None
+
+                # txt da subpasta
+                sub_txts = self._list_level_txts(index, sub)
+                if sub_txts:
+                    assets_rows.append({
+                        "brand_name": brand_name,
+                        "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
+                        "subcategory_key": tech_key,
+                        "subcategory_label": (display_label if display_label is not None else ""),
+                        "subcategory_seq": sub_seq,
+                        "columns": cols, "is_original": False,
+                        "asset_type": "text", "text_content": self._level_text(run, sub_txts),
+                        "sequence": 0, "original_name": "", "path": "", "url": ""
+                    })
+
+                files = [p for p in self._iter_files(index, sub) if not p.lower().endswith(".txt")]
+                # NENHUM bloqueio/aviso para quantidade impar em 2 colunas — sempre salvar
+                for p in sorted(files):
+                    fname = os.path.basename(p).strip()
+                    path = self._enqueue_entry(run, p, cat_key, sub_dirname, fname, is_original=False)
+                    assets_rows.append({
+                        "brand_name": brand_name,
+                        "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
+                        "subcategory_key": tech_key,
+                        "subcategory_label": (display_label if display_label is not None else ""),
+                        "subcategory_seq": sub_seq,
+                        "columns": cols, "is_original": False,
+                        "asset_type": "image", "text_content": None,
+                        "sequence": file_prefix_sequence(fname),
+                        "original_name": fname,
+                        "path": path,
+                        "url": ""
+                    })
+        else:
+            files = [p for p in self._iter_files(index, cat_dir) if not p.lower().endswith(".txt")]
+            for p in sorted(files):
+                fname = os.path.basename(p).strip()
+                path = self._enqueue_entry(run, p, cat_key, None, fname, is_original=False)
+                assets_rows.append({
+                    "brand_name": brand_name,
+                    "category_key": cat_key, "category_label": cat_label, "category_seq": cat_seq,
+                    "subcategory_key": None, "subcategory_label": None, "subcategory_seq": None,
+                    "columns": None, "is_original": False,
+                    "asset_type": "image", "text_content": None,
+                    "sequence": file_prefix_sequence(fname),
+                    "original_name": fname,
+                    "path": path,
+                    "url": ""
+                })
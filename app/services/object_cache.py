@@ -0,0 +1,23 @@
+# app/services/object_cache.py
+import os
+from typing import Any, Dict
+
+from ..utils.disk_cache import DiskLRUCache
+
+# ligado só com OBJECT_CACHE_DIR explícito: no Cloud Run o filesystem local (tmp incluso)
+# fica em memória e conta no limite da instância; 0 em OBJECT_CACHE_MAX_BYTES desliga
+_DIR = os.getenv("OBJECT_CACHE_DIR", "")
+_MAX_BYTES = int(os.getenv("OBJECT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))) if _DIR else 0
+# objetos maiores (vídeos, PDFs pesados) seguem só em streaming
+_MAX_OBJECT_BYTES = int(os.getenv("OBJECT_CACHE_MAX_OBJECT_BYTES", str(32 * 1024 * 1024)))
+
+# cache em disco dos objetos servidos por /assets/stream; versão = geração no Storage
+object_cache = DiskLRUCache(_DIR, _MAX_BYTES, _MAX_OBJECT_BYTES)
+
+
+def object_cache_key(bucket: str, path: str) -> str:
+    return f"{bucket}/{path}"
+
+
+def object_cache_stats() -> Dict[str, Any]:
+    return object_cache.stats()
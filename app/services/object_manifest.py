@@ -0,0 +1,139 @@
+# app/services/object_manifest.py
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..repositories.object_manifest_repository import ObjectManifestRepository
+from ..utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# outros workers do gunicorn não recebem a atualização: o TTL limita o tempo de índice antigo
+_TTL_SECONDS = float(os.getenv("OBJECT_MANIFEST_TTL_SECONDS", "60"))
+_MAX_BRANDS = int(os.getenv("OBJECT_MANIFEST_MAX_BRANDS", "256"))
+_MAX_BYTES = int(os.getenv("OBJECT_MANIFEST_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+_CAS_ATTEMPTS = 5
+
+
+def brand_dir(path_or_prefix: str) -> str:
+    """Primeiro componente do path: o diretório da marca no bucket."""
+    return path_or_prefix.split("/", 1)[0]
+
+
+class ObjectIndex:
+    """Manifest carregado: metadados por path e, por diretório (todos os níveis), os paths abaixo dele."""
+
+    def __init__(self, objects: Dict[str, Dict[str, Any]], generation: Optional[int], size: int):
+        self.objects = objects
+        self.generation = generation
+        self.size = size
+        self._by_dir: Dict[str, List[str]] = {}
+        for path in sorted(objects):
+            parts = path.split("/")
+            for i in range(1, len(parts)):
+                self._by_dir.setdefault("/".join(parts[:i]) + "/", []).append(path)
+
+    def paths(self, prefix: str) -> List[str]:
+        if prefix.endswith("/"):
+            return self._by_dir.get(prefix, [])
+        return sorted(p for p in self.objects if p.startswith(prefix))
+
+
+class ObjectManifestService:
+    """
+    Listagens e checagens de existência sob os diretórios das marcas, respondidas pelo
+    manifest (ObjectManifestRepository) em vez de paginar o bucket. O manifest é refeito
+    ao fim de cada ingestão e ajustado a cada gravação/remoção fora dela; marca sem
+    manifest ganha um na primeira consulta (uma listagem).
+    """
+
+    def __init__(self, repo: Optional[ObjectManifestRepository] = None):
+        self.repo = repo or ObjectManifestRepository()
+        self._cache = TTLCache(_MAX_BRANDS, _MAX_BYTES, _TTL_SECONDS, sizer=lambda idx: idx.size)
+        self.rebuilds = 0
+        self.conflicts = 0
+
+    # -------- Consultas --------
+    def index(self, brand: str) -> ObjectIndex:
+        return self._cache.get_or_load(brand, lambda: self._load(brand))
+
+    def _load(self, brand: str) -> ObjectIndex:
+        found = self.repo.load(brand)
+        if found is not None:
+            return ObjectIndex(*found)
+        # marca gravada antes do manifest
+        objects = self.repo.scan(brand)
+        generation, size = self.repo.save(brand, objects, if_generation_match=0)
+        self.rebuilds += 1
+        return ObjectIndex(objects, generation, size)
+
+    def list_objects(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """Mesmo formato de GCSClient.list_objects."""
+        idx = self.index(brand_dir(prefix))
+        return {p: idx.objects[p] for p in idx.paths(prefix)}
+
+    def list_paths(self, prefix: str) -> List[str]:
+        return list(self.index(brand_dir(prefix)).paths(prefix))
+
+    def info(self, path: str) -> Optional[Dict[str, Any]]:
+        return self.index(brand_dir(path)).objects.get(path)
+
+    # -------- Escrita --------
+    def rebuild(self, brand: str) -> Dict[str, Any]:
+        """Refaz o manifest a partir do bucket (fim da ingestão: uma listagem por carga)."""
+        try:
+            objects = self.repo.scan(brand)
+            generation, size = self.repo.save(brand, objects)
+        except Exception as e:
+            self._cache.invalidate(lambda k: k == brand)
+            return {"ok": False, "error": str(e)}
+        self.rebuilds += 1
+        self._cache.invalidate(lambda k: k == brand)
+        self._cache.set(brand, ObjectIndex(objects, generation, size))
+        return {"ok": True, "objects": len(objects)}
+
+    def apply(self, brand: str, put: Optional[Dict[str, Dict[str, Any]]] = None,
+              remove: Iterable[str] = ()) -> bool:
+        """
+        Registra objetos gravados/removidos fora da ingestão. Ler-alterar-gravar com a
+        geração como precondição; sem manifest ainda, nada a fazer (a primeira consulta
+        lista o bucket e já inclui a mudança).
+        """
+        remove = list(remove)
+        for _ in range(_CAS_ATTEMPTS):
+            found = self.repo.load(brand)
+            if found is None:
+                self._cache.invalidate(lambda k: k == brand)
+                return True
+            objects, generation, _ = found
+            objects.update(put or {})
+            for path in remove:
+                objects.pop(path, None)
+            new_generation, size = self.repo.save(brand, objects, if_generation_match=generation)
+            if new_generation is not None:
+                self._cache.invalidate(lambda k: k == brand)
+                self._cache.set(brand, ObjectIndex(objects, new_generation, size))
+                return True
+            self.conflicts += 1
+        logger.warning("manifest de %s não atualizado após %d tentativas", brand, _CAS_ATTEMPTS)
+        self._cache.invalidate(lambda k: k == brand)
+        return False
+
+    def delete(self, paths: List[str]) -> None:
+        """Remove objetos do bucket e do manifest das marcas correspondentes."""
+        if not paths:
+            return
+        self.repo.gcs.delete_objects(self.repo.bucket, paths)
+        by_brand: Dict[str, List[str]] = {}
+        for p in paths:
+            by_brand.setdefault(brand_dir(p), []).append(p)
+        for brand, removed in by_brand.items():
+            self.apply(brand, remove=removed)
+
+    # -------- Observabilidade --------
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "rebuilds": self.rebuilds, "conflicts": self.conflicts}
+
+
+# índice compartilhado do processo (assets, originais.zip, ingestão)
+object_manifest = ObjectManifestService()
@@ -0,0 +1,157 @@
+# app/services/readmodel_service.py
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..repositories.readmodel_repository import make_readmodel_store, doc_name
+from .assets_service import AssetsService
+from .assets_cache import assets_cache, cache_key
+
+
+def serialize(doc: Any) -> bytes:
+    # mesmas opções do jsonify (ensure_ascii, sort_keys, compacto)
+    return json.dumps(doc, ensure_ascii=True, sort_keys=True, separators=(",", ":"),
+                      default=str).encode("utf-8")
+
+
+def doc_etag(digest: str) -> str:
+    """ETag forte: prefixo do sha256 dos bytes servidos (documento, recorte ou payload do BigQuery)."""
+    return digest[:32]
+
+
+def subcategory_slice(cats: List[Dict[str, Any]], subcategory_seq: int) -> List[Dict[str, Any]]:
+    """Recorte por subcategoria sobre o documento da categoria."""
+    out = []
+    for cat in cats:
+        subs = [s for s in cat["subcategories"] if s["subcategory_seq"] == subcategory_seq]
+        if subs:
+            out.append({**cat, "subcategories": subs})
+    return out
+
+
+MANIFEST = doc_name("manifest")
+
+
+class ReadModelService:
+    """
+    Documentos prontos por marca (sidebar, galeria completa, galeria por categoria e cores),
+    gerados ao fim da ingestão a partir da versão corrente. As rotas de leitura servem
+    esses bytes direto e só vão ao BigQuery quando o documento não existe.
+    """
+
+    def __init__(self, store=None, assets: Optional[AssetsService] = None):
+        self.store = store if store is not None else make_readmodel_store()
+        self.assets = assets or AssetsService()
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    # -------- Escrita --------
+    def publish(self, brand: str, version_id: Optional[str] = None) -> Dict[str, Any]:
+        """Regera todos os documentos da marca; em falha remove os antigos (leitura volta ao BigQuery)."""
+        if not self.enabled:
+            return {"ok": True, "enabled": False}
+        try:
+            # as quatro consultas saem juntas (sem cache: lê a versão recém-ativada)
+            gallery_p = self.assets._start_load_gallery(brand, None, None)
+            sidebar_p = self.assets.repo.start_sidebar(brand)
+            colors_p = self.assets.repo.start_colors(brand)
+            gallery = gallery_p()
+            docs: Dict[str, Any] = {
+                doc_name("sidebar"): sidebar_p(),
+                doc_name("gallery"): gallery,
+                doc_name("colors"): colors_p(),
+            }
+            # recortes por subcategoria não são gravados, mas o digest vai ao manifesto
+            # para que o 304 deles também saia sem carregar o documento
+            slices: Dict[str, Dict[str, str]] = {}
+            for cat in gallery:
+                name = doc_name("gallery", cat["category_key"])
+                docs[name] = [cat]
+                slices[name] = {
+                    str(sub["subcategory_seq"]):
+                        hashlib.sha256(serialize(subcategory_slice([cat], sub["subcategory_seq"]))).hexdigest()
+                    for sub in cat["subcategories"]
+                }
+            written: Dict[str, Dict[str, Any]] = {}
+            for name, doc in docs.items():
+                data = serialize(doc)
+                digest = hashlib.sha256(data).hexdigest()
+                self.store.put(brand, name, data, digest)
+                written[name] = {"sha256": digest, "bytes": len(data)}
+            # por último: quem lê o manifesto novo já encontra os documentos novos
+            manifest = serialize({
+                "version_id": version_id,
+                "published_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+                "documents": {n: w["sha256"] for n, w in written.items()},
+                "slices": slices,
+            })
+            self.store.put(brand, MANIFEST, manifest, hashlib.sha256(manifest).hexdigest())
+            # categorias que sumiram nesta versão
+            stale = [n for n in self.store.names(brand) if n not in written and n != MANIFEST]
+            if stale:
+                self.store.delete(brand, stale)
+            return {"ok": True, "enabled": True, "documents": written, "removed": stale}
+        except Exception as e:
+            try:
+                self.store.delete_brand(brand)
+            except Exception:
+                pass
+            return {"ok": False, "enabled": True, "error": f"falha ao gerar documentos: {e}"}
+
+    # -------- Leitura: (bytes, etag) prontos ou None quando o documento não existe --------
+    def document(self, kind: str, brand: str, category_key: Optional[str] = None,
+             subcategory_seq: Optional[int] = None) -> Optional[Tuple[bytes, str]]:
+        if not self.enabled:
+            return None
+        return assets_cache.get_or_load(
+            cache_key("doc:" + kind, brand, category_key, subcategory_seq),
+            lambda: self._fetch(kind, brand, category_key, subcategory_seq),
+        )
+
+    def sidebar(self, brand: str) -> Optional[Tuple[bytes, str]]:
+        return self.document("sidebar", brand)
+
+    def colors(self, brand: str) -> Optional[Tuple[bytes, str]]:
+        return self.document("colors", brand)
+
+    def gallery(self, brand: str, category_key: Optional[str] = None,
+                subcategory_seq: Optional[int] = None) -> Optional[Tuple[bytes, str]]:
+        return self.document("gallery", brand, category_key, subcategory_seq)
+
+    def _fetch(self, kind: str, brand: str, category_key: Optional[str],
+               subcategory_seq: Optional[int]) -> Optional[Tuple[bytes, str]]:
+        data = self.store.get(brand, doc_name(kind, category_key))
+        if data is None:
+            return None
+        if subcategory_seq is not None:
+            data = serialize(subcategory_slice(json.loads(data), subcategory_seq))
+        return data, doc_etag(hashlib.sha256(data).hexdigest())
+
+    # -------- Validadores (sem carregar o documento) --------
+    def manifest(self, brand: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        def load():
+            data = self.store.get(brand, MANIFEST)
+            return json.loads(data) if data is not None else None
+
+        return assets_cache.get_or_load(cache_key("doc:manifest", brand), load)
+
+    def validators(self, kind: str, brand: str, category_key: Optional[str] = None,
+                   subcategory_seq: Optional[int] = None) -> Tuple[Optional[str], Optional[datetime]]:
+        """(etag, last_modified) do documento segundo o manifesto; (None, None) sem manifesto."""
+        manifest = self.manifest(brand)
+        if not manifest:
+            return None, None
+        name = doc_name(kind, category_key)
+        if subcategory_seq is None:
+            digest = manifest.get("documents", {}).get(name)
+        else:
+            digest = manifest.get("slices", {}).get(name, {}).get(str(subcategory_seq))
+        published = manifest.get("published_at")
+        last_modified = datetime.fromisoformat(published) if published else None
+        return (doc_etag(digest) if digest else None), last_modified
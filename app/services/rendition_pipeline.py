@@ -0,0 +1,169 @@
+# app/services/rendition_pipeline.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..utils.renditions import RENDITION_SPECS, pillow_available, render_variants, rendition_path
+from .upload_pipeline import UploadPipeline
+
+RENDITIONS_ENABLED = os.getenv("INGEST_RENDITIONS", "true").lower() == "true"
+RENDITION_FORMAT = "jpeg" if os.getenv("INGEST_RENDITION_FORMAT", "webp").lower() in ("jpg", "jpeg") else "webp"
+RENDITION_WORKERS = int(os.getenv("INGEST_RENDITION_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+MAX_SOURCE_BYTES = int(os.getenv("INGEST_RENDITION_MAX_SOURCE_BYTES", str(32 * 1024 * 1024)))
+# metadata gravada em cada rendição
+SOURCE_CRC_KEY = "source_crc32"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Pool de processos compartilhado pelo worker (spawn: seguro com as threads do gunicorn)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDITION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+class RenditionPipeline:
+    """
+    Gera thumb/medium/large de imagens raster em um pool de processos, em paralelo à
+    leitura do ZIP, e envia as rendições pelo mesmo UploadPipeline dos originais.
+    Rendições de um original inalterado (mesmo CRC32) são reaproveitadas sem renderizar.
+    """
+
+    def __init__(self, pipe: UploadPipeline, brand_prefix: str, existing: Dict[str, Dict[str, Any]]):
+        self.pipe = pipe
+        self.brand_prefix = brand_prefix
+        self.existing = existing
+        self.enabled = RENDITIONS_ENABLED and pillow_available()
+        self.max_pending = max(2, RENDITION_WORKERS * 2)
+        self.errors: List[Dict[str, str]] = []
+        self.generated = 0
+        self.reused = 0
+        self._rendering: List[Tuple[int, str, str, Future]] = []
+        # índice da linha -> [(meta, Future do upload ou None quando reaproveitada)]
+        self._variants: Dict[int, List[Tuple[Dict[str, Any], Optional[Future]]]] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._rendering)
+
+    def wants(self, size: int) -> bool:
+        return self.enabled and size <= MAX_SOURCE_BYTES
+
+    def reuse(self, row_idx: int, src_path: str, crc: str) -> bool:
+        """Aproveita rendições já gravadas para este conteúdo; exige ao menos a thumb."""
+        found = []
+        for name, _ in RENDITION_SPECS:
+            path = rendition_path(self.brand_prefix, src_path, name, RENDITION_FORMAT)
+            obj = self.existing.get(path)
+            meta = (obj or {}).get("metadata") or {}
+            if obj is None or meta.get(SOURCE_CRC_KEY) != crc:
+                continue
+            found.append(({
+                "name": name, "path": path,
+                "width": int(meta.get("width") or 0), "height": int(meta.get("height") or 0),
+                "content_type": obj.get("content_type"),
+            }, None))
+        if not found or found[0][0]["name"] != RENDITION_SPECS[0][0]:
+            return False
+        self._variants[row_idx] = found
+        self.reused += 1
+        return True
+
+    def submit(self, row_idx: int, src_path: str, crc: str, size: int, read: Callable[[], bytes]) -> None:
+        """
+        Manda a imagem ao pool. Os bytes da fonte (aqui e a cópia enviada ao processo)
+        contam no limite em voo do UploadPipeline até a renderização terminar.
+        """
+        self.harvest()
+        while len(self._rendering) >= self.max_pending:
+            wait([f for *_, f in self._rendering], return_when=FIRST_COMPLETED)
+            self.harvest()
+        self.pipe.reserve(size)
+        try:
+            fut = self._start(read())
+        except Exception as e:
+            self.pipe.release(size)
+            # rendição é acessória: sem pool, segue a ingestão sem elas
+            self.enabled = False
+            self.errors.append({"path": src_path, "error": f"pool de rendições indisponível: {e}"})
+            return
+        # liberado pela thread do pool: a produtora pode estar bloqueada no próprio limite
+        fut.add_done_callback(lambda _: self.pipe.release(size))
+        self._rendering.append((row_idx, src_path, crc, fut))
+
+    @staticmethod
+    def _start(data: bytes) -> Future:
+        try:
+            return _get_pool().submit(render_variants, data, RENDITION_SPECS, RENDITION_FORMAT)
+        except BrokenProcessPool:
+            _reset_pool()
+            return _get_pool().submit(render_variants, data, RENDITION_SPECS, RENDITION_FORMAT)
+
+    def harvest(self, block: bool = False) -> None:
+        """Envia ao UploadPipeline as rendições já prontas (na thread produtora)."""
+        still: List[Tuple[int, str, str, Future]] = []
+        for item in self._rendering:
+            row_idx, src_path, crc, fut = item
+            if not block and not fut.done():
+                still.append(item)
+                continue
+            try:
+                variants = fut.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _reset_pool()
+                self.errors.append({"path": src_path, "error": f"falha ao gerar rendições: {e}"})
+                continue
+            out = []
+            for v in variants:
+                path = rendition_path(self.brand_prefix, src_path, v["name"], RENDITION_FORMAT)
+                meta = {SOURCE_CRC_KEY: crc, "width": str(v["width"]), "height": str(v["height"])}
+                up = self.pipe.submit(path, v["data"], v["content_type"], meta)
+                out.append(({
+                    "name": v["name"], "path": path,
+                    "width": v["width"], "height": v["height"],
+                    "content_type": v["content_type"],
+                }, up))
+            self._variants[row_idx] = out
+            self.generated += 1
+        self._rendering = still
+
+    def finish(self) -> None:
+        self.harvest(block=True)
+
+    def renditions_for(self, row_idx: int) -> Optional[List[Dict[str, Any]]]:
+        """Após o fechamento do UploadPipeline: rendições gravadas com sucesso da linha."""
+        if row_idx not in self._variants:
+            return None
+        out = []
+        for meta, up in self._variants[row_idx]:
+            if up is not None and up.exception() is not None:
+                self.errors.append({"path": meta["path"], "error": str(up.exception())})
+                continue
+            out.append(meta)
+        return out
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "format": RENDITION_FORMAT,
+            "generated": self.generated,
+            "reused": self.reused,
+            "errors": self.errors,
+        }
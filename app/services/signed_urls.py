@@ -0,0 +1,110 @@
+# app/services/signed_urls.py
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import unquote
+
+from ..config import load_config
+from ..infra.bucket.gcs_client import GCSClient
+from ..utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_config = load_config()
+# USE_GCS_SIGNED_URLS=true: /assets/stream responde 302 para a URL assinada
+ENABLED = _config["USE_GCS_SIGNED_URLS"]
+EXPIRY_SECONDS = _config["GCS_SIGNED_URL_EXPIRY_SECONDS"]
+_BUCKET = os.getenv("GCS_BUCKET", "brand-guides")
+# URL sai do pool (e é reassinada) este tanto antes de expirar
+RENEW_MARGIN_SECONDS = min(int(os.getenv("SIGNED_URL_RENEW_MARGIN_SECONDS", "300")), EXPIRY_SECONDS // 2)
+_MAX_ENTRIES = int(os.getenv("SIGNED_URL_POOL_MAX_ENTRIES", "20000"))
+# assinaturas antecipadas por galeria servida
+PREFETCH_MAX = int(os.getenv("SIGNED_URL_PREFETCH_MAX", "500"))
+
+# links internos montados por AssetsService._make_stream_url (quote: sem espaço/vírgula crus)
+_STREAM_PATH_RE = re.compile(rb'/assets/stream\?brand_name=[^"&\s,]*&path=([^"&\s,]+)')
+
+
+class SignedURLPool:
+    """
+    URLs V4 por path, guardadas até RENEW_MARGIN_SECONDS antes de expirar: quem recebe
+    uma URL do pool tem pelo menos essa margem de validade. Assinatura em lote (paralela
+    quando depende do IAM signBlob) e antecipada para as imagens de cada galeria servida.
+    """
+
+    def __init__(self, gcs: Optional[GCSClient] = None, bucket: str = _BUCKET,
+                 expiry_seconds: int = EXPIRY_SECONDS, renew_margin: int = RENEW_MARGIN_SECONDS,
+                 max_entries: int = _MAX_ENTRIES):
+        self.gcs = gcs or GCSClient()
+        self.bucket = bucket
+        self.expiry_seconds = expiry_seconds
+        self.renew_margin = renew_margin
+        # URL ~ 600 bytes; o limite efetivo é o de entradas
+        self.cache = TTLCache(max_entries, max_entries * 1024, expiry_seconds - renew_margin)
+        self.signed = 0
+        self.batches = 0
+        self.failures = 0
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sign-prefetch")
+        self._prefetching = threading.Lock()
+
+    @property
+    def redirect_max_age(self) -> int:
+        # o navegador pode reaproveitar o 302, mas nunca além da validade garantida
+        return min(60, self.renew_margin)
+
+    def url(self, path: str) -> Optional[str]:
+        found, url = self.cache.get(path)
+        if found:
+            return url
+        return self.sign([path]).get(path)
+
+    def sign(self, paths: List[str]) -> Dict[str, str]:
+        try:
+            urls = self.gcs.sign_urls(self.bucket, paths, self.expiry_seconds)
+        except Exception:
+            self.failures += 1
+            logger.exception("falha ao assinar %d URL(s)", len(paths))
+            return {}
+        for path, url in urls.items():
+            self.cache.set(path, url)
+        self.signed += len(urls)
+        self.batches += 1
+        return urls
+
+    def prefetch(self, paths: Iterable[str]) -> int:
+        missing = [p for p in dict.fromkeys(paths) if p not in self.cache][:PREFETCH_MAX]
+        if missing:
+            self.sign(missing)
+        return len(missing)
+
+    def prefetch_from_doc(self, data: bytes) -> None:
+        """Assina em segundo plano os objetos citados num documento de galeria."""
+        paths = [unquote(m.decode("ascii")) for m in _STREAM_PATH_RE.findall(data)]
+        if not paths or not self._prefetching.acquire(blocking=False):
+            return  # já há um lote em andamento; a próxima galeria completa o pool
+
+        def run():
+            try:
+                self.prefetch(paths)
+            finally:
+                self._prefetching.release()
+
+        self._prefetcher.submit(run)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "expiry_seconds": self.expiry_seconds,
+            "renew_margin_seconds": self.renew_margin,
+            "signed": self.signed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "pool": self.cache.stats(),
+        }
+
+
+def make_signed_url_pool() -> Optional[SignedURLPool]:
+    return SignedURLPool() if ENABLED else None
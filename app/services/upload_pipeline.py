@@ -0,0 +1,179 @@
+# app/services/upload_pipeline.py
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from ..infra.bucket.gcs_client import GCSClient, UPLOAD_CHUNK_BYTES
+
+UPLOAD_CONCURRENCY = int(os.getenv("INGEST_UPLOAD_CONCURRENCY", "8"))
+MAX_INFLIGHT_BYTES = int(os.getenv("INGEST_MAX_INFLIGHT_BYTES", str(64 * 1024 * 1024)))
+COMPOSITE_THRESHOLD_BYTES = int(os.getenv("GCS_COMPOSITE_THRESHOLD_BYTES", str(128 * 1024 * 1024)))
+COMPOSITE_PART_BYTES = int(os.getenv("GCS_COMPOSITE_PART_BYTES", str(32 * 1024 * 1024)))
+COMPOSITE_TMP_PREFIX = "_tmp/composite/"
+
+
+class _ByteBudget:
+    """Semáforo por bytes: bloqueia o produtor enquanto o limite em voo estiver cheio."""
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._used = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int) -> None:
+        with self._cond:
+            # um item maior que o limite passa sozinho (evita deadlock)
+            while self._used > 0 and self._used + n > self._limit:
+                self._cond.wait()
+            self._used += n
+            self.peak = max(self.peak, self._used)
+
+    def release(self, n: int) -> None:
+        with self._cond:
+            self._used -= n
+            self._cond.notify_all()
+
+
+class UploadPipeline:
+    """
+    Produtor/consumidor para a ingestão: a thread chamadora descompacta as
+    entradas do ZIP e enfileira; um pool limitado de threads envia ao GCS.
+    O total de bytes aguardando/enviando fica limitado a max_inflight_bytes.
+    """
+
+    def __init__(self, gcs: GCSClient, bucket: str,
+                 concurrency: Optional[int] = None, max_inflight_bytes: Optional[int] = None):
+        self.gcs = gcs
+        self.bucket = bucket
+        self._budget = _ByteBudget(max_inflight_bytes or MAX_INFLIGHT_BYTES)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, concurrency or UPLOAD_CONCURRENCY),
+            thread_name_prefix="ingest-upload",
+        )
+
+    def submit(self, path: str, data: bytes, content_type: str,
+               metadata: Optional[Dict[str, str]] = None) -> "Future[str]":
+        """Enfileira o upload; o Future resolve para a URL gravada (ou a exceção)."""
+        size = len(data)
+        self._budget.acquire(size)
+        return self._submit_reserved(path, data, content_type, size, metadata)
+
+    def _submit_reserved(self, path: str, data: bytes, content_type: str, reserved: int,
+                         metadata: Optional[Dict[str, str]] = None) -> "Future[str]":
+        """Como submit(), com 'reserved' bytes já descontados do limite em voo."""
+        try:
+            return self._pool.submit(self._run, path, data, content_type, reserved, metadata)
+        except Exception:
+            self._budget.release(reserved)
+            raise
+
+    def submit_stream(self, path: str, opener: Callable[[], BinaryIO], size: Optional[int],
+                      content_type: str, metadata: Optional[Dict[str, str]] = None) -> "Future[str]":
+        """
+        Enfileira um upload em streaming: o worker abre a origem e envia em blocos
+        de UPLOAD_CHUNK_BYTES, então só um bloco por upload conta no limite em voo.
+        """
+        self._budget.acquire(UPLOAD_CHUNK_BYTES)
+        try:
+            return self._pool.submit(self._run_stream, path, opener, size, content_type, metadata)
+        except Exception:
+            self._budget.release(UPLOAD_CHUNK_BYTES)
+            raise
+
+    def submit_composite(self, path: str, fp: BinaryIO, size: Optional[int], content_type: str,
+                         metadata: Optional[Dict[str, str]] = None) -> "Future[str]":
+        """
+        Upload composto paralelo: a thread chamadora lê 'fp' em partes de
+        COMPOSITE_PART_BYTES, as partes sobem em paralelo como objetos temporários
+        e, quando a última termina, são compostas em 'path' e removidas.
+        Falhas (leitura, partes ou compose) chegam pelo Future devolvido.
+        """
+        result: "Future[str]" = Future()
+        token = uuid.uuid4().hex
+        parts: List[str] = []
+        lock = threading.Lock()
+        state: Dict[str, Any] = {"remaining": 1, "error": None}  # 1 = a própria leitura
+
+        def settle(error: Optional[BaseException]) -> None:
+            with lock:
+                if error is not None and state["error"] is None:
+                    state["error"] = error
+                state["remaining"] -= 1
+                if state["remaining"]:
+                    return
+            try:
+                if state["error"] is not None:
+                    raise state["error"]
+                result.set_result(self.gcs.compose(self.bucket, path, parts, content_type, metadata))
+            except BaseException as e:
+                result.set_exception(e)
+            finally:
+                try:
+                    self.gcs.delete_objects(self.bucket, parts)
+                except Exception:
+                    pass
+
+        try:
+            while True:
+                # reserva a parte antes de ler, para a memória nunca passar do limite
+                self._budget.acquire(COMPOSITE_PART_BYTES)
+                try:
+                    block = fp.read(COMPOSITE_PART_BYTES)
+                except BaseException:
+                    self._budget.release(COMPOSITE_PART_BYTES)
+                    raise
+                if not block:
+                    self._budget.release(COMPOSITE_PART_BYTES)
+                    break
+                # partes fora do prefixo da marca, para não aparecerem em listagens
+                part = f"{COMPOSITE_TMP_PREFIX}{token}/{len(parts):05d}"
+                fut = self._submit_reserved(part, block, "application/octet-stream", COMPOSITE_PART_BYTES)
+                del block
+                parts.append(part)
+                with lock:
+                    state["remaining"] += 1
+                fut.add_done_callback(lambda f: settle(f.exception()))
+        except BaseException as e:
+            settle(e)
+        else:
+            settle(None)
+        return result
+
+    def reserve(self, n: int) -> None:
+        """Desconta do limite em voo bytes mantidos fora do pipeline (ex.: fontes de rendições)."""
+        self._budget.acquire(n)
+
+    def release(self, n: int) -> None:
+        self._budget.release(n)
+
+    @property
+    def peak_inflight_bytes(self) -> int:
+        return self._budget.peak
+
+    def _run(self, path: str, data: bytes, content_type: str, size: int,
+             metadata: Optional[Dict[str, str]]) -> str:
+        try:
+            return self.gcs.write_object(self.bucket, path, data, content_type, metadata)
+        finally:
+            self._budget.release(size)
+
+    def _run_stream(self, path: str, opener: Callable[[], BinaryIO], size: Optional[int],
+                    content_type: str, metadata: Optional[Dict[str, str]]) -> str:
+        try:
+            with opener() as fp:
+                return self.gcs.write_stream(self.bucket, path, fp, size, content_type,
+                                             UPLOAD_CHUNK_BYTES, metadata)
+        finally:
+            self._budget.release(UPLOAD_CHUNK_BYTES)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "UploadPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
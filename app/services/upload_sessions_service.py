@@ -0,0 +1,143 @@
+# app/services/upload_sessions_service.py
+import os
+import re
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from ..repositories.upload_sessions_repository import UploadSessionsRepository
+from .ingestion_service import IngestionService
+from .ingestion_jobs_service import IngestionJobsService
+
+MAX_UPLOAD_BYTES = int(os.getenv("INGEST_UPLOAD_MAX_BYTES", str(5 * 1024 ** 3)))
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadSessionError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class UploadSessionsService:
+    """
+    Upload resumable em chunks numerados: initiate -> PUT chunks (em qualquer ordem,
+    repetíveis) -> status -> finalize. O arquivo é montado em disco local e entregue
+    a IngestionService.ingest_zip (ou a um job em background).
+    """
+
+    def __init__(self, ingestion: Optional[IngestionService] = None,
+                 jobs: Optional[IngestionJobsService] = None,
+                 repo: Optional[UploadSessionsRepository] = None):
+        self.ingestion = ingestion or IngestionService()
+        self.jobs = jobs or IngestionJobsService(self.ingestion)
+        self.repo = repo or UploadSessionsRepository()
+
+    # -------- helpers --------
+    def _session(self, upload_id: str) -> Dict[str, Any]:
+        session = self.repo.get(upload_id) if _UPLOAD_ID_RE.match(upload_id or "") else None
+        if session is None:
+            raise UploadSessionError("upload não encontrado", 404)
+        if session.get("state") != "open" or self.repo.claimed(upload_id):
+            raise UploadSessionError("upload já finalizado", 409)
+        return session
+
+    @staticmethod
+    def _chunk_span(session: Dict[str, Any], index: int) -> Tuple[int, int]:
+        offset = index * session["chunk_size"]
+        return offset, min(session["chunk_size"], session["total_size"] - offset)
+
+    def _status(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        received = self.repo.received(session["upload_id"])
+        got = set(received)
+        missing = [i for i in range(session["total_chunks"]) if i not in got]
+        return {
+            "ok": True,
+            "upload_id": session["upload_id"],
+            "brand_name": session["brand_name"],
+            "filename": session["filename"],
+            "total_size": session["total_size"],
+            "chunk_size": session["chunk_size"],
+            "total_chunks": session["total_chunks"],
+            "received": received,
+            "missing": missing,
+            "complete": not missing,
+        }
+
+    # -------- protocolo --------
+    def initiate(self, brand_name: str, filename: Optional[str], total_size: int,
+                 chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        if not brand_name:
+            raise UploadSessionError("brand_name obrigatório")
+        if total_size <= 0 or total_size > MAX_UPLOAD_BYTES:
+            raise UploadSessionError(f"total_size deve estar entre 1 e {MAX_UPLOAD_BYTES} bytes")
+        chunk_size = chunk_size or DEFAULT_CHUNK_BYTES
+        if chunk_size <= 0 or chunk_size > MAX_CHUNK_BYTES:
+            raise UploadSessionError(f"chunk_size deve estar entre 1 e {MAX_CHUNK_BYTES} bytes")
+        self.repo.prune()
+        session = {
+            "upload_id": uuid.uuid4().hex,
+            "state": "open",
+            "brand_name": brand_name,
+            "filename": filename,
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "total_chunks": (total_size + chunk_size - 1) // chunk_size,
+            "created_at": time.time(),
+        }
+        self.repo.create(session)
+        return self._status(session)
+
+    def put_chunk(self, upload_id: str, index: int, offset: Optional[int],
+                  stream: BinaryIO, length: Optional[int]) -> Dict[str, Any]:
+        session = self._session(upload_id)
+        if index < 0 or index >= session["total_chunks"]:
+            raise UploadSessionError("índice de chunk fora do intervalo")
+        expected_offset, expected_len = self._chunk_span(session, index)
+        if offset is not None and offset != expected_offset:
+            raise UploadSessionError(f"offset inválido para o chunk {index}: esperado {expected_offset}")
+        if length is not None and length != expected_len:
+            raise UploadSessionError(f"tamanho inválido para o chunk {index}: esperado {expected_len}")
+        written = self.repo.write_chunk(upload_id, index, expected_offset, stream, expected_len)
+        if written != expected_len:
+            raise UploadSessionError(f"chunk {index} incompleto: {written} de {expected_len} bytes")
+        return {"ok": True, "upload_id": upload_id, "chunk": index, "bytes": written}
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        session = self.repo.get(upload_id) if _UPLOAD_ID_RE.match(upload_id or "") else None
+        if session is None:
+            raise UploadSessionError("upload não encontrado", 404)
+        out = self._status(session)
+        out["state"] = session.get("state")
+        return out
+
+    def finalize(self, upload_id: str, as_job: bool = False) -> Dict[str, Any]:
+        session = self._session(upload_id)
+        status = self._status(session)
+        if not status["complete"]:
+            raise UploadSessionError(f"faltam chunks: {status['missing'][:20]}", 409)
+        # retry do cliente após timeout: só a primeira finalização ingere o arquivo
+        if not self.repo.claim(upload_id):
+            raise UploadSessionError("upload já finalizado", 409)
+        if as_job:
+            # o job passa a ser dono do arquivo montado e a sessão sai do disco;
+            # no limite de jobs o arquivo volta e a sessão segue aberta
+            path = self.repo.detach_data(upload_id)
+            try:
+                job = self.jobs.submit_file(session["brand_name"], path, session["filename"])
+            except Exception:
+                self.repo.attach_data(upload_id, path)
+                self.repo.unclaim(upload_id)
+                raise
+            self.repo.delete(upload_id)
+            return job
+        path = self.repo.data_path(upload_id)
+        session["state"] = "finalized"
+        self.repo.save(session)
+        try:
+            with open(path, "rb") as f:
+                return self.ingestion.ingest_zip(session["brand_name"], f, filename=session["filename"])
+        finally:
+            self.repo.delete(upload_id)
@@ -0,0 +1,123 @@
+# app/services/versions_service.py
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from ..repositories.versions_repository import VersionsRepository
+from ..utils.naming import safe_str
+from ..utils.zip_segments import SEGMENT_KEY, SEGMENTS_PREFIX, segment_path
+from .assets_cache import invalidate_brand
+from .object_manifest import ObjectManifestService, object_manifest
+from .readmodel_service import ReadModelService
+
+# versões anteriores à corrente preservadas pela compactação (para rollback)
+KEEP_VERSIONS = int(os.getenv("INGEST_KEEP_VERSIONS", "1"))
+# segmento recém-gravado pode ainda não ter o original que aponta para ele (ingestão em curso)
+SEGMENT_GRACE = timedelta(seconds=int(os.getenv("ZIP_SEGMENT_GRACE_SECONDS", "3600")))
+
+
+class VersionsService:
+    """
+    Snapshots de ingestão: cada ingestão grava suas linhas com um version_id e, se
+    tudo der certo, o ponteiro em brand_versions passa a apontar para ela.
+    Rollback só move o ponteiro (linhas no BigQuery): os arquivos no bucket (originais,
+    rendições, originais.zip) ficam como a última ingestão deixou. Compactação apaga
+    as versões superadas.
+    """
+
+    def __init__(self, repo: Optional[VersionsRepository] = None,
+                 readmodel: Optional[ReadModelService] = None,
+                 manifest: Optional[ObjectManifestService] = None):
+        self.repo = repo or VersionsRepository()
+        self.readmodel = readmodel or ReadModelService()
+        self.manifest = manifest or object_manifest
+
+    def list(self, brand: str) -> Dict[str, Any]:
+        cur = self.repo.current(brand) or {}
+        versions = self.repo.list_versions(brand)
+        for v in versions:
+            v["current"] = (v["version_id"] or None) == cur.get("version_id")
+        return {
+            "ok": True,
+            "brand_name": brand,
+            "current": cur.get("version_id"),
+            "previous": cur.get("previous_version_id"),
+            "versions": versions,
+        }
+
+    def rollback(self, brand: str, version_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Volta o ponteiro para version_id (padrão: a versão anterior à corrente).
+        Só as linhas voltam: um arquivo que a ingestão posterior sobrescreveu no mesmo
+        caminho continua com o conteúdo novo (files_restored=False na resposta).
+        """
+        cur = self.repo.current(brand) or {}
+        target = version_id or cur.get("previous_version_id")
+        if not target:
+            return {"ok": False, "error": "nenhuma versão anterior para restaurar"}
+        if target == cur.get("version_id"):
+            return {"ok": True, "brand_name": brand, "version_id": target, "changed": False}
+        available = {v["version_id"] for v in self.repo.list_versions(brand)}
+        if target not in available:
+            return {"ok": False, "error": f"versão '{target}' não encontrada (compactada?)"}
+        self.repo.activate(brand, target)
+        read_model = self.readmodel.publish(brand, target)
+        invalidate_brand(brand)
+        return {
+            "ok": True,
+            "brand_name": brand,
+            "version_id": target,
+            "previous_version_id": cur.get("version_id"),
+            "changed": True,
+            "files_restored": False,
+            "note": "arquivos no bucket não são restaurados; reenvie o ZIP da versão para restaurá-los",
+            "read_model": read_model,
+        }
+
+    def compact(self, brand: str, keep: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Apaga fisicamente as versões mais antigas que a corrente, preservando as 'keep'
+        mais recentes. Versões mais novas que a corrente (ingestão em andamento ou
+        desfeita por rollback) nunca são apagadas aqui; as que nunca foram ao ar
+        (carga com falha ou superada) a própria ingestão já apaga.
+        """
+        keep = KEEP_VERSIONS if keep is None else max(0, keep)
+        cur = (self.repo.current(brand) or {}).get("version_id")
+        if not cur:
+            return {"ok": False, "error": "marca sem versão corrente; nada a compactar"}
+        older = sorted(
+            (v["version_id"] for v in self.repo.list_versions(brand)
+             if v["version_id"] and v["version_id"] < cur),
+            reverse=True,
+        )
+        kept = older[:keep]
+        cutoff = kept[-1] if kept else cur
+        deleted = self.repo.delete_older_than(brand, cutoff)
+        segments = self.sweep_segments(brand)
+        return {"ok": True, "brand_name": brand, "current": cur, "kept": kept, "deleted": deleted,
+                "segments": segments}
+
+    def sweep_segments(self, brand: str) -> Dict[str, Any]:
+        """
+        Remove segmentos do originais.zip (ver ingestion_service) que nenhum original
+        referencia mais: cada original alterado deixa o segmento antigo para trás.
+        Lê o bucket de novo (rebuild do manifest) para não decidir com índice atrasado.
+        """
+        directory = safe_str(brand).lower()
+        rebuilt = self.manifest.rebuild(directory)
+        if not rebuilt.get("ok"):
+            return {"ok": False, "error": rebuilt.get("error")}
+        objects = self.manifest.list_objects(directory + "/")
+        referenced = {
+            segment_path(directory + "/", md[SEGMENT_KEY])
+            for md in ((o.get("metadata") or {}) for o in objects.values()) if md.get(SEGMENT_KEY)
+        }
+        cutoff = datetime.now(timezone.utc) - SEGMENT_GRACE
+        orphans: List[str] = [
+            p for p in self.manifest.list_paths(f"{directory}/{SEGMENTS_PREFIX}/")
+            if p not in referenced and (objects[p].get("updated") or cutoff) < cutoff
+        ]
+        try:
+            self.manifest.delete(orphans)
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "referenced": len(referenced), "deleted": len(orphans)}
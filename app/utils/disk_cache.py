@@ -0,0 +1,215 @@
+# app/utils/disk_cache.py
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional
+
+_PART_SUFFIX = ".part"
+_LOCK_NAME = ".evict.lock"
+_STALE_PART_SECONDS = 3600
+# evicção desce até esta fração do orçamento (evita varrer a cada escrita)
+_LOW_WATER = 0.9
+
+
+def iter_file(f: BinaryIO, start: int, end: int, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    """Bytes [start, end] (inclusivo) de um arquivo aberto, em blocos; fecha o arquivo ao final."""
+    try:
+        fd, pos = f.fileno(), start
+        while pos <= end:
+            data = os.pread(fd, min(chunk_size, end - pos + 1), pos)
+            if not data:
+                break
+            pos += len(data)
+            yield data
+    finally:
+        f.close()
+
+
+class DiskLRUCache:
+    """
+    Cache de objetos em disco local (ou tmpfs), compartilhado entre os workers do gunicorn.
+
+    Um arquivo por (chave, versão): <sha256(chave)>-<versão>. Entrada com outra versão
+    não é encontrada, então a versão (geração do objeto) é a validação. Escrita vai para
+    um .part e entra com os.replace: escritores concorrentes geram o mesmo conteúdo e o
+    último rename vence. Recência = mtime (atualizado a cada acerto); a evicção, sob flock,
+    apaga os menos recentes até caber no orçamento. Contadores são por processo.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_entry_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.stores = 0
+        self.store_failures = 0
+        self.evictions = 0
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _prefix(self, key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + "-"
+
+    def _path(self, key: str, version: Any) -> str:
+        return os.path.join(self.directory, f"{self._prefix(key)}{version}")
+
+    def _count(self, attr: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + n)
+
+    # -------- Leitura --------
+    def open(self, key: str, version: Any) -> Optional[BinaryIO]:
+        """Arquivo aberto da entrada (key, version) ou None. Aberto, sobrevive à evicção."""
+        if not self.enabled:
+            return None
+        path = self._path(key, version)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        try:
+            os.utime(path)  # recência para a LRU
+        except OSError:
+            pass
+        self._count("hits")
+        return f
+
+    def record_served(self, nbytes: int) -> None:
+        """Bytes entregues a partir do disco (não buscados no Storage)."""
+        self._count("bytes_served", nbytes)
+
+    # -------- Escrita --------
+    def read_through(self, key: str, version: Any, size: int,
+                     chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Repassa 'chunks' e grava a mesma sequência na entrada (key, version). A entrada só
+        aparece se o objeto chegou inteiro (size bytes); falha de disco não afeta a resposta.
+        """
+        if not self.enabled or size > self.max_entry_bytes:
+            yield from chunks
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=_PART_SUFFIX)
+            out: Optional[BinaryIO] = os.fdopen(fd, "wb")
+        except OSError:
+            self._count("store_failures")
+            out, tmp = None, None
+        written, complete = 0, False
+        try:
+            for chunk in chunks:
+                if out is not None:
+                    try:
+                        out.write(chunk)
+                        written += len(chunk)
+                    except OSError:
+                        self._count("store_failures")
+                        out.close()
+                        out = None
+                yield chunk
+            complete = True
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()  # cliente desconectou: interrompe também a origem
+            if out is not None:
+                out.close()
+                if complete and written == size:
+                    self._commit(tmp, key, version)
+                else:
+                    _unlink(tmp)
+            elif tmp is not None:
+                _unlink(tmp)
+
+    def _commit(self, tmp: str, key: str, version: Any) -> None:
+        try:
+            os.replace(tmp, self._path(key, version))
+        except OSError:
+            self._count("store_failures")
+            _unlink(tmp)
+            return
+        self._count("stores")
+        self._evict(keep=os.path.basename(self._path(key, version)), prefix=self._prefix(key))
+
+    def _evict(self, keep: str, prefix: str) -> None:
+        """Remove versões antigas da mesma chave e, acima do orçamento, as entradas menos recentes."""
+        lock_path = os.path.join(self.directory, _LOCK_NAME)
+        with open(lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return  # outro worker já está evictando
+            now = time.time()
+            entries, total = [], 0
+            for e in os.scandir(self.directory):
+                if e.name == _LOCK_NAME or not e.is_file():
+                    continue
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                if e.name.endswith(_PART_SUFFIX):
+                    if now - st.st_mtime > _STALE_PART_SECONDS:
+                        _unlink(e.path)  # escrita abandonada
+                    continue
+                if e.name.startswith(prefix) and e.name != keep:
+                    _unlink(e.path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+            if total <= self.max_bytes:
+                return
+            evicted = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * _LOW_WATER:
+                    break
+                _unlink(path)
+                total -= size
+                evicted += 1
+            self._count("evictions", evicted)
+
+    # -------- Observabilidade --------
+    def stats(self) -> Dict[str, Any]:
+        entries, on_disk = 0, 0
+        if self.enabled:
+            for e in os.scandir(self.directory):
+                if e.is_file() and e.name != _LOCK_NAME and not e.name.endswith(_PART_SUFFIX):
+                    entries += 1
+                    try:
+                        on_disk += e.stat().st_size
+                    except FileNotFoundError:
+                        pass
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "entries": entries,
+                "bytes": on_disk,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "bytes_saved": self.bytes_served,
+                "stores": self.stores,
+                "store_failures": self.store_failures,
+                "evictions": self.evictions,
+            }
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
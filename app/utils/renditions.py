@@ -0,0 +1,77 @@
+# app/utils/renditions.py
+import io
+import os
+from typing import Dict, List, Tuple
+
+# nome -> maior lado (px). Só geramos versões menores que o original.
+RENDITION_SPECS: List[Tuple[str, int]] = [("thumb", 320), ("medium", 960), ("large", 1920)]
+RASTER_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp", ".tif", ".tiff"}
+RENDITIONS_PREFIX = "_renditions"
+
+
+def is_raster(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in RASTER_EXTS
+
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def rendition_path(brand_prefix: str, source_path: str, name: str, fmt: str) -> str:
+    """acme/cat/sub/01.png -> acme/_renditions/cat/sub/01.png@thumb.webp (fora de originais/)."""
+    rest = source_path[len(brand_prefix):] if source_path.startswith(brand_prefix) else source_path
+    ext = "jpg" if fmt == "jpeg" else fmt
+    return f"{brand_prefix}{RENDITIONS_PREFIX}/{rest}@{name}.{ext}"
+
+
+def render_variants(data: bytes, specs: List[Tuple[str, int]], fmt: str = "webp",
+                    quality: int = 82) -> List[Dict]:
+    """
+    Roda em processo separado (ProcessPoolExecutor). Devolve
+    [{"name", "data", "width", "height", "content_type"}] para cada tamanho menor que o
+    original; o primeiro tamanho (thumb) sai sempre, sem ampliar.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as im:
+        longest = max(im.size)
+        # só tamanhos menores que o original; o primeiro (thumb) sai sempre
+        wanted = [(i, name, edge) for i, (name, edge) in enumerate(specs) if i == 0 or edge < longest]
+        # JPEG: o decoder já reduz por 1/2, 1/4 ou 1/8 (sem montar o bitmap inteiro)
+        scale = min(1.0, max(edge for _, _, edge in wanted) / longest)
+        im.draft(im.mode, (max(1, round(im.width * scale)), max(1, round(im.height * scale))))
+        im = ImageOps.exif_transpose(im)
+        if getattr(im, "n_frames", 1) > 1:
+            im.seek(0)
+        has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        if fmt == "jpeg":
+            if has_alpha:
+                bg = Image.new("RGB", im.size, (255, 255, 255))
+                bg.paste(im.convert("RGBA"), mask=im.convert("RGBA").split()[-1])
+                im = bg
+            else:
+                im = im.convert("RGB")
+        else:
+            im = im.convert("RGBA" if has_alpha else "RGB")
+
+        out: List[Tuple[int, Dict]] = []
+        # do maior para o menor: cada tamanho sai do anterior, reduzido no lugar (sem cópias)
+        for i, name, edge in sorted(wanted, key=lambda w: -w[2]):
+            im.thumbnail((edge, edge), Image.LANCZOS)
+            buf = io.BytesIO()
+            if fmt == "jpeg":
+                im.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                im.save(buf, "WEBP", quality=quality, method=4)
+            out.append((i, {
+                "name": name,
+                "data": buf.getvalue(),
+                "width": im.width,
+                "height": im.height,
+                "content_type": "image/jpeg" if fmt == "jpeg" else "image/webp",
+            }))
+        return [v for _, v in sorted(out, key=lambda o: o[0])]
@@ -0,0 +1,94 @@
+# app/utils/spool.py
+import mmap
+import os
+import shutil
+import stat
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR") or None  # None -> diretório temporário do sistema
+COPY_CHUNK = 1024 * 1024
+
+
+def _regular_fileno(file_obj) -> Optional[int]:
+    """fileno() quando o objeto já é um arquivo regular em disco (ex.: upload spooled do werkzeug)."""
+    try:
+        fd = file_obj.fileno()
+        return fd if stat.S_ISREG(os.fstat(fd).st_mode) else None
+    except Exception:
+        return None
+
+
+def spool_to_file(stream: BinaryIO, dir: Optional[str] = None) -> str:
+    """Copia o stream para um arquivo temporário em blocos fixos e devolve o caminho."""
+    fd, path = tempfile.mkstemp(prefix="ingest-", suffix=".zip", dir=dir or SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(stream, out, COPY_CHUNK)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+class MappedReader:
+    """Visão de arquivo (read/seek/tell) sobre um mmap, no formato que zipfile espera."""
+
+    def __init__(self, mm: mmap.mmap):
+        self._mm = mm
+
+    def read(self, n: int = -1) -> bytes:
+        return self._mm.read(n if n is not None and n >= 0 else None)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        try:
+            self._mm.seek(offset, whence)
+        except ValueError as e:
+            # arquivos regulares levantam OSError; zipfile depende disso para detectar ZIP inválido
+            raise OSError(str(e)) from e
+        return self._mm.tell()
+
+    def tell(self) -> int:
+        return self._mm.tell()
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return len(self._mm)
+
+
+@contextmanager
+def mapped_zip_source(file_obj) -> Iterator[MappedReader]:
+    """
+    Entrega o conteúdo do upload como mmap somente-leitura.
+    Reaproveita o arquivo se já estiver em disco; senão faz spool para um temporário
+    (removido ao sair).
+    """
+    path = None
+    f = None
+    fd = _regular_fileno(file_obj)
+    if fd is None:
+        path = spool_to_file(file_obj)
+        f = open(path, "rb")
+        fd = f.fileno()
+    elif hasattr(file_obj, "flush"):
+        file_obj.flush()
+    try:
+        if os.fstat(fd).st_size == 0:
+            raise zipfile.BadZipFile("arquivo vazio")
+        mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        try:
+            yield MappedReader(mm)
+        finally:
+            mm.close()
+    finally:
+        if f is not None:
+            f.close()
+        if path is not None:
+            os.unlink(path)
@@ -0,0 +1,154 @@
+# app/utils/ttl_cache.py
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def approx_size(value: Any) -> int:
+    """Tamanho aproximado em bytes: o JSON que a resposta vai gerar."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(approx_size(v) for v in value)
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode("utf-8"))
+    except Exception:
+        return 0
+
+
+class TTLCache:
+    """
+    LRU limitado por número de entradas e por bytes aproximados, com TTL por entrada.
+    Thread-safe (um lock). Sem 'copier', os valores são devolvidos como foram guardados
+    (compartilhados entre requests); com ele, cada leitura recebe copier(valor).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float,
+                 sizer: Callable[[Any], int] = approx_size,
+                 copier: Optional[Callable[[Any], Any]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.sizer = sizer
+        self.copier = copier
+        self._data: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # muda a cada invalidação: carga iniciada antes dela não é guardada
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+            expires, _, value = item
+            if expires < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return True, self._out(value)
+
+    def _out(self, value: Any) -> Any:
+        return self.copier(value) if self.copier is not None else value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Presente e dentro do TTL; não conta acerto/erro nem mexe na ordem da LRU."""
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[0] >= time.monotonic()
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        size = self.sizer(value)
+        if size > self.max_bytes:
+            return  # maior que o cache inteiro: não guarda
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        found, value = self.get(key)
+        if found:
+            return value
+        generation = self._generation
+        value = loader()
+        self.set(key, value, generation)
+        return self._out(value)
+
+    def get_or_start(self, key: Hashable,
+                     start: Callable[[], Callable[[], Any]]) -> Callable[[], Any]:
+        """
+        get_or_load em duas fases: start() dispara a carga e devolve a função que a conclui.
+        Várias cargas disparadas antes da primeira conclusão correm ao mesmo tempo.
+        """
+        found, value = self.get(key)
+        if found:
+            return lambda: value
+        generation = self._generation
+        finish = start()
+
+        def done() -> Any:
+            loaded = finish()
+            self.set(key, loaded, generation)
+            return self._out(loaded)
+
+        return done
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                self._drop(k)
+            self._generation += 1
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        self.invalidate(lambda _k: True)
+
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,94 @@
+# app/utils/zip_index.py
+from typing import Dict, List, Optional
+
+SYSTEM_ARTIFACTS = {"__macosx", ".ds_store", "thumbs.db", "desktop.ini"}
+
+
+def is_artifact_component(comp: str) -> bool:
+    c = comp.strip().lower()
+    return (not c) or (c in SYSTEM_ARTIFACTS) or c.startswith("._")
+
+
+class _Node:
+    __slots__ = ("children", "direct_files", "files")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}   # componente bruto -> nó
+        self.direct_files: List[str] = []        # arquivos imediatamente abaixo
+        self.files: List[str] = []               # todos os arquivos da subárvore (ordem do ZIP)
+
+
+class ZipIndex:
+    """
+    Árvore de diretórios de um ZIP montada em uma única passada do namelist().
+    Nomes são normalizados (barra invertida -> '/') e artefatos de sistema já vêm filtrados.
+    Diretórios são chaves com '/' final; a raiz é "".
+    """
+
+    def __init__(self, namelist: List[str]):
+        self.names: List[str] = []
+        self._root = _Node()
+        self._nodes: Dict[str, _Node] = {"": self._root}
+        for raw in namelist:
+            n = raw.replace("\\", "/")
+            comps = [c for c in n.split("/") if c != ""]
+            if not comps:
+                continue
+            if any(is_artifact_component(c) for c in comps):
+                continue
+            self.names.append(n)
+            self._add(n)
+
+    def _add(self, name: str) -> None:
+        parts = name.split("/")
+        is_file = not name.endswith("/")
+        dirs = parts[:-1]
+        node, key = self._root, ""
+        if is_file:
+            node.files.append(name)
+        for comp in dirs:
+            key = key + comp + "/"
+            child = node.children.get(comp)
+            if child is None:
+                child = node.children[comp] = _Node()
+                self._nodes[key] = child
+            node = child
+            if is_file:
+                node.files.append(name)
+        if is_file:
+            node.direct_files.append(name)
+
+    def _node(self, d: str) -> Optional[_Node]:
+        return self._nodes.get(d)
+
+    def exists(self, d: str) -> bool:
+        """Algum nome começa com o diretório 'd' (com '/' final)."""
+        return d in self._nodes and d != ""
+
+    def top_level(self) -> List[str]:
+        """Componentes de primeiro nível (brutos), como em n.split('/', 1)[0]."""
+        return list(self._root.children)
+
+    def has_root_files(self) -> bool:
+        return bool(self._root.direct_files)
+
+    def subdirs(self, parent: str) -> List[str]:
+        """Subpastas diretas de 'parent', já sem artefatos, ordenadas."""
+        node = self._node(parent)
+        if node is None:
+            return []
+        seen = set()
+        for comp in node.children:
+            first = comp.strip()
+            if first and not is_artifact_component(first):
+                seen.add(parent + first + "/")
+        return sorted(seen)
+
+    def files(self, folder: str) -> List[str]:
+        """Todos os arquivos abaixo de 'folder' (recursivo), na ordem do ZIP."""
+        node = self._node(folder)
+        return list(node.files) if node is not None else []
+
+    def direct_files(self, folder: str) -> List[str]:
+        node = self._node(folder)
+        return list(node.direct_files) if node is not None else []
@@ -0,0 +1,107 @@
+# app/utils/zip_segments.py
+import hashlib
+import struct
+import zipfile
+from typing import Any, Dict, Optional, Tuple
+
+# segmento = bytes comprimidos de um original, exatamente como estavam no ZIP da ingestão
+SEGMENTS_PREFIX = "_zip/segments"
+ARCHIVES_PREFIX = "_zip/archives"
+# metadata do original que aponta para o segmento (CRC32 e tamanho já vêm de ZIP_CRC_KEY/ZIP_SIZE_KEY)
+SEGMENT_KEY = "zip_segment"
+METHOD_KEY = "zip_method"
+CSIZE_KEY = "zip_csize"
+# métodos que qualquer descompactador lê
+REUSABLE_METHODS = (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+_READ_CHUNK = 1024 * 1024
+
+
+def segment_path(brand_prefix: str, digest: str) -> str:
+    """acme/ + <sha256> -> acme/_zip/segments/<sha256> (fora de originais/)."""
+    return f"{brand_prefix}{SEGMENTS_PREFIX}/{digest}"
+
+
+def archives_prefix(brand_prefix: str, cat_key: str) -> str:
+    return f"{brand_prefix}{ARCHIVES_PREFIX}/{cat_key}/"
+
+
+def archive_path(brand_prefix: str, cat_key: str, digest: str) -> str:
+    return f"{archives_prefix(brand_prefix, cat_key)}{digest}.zip"
+
+
+def is_reusable(info: zipfile.ZipInfo) -> bool:
+    """Entrada cujos bytes comprimidos podem ir para outro ZIP como estão (sem criptografia)."""
+    return info.compress_type in REUSABLE_METHODS and not info.flag_bits & 0x1
+
+
+class RawMember:
+    """
+    Leitura (read/tell) dos bytes comprimidos de uma entrada, sem descompactar. Usa o
+    mesmo lock com que o zipfile serializa os seeks no arquivo compartilhado, então
+    convive com zf.open() de outras threads (uploads em streaming).
+    """
+
+    def __init__(self, zf: zipfile.ZipFile, info: zipfile.ZipInfo):
+        self._zf = zf
+        with zf._lock:
+            zf.fp.seek(info.header_offset)
+            header = zf.fp.read(zipfile.sizeFileHeader)
+        if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"cabeçalho local inválido: {info.filename}")
+        # nome e extra do cabeçalho local podem diferir dos do diretório central
+        name_len, extra_len = struct.unpack(zipfile.structFileHeader, header)[-2:]
+        self._start = info.header_offset + zipfile.sizeFileHeader + name_len + extra_len
+        self._end = self._start + info.compress_size
+        self._pos = self._start
+
+    def read(self, n: int = -1) -> bytes:
+        remaining = self._end - self._pos
+        n = remaining if n is None or n < 0 else min(n, remaining)
+        if n <= 0:
+            return b""
+        with self._zf._lock:
+            self._zf.fp.seek(self._pos)
+            data = self._zf.fp.read(n)
+        self._pos += len(data)
+        return data
+
+    def tell(self) -> int:
+        return self._pos - self._start
+
+    def close(self) -> None:
+        pass
+
+
+def segment_digest(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    """sha256 do método + bytes comprimidos: a chave de conteúdo do segmento."""
+    h = hashlib.sha256(bytes([info.compress_type]))
+    raw = RawMember(zf, info)
+    while True:
+        data = raw.read(_READ_CHUNK)
+        if not data:
+            return h.hexdigest()
+        h.update(data)
+
+
+def segment_metadata(info: zipfile.ZipInfo, digest: str) -> Dict[str, str]:
+    return {SEGMENT_KEY: digest, METHOD_KEY: str(info.compress_type), CSIZE_KEY: str(info.compress_size)}
+
+
+def segment_entry(arcname: str, metadata: Dict[str, Any], crc: Optional[str], size: Optional[str],
+                  date_time: Tuple[int, int, int, int, int, int]) -> Optional[zipfile.ZipInfo]:
+    """ZipInfo pronto para receber o segmento (CRC e tamanhos conhecidos), ou None sem segmento."""
+    if not metadata.get(SEGMENT_KEY):
+        return None
+    try:
+        method = int(metadata[METHOD_KEY])
+        info = zipfile.ZipInfo(arcname, date_time=date_time)
+        info.compress_type = method
+        info.CRC = int(crc, 16)
+        info.file_size = int(size)
+        info.compress_size = int(metadata[CSIZE_KEY])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if method not in REUSABLE_METHODS:
+        return None
+    info.external_attr = 0o644 << 16
+    return info
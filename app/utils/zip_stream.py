@@ -0,0 +1,116 @@
+# app/utils/zip_stream.py
+import os
+import time
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+# formatos já comprimidos: DEFLATE só gasta CPU (e às vezes aumenta o arquivo)
+_PRECOMPRESSED_EXT = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".pdf", ".ai",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".heic", ".heif",
+    ".mp4", ".m4v", ".mov", ".webm", ".mkv", ".mp3", ".m4a", ".aac", ".ogg",
+    ".woff", ".woff2",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".key", ".pages", ".numbers",
+}
+WRITE_SLICE = 1024 * 1024
+
+
+def compress_type_for(name: str) -> int:
+    """STORED para formatos já comprimidos; DEFLATED para o resto (svg, eps, ttf, psd, txt...)."""
+    ext = os.path.splitext(name)[1].lower()
+    return zipfile.ZIP_STORED if ext in _PRECOMPRESSED_EXT else zipfile.ZIP_DEFLATED
+
+
+def slices(data: bytes, size: int = WRITE_SLICE) -> Iterator[bytes]:
+    view = memoryview(data)
+    for i in range(0, len(view), size):
+        yield view[i:i + size]
+
+
+class _Sink:
+    """Destino sem seek do ZipFile: guarda o que foi escrito até ser drenado."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def skip(self, n: int) -> None:
+        """Conta bytes entregues direto ao cliente, sem passar pelo buffer."""
+        self._pos += n
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ZipStream:
+    """
+    ZIP gerado em fluxo. Como o destino não tem seek, o ZipFile grava cada entrada com
+    o bit 3 (CRC e tamanhos num data descriptor depois dos dados), e os bytes saem à
+    medida que são escritos. ZIP64: por entrada quando o tamanho declarado passa do
+    limite; no diretório central quando offsets/contagem passam (o ZipFile decide).
+    """
+
+    def __init__(self, compresslevel: int = 6):
+        self._sink = _Sink()
+        self._zf = zipfile.ZipFile(self._sink, mode="w", allowZip64=True, compresslevel=compresslevel)
+
+    def entry(self, name: str, chunks: Iterable[bytes], size: Optional[int] = None,
+              date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
+              compress_type: Optional[int] = None) -> Iterator[bytes]:
+        info = zipfile.ZipInfo(name, date_time=date_time or time.gmtime()[:6])
+        info.compress_type = compress_type_for(name) if compress_type is None else compress_type
+        info.external_attr = 0o644 << 16
+        if size is not None:
+            info.file_size = size  # define o ZIP64 do cabeçalho local antes dos dados
+        with self._zf.open(info, mode="w") as w:
+            for chunk in chunks:
+                w.write(chunk)
+                data = self._sink.drain()
+                if data:
+                    yield data
+        data = self._sink.drain()
+        if data:
+            yield data
+
+    def raw_entry(self, info: zipfile.ZipInfo, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Entrada com dados já comprimidos (CRC e tamanhos preenchidos em 'info'): cabeçalho
+        local completo + os bytes como chegam, sem recompressão nem data descriptor.
+        """
+        info.header_offset = self._sink.tell()
+        header = info.FileHeader()
+        self._sink.skip(len(header))
+        yield header
+        written = 0
+        for chunk in chunks:
+            written += len(chunk)
+            self._sink.skip(len(chunk))
+            yield chunk
+        if written != info.compress_size:
+            raise ValueError(f"{info.filename}: {written} bytes, esperado {info.compress_size}")
+        # registra no ZipFile como o próprio zipfile faz ao fechar uma entrada,
+        # para que ela entre no diretório central escrito por close()
+        zf = self._zf
+        zf.filelist.append(info)
+        zf.NameToInfo[info.filename] = info
+        zf.start_dir = self._sink.tell()
+        zf._didModify = True
+
+    def close(self) -> bytes:
+        """Diretório central (e registros ZIP64 de fim, se preciso)."""
+        self._zf.close()
+        return self._sink.drain()
@@ -0,0 +1,128 @@
+# tests/test_avro.py
+import io
+import json
+import struct
+import unittest
+import zlib
+from datetime import datetime, timezone
+
+from app.infra.db import avro
+
+FIELDS = [
+    ("name", "STRING"),
+    ("n", "INT64"),
+    ("score", "FLOAT64"),
+    ("active", "BOOL"),
+    ("created_at", "TIMESTAMP"),
+    ("extra", "JSON"),
+]
+
+
+class _Reader:
+    """Leitor independente do escritor, direto da especificação Avro 1.11."""
+
+    def __init__(self, data: bytes):
+        self.buf = io.BytesIO(data)
+
+    def long(self) -> int:
+        shift = n = 0
+        while True:
+            b = self.buf.read(1)[0]
+            n |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                return (n >> 1) ^ -(n & 1)
+
+    def bytes(self) -> bytes:
+        return self.buf.read(self.long())
+
+    def value(self, avro_type):
+        kind = avro_type["type"] if isinstance(avro_type, dict) else avro_type
+        if kind == "long":
+            return self.long()
+        if kind == "double":
+            return struct.unpack("<d", self.buf.read(8))[0]
+        if kind == "boolean":
+            return self.buf.read(1) == b"\x01"
+        return self.bytes().decode("utf-8")
+
+
+def _read_container(data: bytes):
+    r = _Reader(data)
+    assert r.buf.read(4) == b"Obj\x01"
+    meta = {}
+    while True:
+        count = r.long()
+        if count == 0:
+            break
+        for _ in range(abs(count)):
+            key = r.bytes().decode("utf-8")
+            meta[key] = r.bytes()
+    sync = r.buf.read(16)
+    schema = json.loads(meta["avro.schema"])
+    rows, blocks = [], 0
+    while r.buf.tell() < len(data):
+        count, size = r.long(), r.long()
+        block = _Reader(zlib.decompress(r.buf.read(size), -15))
+        for _ in range(count):
+            row = {}
+            for field in schema["fields"]:
+                branch = block.long()
+                row[field["name"]] = None if branch == 0 else block.value(field["type"][branch])
+            rows.append(row)
+        assert r.buf.read(16) == sync
+        blocks += 1
+    return meta, schema, rows, blocks
+
+
+class AvroContainerTest(unittest.TestCase):
+    def _write(self, rows):
+        fp = io.BytesIO()
+        n = avro.write_container(fp, "assets", FIELDS, rows)
+        self.assertEqual(n, len(rows))
+        return fp.getvalue()
+
+    def test_round_trip(self):
+        ts = datetime(2024, 1, 31, 12, 0, 0, 123456, tzinfo=timezone.utc)
+        rows = [
+            {"name": "logo ção", "n": -3, "score": 1.5, "active": True, "created_at": ts,
+             "extra": {"a": [1, 2]}},
+            {"name": None, "n": 2 ** 40, "score": None, "active": False,
+             "created_at": "2024-01-31T12:00:00Z", "extra": '{"b":1}'},
+            {},
+        ]
+        meta, schema, out, _ = _read_container(self._write(rows))
+        self.assertEqual(meta["avro.codec"], b"deflate")
+        self.assertEqual(schema["fields"][4]["type"][1],
+                         {"type": "long", "logicalType": "timestamp-micros"})
+        self.assertEqual(out[0], {"name": "logo ção", "n": -3, "score": 1.5, "active": True,
+                                  "created_at": int(ts.timestamp()) * 1_000_000 + 123456,
+                                  "extra": '{"a": [1, 2]}'})
+        self.assertEqual(out[1]["n"], 2 ** 40)
+        self.assertEqual(out[1]["created_at"], int(ts.replace(microsecond=0).timestamp()) * 1_000_000)
+        self.assertEqual(out[1]["extra"], '{"b":1}')
+        self.assertEqual(out[2], {col: None for col, _ in FIELDS})
+
+    def test_zigzag_edges(self):
+        for n in (0, -1, 1, -64, 64, 2 ** 63 - 1, -(2 ** 63)):
+            self.assertEqual(_Reader(avro._long(n)).long(), n)
+
+    def test_multiple_blocks(self):
+        rows = [{"name": f"r{i}", "n": i} for i in range(avro._BLOCK_ROWS * 2 + 5)]
+        _, _, out, blocks = _read_container(self._write(rows))
+        self.assertEqual(blocks, 3)
+        self.assertEqual([r["n"] for r in out], list(range(len(rows))))
+
+    def test_fastavro_reads_it(self):
+        try:
+            import fastavro
+        except ImportError:
+            self.skipTest("fastavro não instalado")
+        ts = datetime(2024, 1, 31, 12, 0, tzinfo=timezone.utc)
+        data = self._write([{"name": "a", "n": 1, "score": 0.5, "active": True, "created_at": ts}])
+        rec = next(iter(fastavro.reader(io.BytesIO(data))))
+        self.assertEqual((rec["name"], rec["n"], rec["created_at"]), ("a", 1, ts))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# tests/test_zip_stream.py
+import io
+import unittest
+import zipfile
+
+from app.utils.zip_segments import RawMember, segment_digest, segment_entry, segment_metadata
+from app.utils.zip_stream import ZipStream, slices
+
+DATE = (2024, 1, 31, 12, 0, 0)
+
+
+def _source_zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data, method in members:
+            zf.writestr(zipfile.ZipInfo(name, DATE), data, compress_type=method)
+    buf.seek(0)
+    return zipfile.ZipFile(buf)
+
+
+class ZipStreamRawEntryTest(unittest.TestCase):
+    """Montagem do originais.zip: segmentos comprimidos copiados como estão + entradas comprimidas na hora."""
+
+    def test_raw_and_compressed_entries(self):
+        src = _source_zip([
+            ("a.svg", b"<svg/>" * 5000, zipfile.ZIP_DEFLATED),
+            ("b.png", bytes(range(256)) * 300, zipfile.ZIP_STORED),
+        ])
+        zs = ZipStream()
+        out = []
+        for info in src.infolist():
+            raw = RawMember(src, info).read()
+            md = segment_metadata(info, segment_digest(src, info))
+            entry = segment_entry(info.filename, md, f"{info.CRC:08x}", str(info.file_size), DATE)
+            self.assertIsNotNone(entry)
+            out.extend(zs.raw_entry(entry, slices(raw, 1000)))
+        out.extend(zs.entry("c.txt", [b"hello ", b"world"], 11, DATE))
+        out.append(zs.close())
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(out))) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["a.svg", "b.png", "c.txt"])
+            for info in src.infolist():
+                self.assertEqual(zf.read(info.filename), src.read(info))
+                self.assertEqual(zf.getinfo(info.filename).compress_type, info.compress_type)
+            self.assertEqual(zf.read("c.txt"), b"hello world")
+
+    def test_raw_entry_rejects_wrong_length(self):
+        src = _source_zip([("a.svg", b"x" * 1000, zipfile.ZIP_DEFLATED)])
+        info = src.infolist()[0]
+        md = segment_metadata(info, segment_digest(src, info))
+        entry = segment_entry(info.filename, md, f"{info.CRC:08x}", str(info.file_size), DATE)
+        with self.assertRaises(ValueError):
+            list(ZipStream().raw_entry(entry, [RawMember(src, info).read()[:-1]]))
+
+
+if __name__ == "__main__":
+    unittest.main()